@@ -2,12 +2,17 @@
 agente-rh - API Principal
 Asistente de preselección de candidatos con principios éticos estrictos
 """
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from typing import Optional, List
 import os
+import json
+import time
+import asyncio
 import logging
+from contextlib import asynccontextmanager, AsyncExitStack
 from dotenv import load_dotenv
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -18,7 +23,12 @@ from services.ethical_validator import EthicalValidator
 from services.chat_service import ChatService
 from services.auth_service import authenticate_user, create_access_token, create_user
 from services.audit_service import log_candidate_action, get_audit_log, get_candidate_history
-from services.position_service import position_service
+from services.position_service import (
+    position_service, POSITIONS_PDFS_DIR, POSITIONS_DATA_DIR, POSITIONS_MAX_PAGE_SIZE
+)
+from services.position_watcher import PositionWatcher, POSITIONS_WATCH
+from services.position_reload import reload_jobs
+from services.position_matcher import position_matcher, POSITIONS_MATCH_TOP_K
 from middleware.auth_middleware import get_current_user, get_current_admin_user
 from models.schemas import (
     CandidateAnalysisRequest,
@@ -33,31 +43,60 @@ from models.schemas import (
     CandidateActionResponse,
     AuditLogResponse,
     AuditLogEntry,
+    PositionMatchRequest,
+    PositionMatchResponse,
+)
+from utils.pdf_pool import (
+    extract_text_async, extract_pdf_async, shutdown_pdf_pool, PdfExtractionTimeout, PdfPoolUnavailable
 )
-from utils.pdf_parser import extract_text_from_pdf
+from utils.upload_spool import spooled_upload, UploadLimitMiddleware, MAX_UPLOAD_BYTES, MAX_BATCH_UPLOAD_BYTES
+from utils.http_cache import cache_headers, is_not_modified, not_modified
+from utils.cv_structure import structure_cv
+from utils.logging_config import configure_logging, resolve_request_id, request_id_var, LOG_LEVEL, LOG_FORMAT
 from datetime import timedelta
 from fastapi import Depends
 
 load_dotenv()
 
-# Configurar logging - Mejorado para producción y debugging
-log_level = os.getenv("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(
-    level=getattr(logging, log_level, logging.INFO),
-    format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Salida a consola (stdout/stderr)
-    ]
-)
+# Configurar logging estructurado (JSON por defecto) con cola no bloqueante
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# En producción, los logs van a stdout/stderr que Render captura automáticamente
-logger.info(f"Logging configurado con nivel: {log_level}")
+# En producción, los logs van a stderr (vía QueueListener) que Render captura automáticamente
+logger.info("Logging configurado con nivel: %s, formato: %s", LOG_LEVEL, LOG_FORMAT)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y apagado de recursos compartidos"""
+    # Watcher opcional de PDFs/JSON de posiciones; se inicia antes de la carga
+    # para no perder archivos que lleguen mientras tanto
+    position_watcher = None
+    if POSITIONS_WATCH:
+        position_watcher = PositionWatcher(
+            [POSITIONS_PDFS_DIR, POSITIONS_DATA_DIR],
+            position_service.apply_file_changes,
+            on_rescan=position_service.rescan_files
+        )
+        position_watcher.start()
+    # Las posiciones (JSON + PDFs nuevos) se cargan en un hilo: uvicorn acepta
+    # conexiones de inmediato y /api/positions sirve lo que ya esté cargado
+    position_loader = asyncio.create_task(asyncio.to_thread(position_service.load))
+    yield
+    if not position_loader.done():
+        logger.warning("Apagado durante la carga de posiciones; se descarta el resto")
+    if position_watcher is not None:
+        await asyncio.to_thread(position_watcher.stop)
+    # Guardar las estadísticas de posiciones aún en memoria
+    await asyncio.to_thread(position_service.flush_statistics)
+    # Cerrar el pool de procesos de extracción de PDFs
+    shutdown_pdf_pool()
+
 
 app = FastAPI(
     title="agente-rh API",
     description="Asistente de preselección de candidatos con principios éticos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Rate Limiting
@@ -65,6 +104,13 @@ limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Tope de tamaño de subidas: se corta al recibir el cuerpo, antes de volcarlo
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_bytes=MAX_UPLOAD_BYTES,
+    path_limits={"/api/extract-text/batch": MAX_BATCH_UPLOAD_BYTES},
+)
+
 # Security Headers Middleware (solo en producción)
 if os.getenv("ENVIRONMENT") == "production":
     allowed_hosts = os.getenv("ALLOWED_HOSTS", "*.inbursa.com,*.onrender.com").split(",")
@@ -96,12 +142,25 @@ app.add_middleware(
     max_age=3600,
 )
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Asigna un request_id a cada petición para correlacionar sus logs"""
+    request_id = resolve_request_id(request.headers.get("X-Request-ID"))
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 # Inicializar servicios
 candidate_analyzer = CandidateAnalyzer()
 ethical_validator = EthicalValidator()
 chat_service = ChatService()
-# position_service se inicializa automáticamente e importa los PDFs
-logger.info("Servicios inicializados. Posiciones cargadas automáticamente desde PDFs.")
+# position_service carga posiciones y PDFs en segundo plano al arrancar (ver lifespan)
+logger.info("Servicios inicializados. Las posiciones se cargan en segundo plano.")
 
 
 @app.get("/")
@@ -115,7 +174,30 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "service": "agente-rh"}
+    """Liveness: responde en cuanto el proceso acepta conexiones"""
+    return {
+        "status": "healthy",
+        "service": "agente-rh",
+        "ready": position_service.ready,
+        "positions": {
+            "loading": position_service.loading,
+            "loaded": position_service.count_positions(),
+            "error": position_service.load_error
+        }
+    }
+
+
+@app.get("/api/health/ready")
+async def readiness_check():
+    """Readiness: 503 hasta que la carga inicial de posiciones termina bien (o si falló)"""
+    body = {
+        "ready": position_service.ready,
+        "positions_loaded": position_service.count_positions(),
+        "load_error": position_service.load_error
+    }
+    if not position_service.ready or position_service.load_error:
+        return JSONResponse(status_code=503, content=body)
+    return body
 
 
 @app.get("/api/debug/config")
@@ -248,8 +330,10 @@ async def analyze_candidate(
             )
         
         logger.info(
-            f"Analizando {len(request.candidates)} candidato(s) con JD de {len(request.jobDescription)} caracteres. "
-            f"Usuario: {current_user.get('username', 'unknown')}"
+            "Analizando %d candidato(s) con JD de %d caracteres. Usuario: %s",
+            len(request.candidates),
+            len(request.jobDescription),
+            current_user.get('username', 'unknown')
         )
         
         analyses = await candidate_analyzer.analyze_batch(
@@ -275,10 +359,7 @@ async def analyze_candidate(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        error_traceback = traceback.format_exc()
-        logger.error(f"Error analizando candidato: {str(e)}")
-        logger.error(f"Traceback completo: {error_traceback}")
+        logger.error("Error analizando candidato: %s", e, exc_info=True)
         # En producción, no exponer el traceback completo por seguridad
         # Pero sí el tipo de error para ayudar con el diagnóstico
         error_detail = f"Error interno al analizar candidato: {type(e).__name__}"
@@ -301,20 +382,123 @@ async def extract_text(
         raise HTTPException(status_code=400, detail="Solo se aceptan archivos PDF.")
 
     try:
-        file_bytes = await file.read()
-        text, warnings = extract_text_from_pdf(file_bytes)
+        # La subida se vuelca a disco por bloques y el worker la abre con mmap;
+        # la extracción (CPU intensiva) corre en el pool de procesos, no en el event loop
+        async with spooled_upload(file) as pdf_path:
+            text, warnings = await extract_text_async(pdf_path)
 
         if not text:
             raise HTTPException(status_code=400, detail="No se pudo extraer texto del PDF.")
 
-        return {"text": text, "warnings": warnings}
+        # Secciones, fechas y viñetas (posiciones dentro de text), cacheadas por hash
+        return {"text": text, "warnings": warnings, "structure": structure_cv(text).to_dict()}
     except HTTPException:
         raise
+    except PdfExtractionTimeout as exc:
+        logger.warning(f"Extracción de PDF cancelada por tiempo: {exc}")
+        raise HTTPException(status_code=422, detail="El PDF tardó demasiado en procesarse.")
+    except PdfPoolUnavailable as exc:
+        logger.warning(f"Pool de extracción no disponible: {exc}")
+        raise HTTPException(
+            status_code=503,
+            detail="El servicio de extracción se reinició; intenta de nuevo.",
+            headers={"Retry-After": "5"}
+        )
     except Exception as exc:
         logger.error(f"Error extrayendo texto de PDF: {exc}")
         raise HTTPException(status_code=500, detail="Error al procesar el PDF")
 
 
+PDF_BATCH_MAX_FILES = int(os.getenv("PDF_BATCH_MAX_FILES", "50"))
+
+
+def _is_pdf_upload(file: UploadFile) -> bool:
+    return file.content_type in {"application/pdf", "application/x-pdf"} or (file.filename or "").lower().endswith('.pdf')
+
+
+@app.post("/api/extract-text/batch")
+async def extract_text_batch(
+    files: List[UploadFile] = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Extrae texto de varios PDFs en una sola petición.
+    Los archivos se procesan en paralelo en el pool de procesos y la respuesta
+    es NDJSON: una línea por archivo, en el orden en que terminan, con
+    index, filename, text, warnings, page_count, structure, elapsed_ms y error.
+    """
+    if len(files) > PDF_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Máximo {PDF_BATCH_MAX_FILES} archivos por lote.")
+
+    # Los archivos subidos se cierran al terminar este handler, antes de
+    # transmitir la respuesta: se vuelcan a disco aquí y los temporales se
+    # eliminan cuando termina el streaming
+    stack = AsyncExitStack()
+    sources: List[Optional[str]] = []
+    try:
+        for file in files:
+            if _is_pdf_upload(file):
+                sources.append(await stack.enter_async_context(spooled_upload(file)))
+            else:
+                sources.append(None)
+    except BaseException:
+        await stack.aclose()
+        raise
+
+    async def extract_one(index: int, file: UploadFile, source) -> dict:
+        item = {
+            "index": index,
+            "filename": file.filename,
+            "text": "",
+            "warnings": [],
+            "page_count": 0,
+            "structure": None,
+            "elapsed_ms": 0,
+            "error": None,
+        }
+        if source is None:
+            item["error"] = "Solo se aceptan archivos PDF."
+            return item
+        start = time.perf_counter()
+        try:
+            extraction = await extract_pdf_async(source)
+            item.update(text=extraction.text, warnings=extraction.warnings, page_count=extraction.page_count)
+            if extraction.text:
+                item["structure"] = structure_cv(extraction.text).to_dict()
+            else:
+                item["error"] = "No se pudo extraer texto del PDF."
+        except PdfExtractionTimeout as exc:
+            logger.warning(f"Extracción de PDF cancelada por tiempo ({file.filename}): {exc}")
+            item["error"] = "El PDF tardó demasiado en procesarse."
+        except PdfPoolUnavailable as exc:
+            logger.warning(f"Pool de extracción no disponible ({file.filename}): {exc}")
+            item["error"] = "El servicio de extracción se reinició; intenta de nuevo."
+        except Exception as exc:
+            logger.error(f"Error extrayendo texto de PDF {file.filename}: {exc}")
+            item["error"] = "Error al procesar el PDF"
+        item["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return item
+
+    async def stream_results():
+        tasks = [
+            asyncio.create_task(extract_one(index, file, source))
+            for index, (file, source) in enumerate(zip(files, sources))
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        finally:
+            # Cliente desconectado o error: cancelar pendientes y borrar temporales
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await stack.aclose()
+
+    logger.info("Extracción por lote: %d archivos", len(files))
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 
 
 @app.post("/api/chat", response_model=ChatResponse)
@@ -408,7 +592,8 @@ async def get_ethical_principles():
                 "description": "Si los datos son insuficientes, lo indica y sugiere información adicional."
             }
         ],
-        "values": "Confianza, transparencia y ética - Valores de agente-rh"
+        "values": "Confianza, transparencia y ética - Valores de agente-rh",
+        "terms_version": ethical_validator.terms_version
     }
 
 
@@ -533,32 +718,52 @@ async def get_candidate_history_endpoint(
 
 @app.get("/api/positions")
 async def list_positions(
+    request: Request,
     status: Optional[str] = "active",
     department: Optional[str] = None,
     search: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=POSITIONS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Lista posiciones disponibles
+    Lista posiciones disponibles (paginado)
     Filtros opcionales: status, department, search
+    Paginación: limit y cursor (usar `next_cursor` de la respuesta anterior)
+    Campos: por defecto una vista resumida sin el texto del JD; `fields=full` para
+    la posición completa o una lista separada por comas (p. ej. `fields=title,metadata`).
+    El JD completo se obtiene con GET /api/positions/{id}.
+    Responde 304 si el `If-None-Match` coincide con la versión actual del catálogo.
     """
     try:
-        logger.info(f"Listando posiciones - status: {status}, department: {department}, search: {search}")
-        logger.info(f"Cache de posiciones tiene {len(position_service.positions_cache)} elementos")
-        logger.info(f"Directorio de datos: {position_service.data_dir}")
-        logger.info(f"Directorio existe: {position_service.data_dir.exists()}")
+        # ETag leído antes de armar la página: si el catálogo cambia en medio,
+        # el cliente recibe datos nuevos con un ETag viejo y revalida la próxima vez
+        headers = cache_headers(position_service.catalog_etag(), position_service.catalog_modified)
+        if is_not_modified(request, headers["ETag"], position_service.catalog_modified):
+            return not_modified(headers)
+        
+        logger.debug(
+            "Listando posiciones - status: %s, department: %s, search: %s, limit: %s, cursor: %s",
+            status, department, search, limit, bool(cursor)
+        )
         
-        positions = position_service.list_positions(
+        page = position_service.list_positions_page(
             status=status,
             department=department,
-            search=search
+            search=search,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
         )
         
-        logger.info(f"Retornando {len(positions)} posiciones")
-        return {
-            "positions": positions,
-            "total": len(positions)
-        }
+        logger.debug("Retornando %d de %d posiciones", len(page["positions"]), page["total"])
+        return JSONResponse(content=page, headers=headers)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error listando posiciones: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -567,20 +772,52 @@ async def list_positions(
         )
 
 
+@app.post("/api/positions/match", response_model=PositionMatchResponse)
+async def match_positions(
+    request: PositionMatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Búsqueda inversa: ordena las posiciones activas por similitud con un CV
+    (TF-IDF local, sin IA) y devuelve las mejores con los términos en común.
+    Sirve para elegir a qué posiciones enviar el CV al análisis completo.
+    """
+    try:
+        return await asyncio.to_thread(
+            position_matcher.match,
+            request.cvText,
+            request.topK or POSITIONS_MATCH_TOP_K
+        )
+    except Exception as e:
+        logger.error(f"Error buscando posiciones para un CV: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error interno al buscar posiciones"
+        )
+
+
 @app.get("/api/positions/{position_id}")
 async def get_position(
     position_id: str,
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    """Obtiene una posición específica por ID"""
+    """
+    Obtiene una posición específica por ID
+    Con ETag/Last-Modified; el JSON de cada versión se serializa una sola vez.
+    """
     try:
-        position = position_service.get_position(position_id)
-        if not position:
+        cached = position_service.get_position_response(position_id)
+        if cached is None:
             raise HTTPException(
                 status_code=404,
                 detail="Posición no encontrada"
             )
-        return position
+        body, etag, last_modified = cached
+        headers = cache_headers(etag, last_modified)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(headers)
+        return Response(content=body, media_type="application/json", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -610,22 +847,35 @@ async def create_position(
                 detail="Solo se aceptan archivos PDF"
             )
         
-        # Leer el PDF
-        pdf_bytes = await file.read()
-        
-        # Crear la posición
-        position = position_service.create_position_from_pdf(
-            pdf_bytes=pdf_bytes,
-            filename=file.filename,
-            title=title,
-            department=department,
-            location=location,
-            created_by=current_user['username']
-        )
+        # Volcar el PDF a disco por bloques y crear la posición desde el temporal.
+        # La extracción corre en el pool de procesos; la copia del PDF, el
+        # guardado y la analítica del JD, en un hilo: nada bloquea el event loop
+        async with spooled_upload(file) as pdf_path:
+            extraction = await extract_pdf_async(pdf_path)
+            position = await asyncio.to_thread(
+                position_service.create_position_from_pdf,
+                pdf_source=pdf_path,
+                filename=file.filename,
+                title=title,
+                department=department,
+                location=location,
+                created_by=current_user['username'],
+                text=extraction.text
+            )
         
         return position
     except HTTPException:
         raise
+    except PdfExtractionTimeout as exc:
+        logger.warning(f"Extracción de PDF cancelada por tiempo: {exc}")
+        raise HTTPException(status_code=422, detail="El PDF tardó demasiado en procesarse.")
+    except PdfPoolUnavailable as exc:
+        logger.warning(f"Pool de extracción no disponible: {exc}")
+        raise HTTPException(
+            status_code=503,
+            detail="El servicio de extracción se reinició; intenta de nuevo.",
+            headers={"Retry-After": "5"}
+        )
     except Exception as e:
         logger.error(f"Error creando posición: {str(e)}")
         raise HTTPException(
@@ -634,20 +884,25 @@ async def create_position(
         )
 
 
-@app.post("/api/positions/reload")
+@app.post("/api/positions/reload", status_code=202)
 async def reload_positions(
+    force: bool = False,
     current_user: dict = Depends(get_current_admin_user)
 ):
     """
     Recarga posiciones desde PDFs en la carpeta (solo admin)
-    Útil para actualizar posiciones después de agregar nuevos PDFs
+    Útil para actualizar posiciones después de agregar nuevos PDFs.
+    Solo se procesan PDFs nuevos o modificados; `force=true` reprocesa todos.
+    Responde de inmediato con el id del trabajo; el avance se consulta en
+    GET /api/positions/reload/{job_id}. Si ya hay una recarga en curso se
+    devuelve esa.
     """
     try:
-        created = position_service.load_pdfs_from_directory()
+        job = reload_jobs.start(force=force, requested_by=current_user.get('username'))
         return {
-            "message": f"Posiciones recargadas exitosamente",
-            "created": len(created),
-            "positions": created
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/positions/reload/{job.id}"
         }
     except Exception as e:
         logger.error(f"Error recargando posiciones: {str(e)}")
@@ -657,6 +912,21 @@ async def reload_positions(
         )
 
 
+@app.get("/api/positions/reload/{job_id}")
+async def get_reload_status(
+    job_id: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Estado de una recarga de posiciones (solo admin): avance (hechos/total,
+    archivo actual), fallos y omitidos. Al terminar incluye el reporte de la pasada.
+    """
+    job = reload_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Recarga no encontrada")
+    return job.to_dict()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -246,3 +246,40 @@ class AuditLogResponse(BaseModel):
     """Respuesta del log de auditoría"""
     entries: List[AuditLogEntry]
     total: int
+
+
+# ============================================================================
+# POSITION MATCHING SCHEMAS
+# ============================================================================
+
+class PositionMatchRequest(BaseModel):
+    """Solicitud de búsqueda inversa: posiciones activas para un CV"""
+    cvText: str = Field(
+        ...,
+        description="Texto extraído del CV en formato plano",
+        min_length=30
+    )
+    topK: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=50,
+        description="Cantidad de posiciones a devolver (por defecto POSITIONS_MATCH_TOP_K)"
+    )
+
+
+class PositionMatch(BaseModel):
+    """Posición sugerida para un CV, con su similitud y los términos en común"""
+    id: str
+    code: Optional[str] = None
+    title: Optional[str] = None
+    department: Optional[str] = None
+    location: Optional[str] = None
+    score: float = Field(..., description="Similitud coseno TF-IDF entre 0 y 1")
+    matched_terms: List[str] = Field(default_factory=list, description="Términos en común de mayor peso")
+
+
+class PositionMatchResponse(BaseModel):
+    """Posiciones activas ordenadas por similitud con el CV"""
+    matches: List[PositionMatch]
+    total_positions: int
+    took_ms: float
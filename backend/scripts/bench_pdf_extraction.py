@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extracción de PDFs: secuencial vs. paralela por rangos de páginas
+
+Extrae cada PDF con extract_text_from_pdf (un solo proceso) y con
+extract_text_async (pool de procesos, rangos de páginas en paralelo para
+documentos con >= PDF_PARALLEL_MIN_PAGES páginas), verifica que el texto
+resultante sea idéntico y reporta el speedup.
+
+Uso:
+    python scripts/bench_pdf_extraction.py [archivos.pdf ...] [--repeat 3]
+    (sin archivos usa positions/pdfs/*.pdf)
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Medir la extracción real, no la caché por hash de contenido
+os.environ["EXTRACTION_CACHE_SIZE"] = "0"
+os.environ["EXTRACTION_CACHE_DIR"] = ""
+
+from utils.pdf_parser import extract_text_from_pdf, count_pdf_pages
+from utils import pdf_pool
+
+
+def measure_sync(file_bytes: bytes, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = extract_text_from_pdf(file_bytes)
+    return (time.perf_counter() - start) / repeat, result
+
+
+async def measure_async(file_bytes: bytes, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = await pdf_pool.extract_text_async(file_bytes)
+    return (time.perf_counter() - start) / repeat, result
+
+
+async def run(paths, repeat: int):
+    # Calentar el pool para no medir el arranque de los procesos
+    pdf_pool.get_pdf_executor()
+    await asyncio.gather(*[
+        pdf_pool.extract_text_async(paths[0].read_bytes()) for _ in range(pdf_pool.PDF_WORKERS)
+    ])
+
+    print(f"Workers: {pdf_pool.PDF_WORKERS}, paralelo desde {pdf_pool.PDF_PARALLEL_MIN_PAGES} páginas")
+    print(f"{'archivo':<40} | {'págs':>5} | {'secuencial':>10} | {'paralelo':>10} | {'speedup':>7} | igual")
+    for path in paths:
+        file_bytes = path.read_bytes()
+        pages = count_pdf_pages(file_bytes)
+        sync_time, sync_result = measure_sync(file_bytes, repeat)
+        async_time, async_result = await measure_async(file_bytes, repeat)
+        same = sync_result == async_result
+        print(f"{path.name[:40]:<40} | {pages:>5} | {sync_time * 1000:>8.1f}ms | "
+              f"{async_time * 1000:>8.1f}ms | {sync_time / async_time:>6.2f}x | {'sí' if same else 'NO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=Path)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = args.files or sorted((Path(__file__).parent.parent / "positions" / "pdfs").glob("*.pdf"))
+    if not paths:
+        print("No se encontraron PDFs")
+        return
+
+    try:
+        asyncio.run(run(paths, args.repeat))
+    finally:
+        pdf_pool.shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark comparativo de backends de extracción de PDFs
+
+Para cada backend instalado (ver utils/pdf_extractors.py) extrae un corpus
+de PDFs y reporta:
+- páginas por segundo
+- memoria pico: asignaciones Python (tracemalloc, en una pasada aparte porque
+  ralentiza la ejecución) y crecimiento del RSS máximo del proceso (cada
+  backend corre en un proceso nuevo para que sea comparable; incluye la
+  memoria de librerías en C como MuPDF)
+- similitud del texto (por palabras, difflib) contra una referencia: el
+  archivo <nombre>.txt junto al PDF si existe, o el texto del backend --reference
+
+Uso:
+    python scripts/bench_pdf_extractors.py [archivos.pdf ...] [--repeat 3] [--reference pypdf2]
+    (sin archivos usa positions/pdfs/*.pdf)
+"""
+
+import os
+import sys
+import time
+import argparse
+import difflib
+import tracemalloc
+import multiprocessing
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Medir la extracción real, no la caché por hash de contenido
+os.environ["EXTRACTION_CACHE_SIZE"] = "0"
+os.environ["EXTRACTION_CACHE_DIR"] = ""
+
+from utils.pdf_extractors import available_extractors, get_extractor
+from utils.pdf_parser import count_pdf_pages, extract_text_from_pdf
+
+
+def _current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def run_backend(name: str, paths: list, repeat: int) -> dict:
+    """Se ejecuta en un proceso nuevo por backend"""
+    import resource
+
+    extractor = get_extractor(name)
+    pages = sum(count_pdf_pages(path, extractor) for path in paths)
+    baseline_rss = _current_rss_mb()
+
+    texts = {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            text, _ = extract_text_from_pdf(path, extractor=extractor)
+            texts[path] = text
+    elapsed = time.perf_counter() - start
+    # ru_maxrss está en KB en Linux
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - baseline_rss
+
+    tracemalloc.start()
+    for path in paths:
+        extract_text_from_pdf(path, extractor=extractor)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "version": extractor.version,
+        "pages_per_second": pages * repeat / elapsed if elapsed else 0.0,
+        "seconds": elapsed / repeat,
+        "python_peak_mb": peak / (1024 * 1024),
+        "rss_growth_mb": max(0.0, rss_growth),
+        "texts": texts,
+    }
+
+
+def similarity(text: str, reference: str) -> float:
+    return difflib.SequenceMatcher(None, text.split(), reference.split(), autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=Path)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference", default="pypdf2", help="backend de referencia si no hay .txt")
+    args = parser.parse_args()
+
+    paths = args.files or sorted((Path(__file__).parent.parent / "positions" / "pdfs").glob("*.pdf"))
+    paths = [str(path) for path in paths]
+    if not paths:
+        print("No se encontraron PDFs")
+        return
+
+    backends = available_extractors()
+    print(f"Corpus: {len(paths)} PDFs; backends instalados: {', '.join(backends)}")
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for name in backends:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(run_backend, (name, paths, args.repeat)))
+
+    by_name = {result["name"]: result for result in results}
+    reference = by_name.get(args.reference, results[0])
+    truths = {}
+    for path in paths:
+        truth_path = Path(path).with_suffix(".txt")
+        truths[path] = truth_path.read_text(encoding="utf-8") if truth_path.exists() else reference["texts"][path]
+    truth_label = ".txt" if any(Path(p).with_suffix(".txt").exists() for p in paths) else reference["name"]
+
+    print(f"{'backend':<10} | {'versión':<10} | {'págs/s':>8} | {'s/corpus':>8} | "
+          f"{'pico py MB':>10} | {'+RSS MB':>7} | similitud vs {truth_label}")
+    for result in results:
+        scores = [similarity(result["texts"][path], truths[path]) for path in paths]
+        print(f"{result['name']:<10} | {result['version'][:10]:<10} | {result['pages_per_second']:>8.1f} | "
+              f"{result['seconds']:>8.3f} | {result['python_peak_mb']:>10.1f} | {result['rss_growth_mb']:>7.1f} | "
+              f"{sum(scores) / len(scores):.3f} (mín {min(scores):.3f})")
+
+
+if __name__ == "__main__":
+    main()
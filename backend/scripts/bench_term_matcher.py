@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark del escaneo de términos del validador ético
+
+Compara el método anterior (texto.lower() + `término in texto` por cada
+término) contra el TermMatcher compilado, sobre un CV sintético de 100 páginas.
+
+Uso:
+    python scripts/bench_term_matcher.py [--pages 100] [--repeat 5]
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.ethical_validator import EthicalValidator
+from utils.term_matcher import TermMatcher
+
+# Vocabulario laboral neutro para construir páginas de CV
+_VOCABULARY = (
+    "desarrollo de software con python y java gestión de proyectos ágiles "
+    "liderazgo de equipos análisis de datos financieros experiencia en banca "
+    "implementación de sistemas ERP certificación PMP licenciatura en administración "
+    "maestría en finanzas responsable del área contable elaboración de estados "
+    "financieros auditoría interna cumplimiento regulatorio antigüedad de cinco años "
+    "coordinación de proveedores presupuesto anual indicadores de desempeño"
+).split()
+
+
+def build_cv(pages: int, words_per_page: int = 450, seed: int = 7) -> str:
+    """CV sintético con algunos términos sensibles distribuidos en el texto"""
+    rng = random.Random(seed)
+    sensitive = ["Edad: 35", "estado civil", "muy joven", "startup", "excelente", "Género"]
+    page_texts = []
+    for page in range(pages):
+        words = [rng.choice(_VOCABULARY) for _ in range(words_per_page)]
+        if page % 10 == 0:
+            words.insert(rng.randrange(len(words)), rng.choice(sensitive))
+        page_texts.append(" ".join(words))
+    return "\n".join(page_texts)
+
+
+def legacy_scan(text: str, term_lists) -> list:
+    """Escaneo previo: una búsqueda de subcadena por cada término"""
+    text_lower = text.lower()
+    return [term for terms in term_lists for term in terms if term in text_lower]
+
+
+def measure(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = build_cv(args.pages)
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    dictionaries = {
+        "subjective_terms": EthicalValidator.SUBJECTIVE_TERMS,
+        "personal_attributes": EthicalValidator.PERSONAL_ATTRIBUTES,
+        "bias_indicators": EthicalValidator.BIAS_INDICATORS,
+        "industry_bias_terms": EthicalValidator.INDUSTRY_BIAS_TERMS,
+    }
+
+    print(f"CV sintético: {args.pages} páginas, {len(text):,} caracteres ({size_mb:.2f} MB)")
+    print(f"{'términos':>9} | {'método':<14} | {'ms/CV':>8} | {'MB/s':>8} | coincidencias")
+
+    # Escalar el diccionario para ver cómo crece el costo con el número de términos
+    for factor in (1, 4, 16):
+        scaled = {
+            category: terms + [f"{term}{suffix}" for term in terms for suffix in range(1, factor)]
+            for category, terms in dictionaries.items()
+        }
+        term_count = sum(len(terms) for terms in scaled.values())
+        matcher = TermMatcher(scaled)
+
+        legacy_time = measure(lambda: legacy_scan(text, scaled.values()), args.repeat)
+        matcher_time = measure(lambda: matcher.scan(text), args.repeat)
+
+        print(f"{term_count:>9} | {'in + lower()':<14} | {legacy_time * 1000:>8.2f} | "
+              f"{size_mb / legacy_time:>8.1f} | {len(legacy_scan(text, scaled.values()))} términos")
+        print(f"{term_count:>9} | {'TermMatcher':<14} | {matcher_time * 1000:>8.2f} | "
+              f"{size_mb / matcher_time:>8.1f} | {len(matcher.scan(text))} ocurrencias con span")
+
+
+if __name__ == "__main__":
+    main()
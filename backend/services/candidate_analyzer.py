@@ -11,6 +11,8 @@ from anthropic import Anthropic
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from utils.logging_config import log_payload
+from services.jd_analytics import get_jd_analytics, model_family
 from models.schemas import (
     CandidateAnalysisResult,
     ObjectiveCriterion,
@@ -70,6 +72,19 @@ class CandidateAnalyzer:
         if not job_description or not job_description.strip():
             raise ValueError("No se proporcionó la descripción del puesto (Job Description)")
 
+        # Analítica del JD: la de la posición si PositionService ya la calculó
+        # (se busca por hash del texto), si no se calcula una vez para todo el lote
+        jd_analytics = get_jd_analytics(job_description)
+        job_description = jd_analytics["normalized_text"]
+        family = model_family(model_id or self.default_model)
+        if family is not None:
+            logger.debug(
+                "JD de %d tokens para %s (%s)",
+                jd_analytics["token_counts"][family],
+                family,
+                "exacto" if family in jd_analytics["token_counts_exact"] else "estimado"
+            )
+
         analyses: List[CandidateAnalysisResult] = []
 
         for candidate in candidates:
@@ -82,9 +97,9 @@ class CandidateAnalyzer:
 
                 raw_response = await self._call_ai(prompt, model_id=model_id)
                 
-                # Logging de la respuesta de IA para debugging
-                logger.info(f"✅ Respuesta de IA recibida para {candidate.filename} ({len(raw_response)} caracteres)")
-                logger.debug(f"📄 Primeros 500 chars de respuesta: {raw_response[:500]}")
+                # Logging de la respuesta de IA para debugging (formato perezoso)
+                logger.info("✅ Respuesta de IA recibida para %s (%d caracteres)", candidate.filename, len(raw_response))
+                logger.debug("📄 Primeros 500 chars de respuesta: %.500s", raw_response)
                 
                 analysis = self._parse_response(
                     raw_response=raw_response,
@@ -92,18 +107,18 @@ class CandidateAnalyzer:
                     filename=candidate.filename
                 )
                 analyses.append(analysis)
-                logger.info(f"✅ Análisis completado exitosamente para {candidate.filename}")
+                logger.info("✅ Análisis completado exitosamente para %s", candidate.filename)
             except KeyError as ke:
                 # Capturar KeyError específicamente antes de que se propague
                 error_msg = f"Error de formato en respuesta de IA: {str(ke)}"
                 error_type = "KeyError"
+                # Un solo registro con traceback: la respuesta de IA no tenía el formato JSON esperado
                 logger.error(
-                    f"❌ KeyError analizando candidato {candidate.candidateId or candidate.filename}: {str(ke)}"
+                    "❌ KeyError analizando candidato %s: %s (formato JSON inesperado en la respuesta de IA)",
+                    candidate.candidateId or candidate.filename,
+                    ke,
+                    exc_info=True
                 )
-                logger.error(f"📋 Traceback completo del KeyError:", exc_info=True)
-                # Logging adicional para diagnóstico
-                logger.error(f"🔍 Este error indica que la respuesta de IA no tenía el formato JSON esperado")
-                logger.error(f"🔍 Revisa los logs anteriores para ver la respuesta completa de la IA")
                 
                 # Crear un resultado de error específico para KeyError
                 recommendation_msg = (
@@ -137,9 +152,12 @@ class CandidateAnalyzer:
                 error_msg = str(e)
                 error_type = type(e).__name__
                 logger.error(
-                    f"Error analizando candidato {candidate.candidateId or candidate.filename}: {error_type} - {error_msg}"
+                    "Error analizando candidato %s: %s - %s",
+                    candidate.candidateId or candidate.filename,
+                    error_type,
+                    error_msg
                 )
-                logger.debug(f"Traceback completo del error: {repr(e)}", exc_info=True)
+                logger.debug("Traceback completo del error: %r", e, exc_info=True)
                 
                 # Crear un resultado de error más informativo
                 # No mencionar tamaño ya que no hay restricciones de tamaño
@@ -540,8 +558,10 @@ IMPORTANTE:
         # Los modelos modernos (GPT-4 Turbo, Claude Sonnet 4, Gemini 2.5 Pro) tienen contextos
         # suficientemente grandes para manejar CVs y JDs de cualquier tamaño razonable
         logger.info(
-            f"Analizando candidato {filename} con JD de {len(job_description)} caracteres "
-            f"y CV de {len(cv_content)} caracteres (sin restricciones de tamaño)"
+            "Analizando candidato %s con JD de %d caracteres y CV de %d caracteres (sin restricciones de tamaño)",
+            filename,
+            len(job_description),
+            len(cv_content)
         )
         
         # Usar Template en lugar de .format() para evitar problemas con llaves {}
@@ -556,19 +576,24 @@ IMPORTANTE:
             )
         except Exception as e:
             # Si hay un error, registrar información de diagnóstico
-            logger.error(f"❌ Error al construir prompt con Template: {type(e).__name__} - {str(e)}")
-            logger.error(f"🔍 JD tiene {len(job_description)} caracteres")
-            logger.error(f"🔍 CV tiene {len(cv_content)} caracteres")
-            logger.error(f"🔍 JD (primeros 500 chars): {job_description[:500]}")
-            logger.error(f"🔍 CV (primeros 500 chars): {cv_content[:500]}")
+            logger.error(
+                "❌ Error al construir prompt con Template: %s - %s (JD: %d caracteres, CV: %d caracteres)",
+                type(e).__name__,
+                e,
+                len(job_description),
+                len(cv_content)
+            )
             raise
         
-        # Logging informativo (no restrictivo)
-        final_tokens = self._estimate_tokens(final_prompt)
-        logger.debug(
-            f"Prompt final para {filename}: ~{final_tokens} tokens estimados "
-            f"(JD: ~{self._estimate_tokens(job_description)}, CV: ~{self._estimate_tokens(cv_content)})"
-        )
+        # Logging informativo (no restrictivo); solo se calcula si DEBUG está activo
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Prompt final para %s: ~%d tokens estimados (JD: ~%d, CV: ~%d)",
+                filename,
+                self._estimate_tokens(final_prompt),
+                self._estimate_tokens(job_description),
+                self._estimate_tokens(cv_content)
+            )
         
         return final_prompt
     
@@ -765,7 +790,7 @@ IMPORTANTE:
         
         # Validar que la respuesta no esté vacía
         if not raw_response or not raw_response.strip():
-            logger.error(f"Respuesta de IA vacía para candidato {candidate_id or filename}")
+            logger.error("Respuesta de IA vacía para candidato %s", candidate_id or filename)
             raise ValueError("La respuesta de IA está vacía")
         
         # Limpiar la respuesta: remover markdown code blocks si existen
@@ -813,12 +838,9 @@ IMPORTANTE:
                 # Intentar parsear
                 data = json.loads(json_str_clean)
                 
-                # LOGGING: Mostrar claves originales ANTES de normalizar
-                if isinstance(data, dict):
-                    original_keys_before = list(data.keys())
-                    logger.info(f"🔑 Claves originales del JSON (antes de normalizar): {original_keys_before}")
-                    logger.info(f"🔑 Tipos de claves: {[type(k).__name__ for k in original_keys_before]}")
-                    logger.info(f"🔑 Representación de claves: {[repr(k) for k in original_keys_before[:5]]}")
+                # LOGGING: Mostrar claves originales ANTES de normalizar (solo en DEBUG)
+                if isinstance(data, dict) and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("🔑 Claves originales del JSON (antes de normalizar): %r", list(data.keys())[:10])
                 
                 # NORMALIZAR TODAS LAS CLAVES DEL DICCIONARIO RECURSIVAMENTE INMEDIATAMENTE
                 # Esto previene KeyError por claves con formato extraño como '\n "recommendation"'
@@ -826,12 +848,11 @@ IMPORTANTE:
                     data = self._normalize_dict_keys(data)
                     
                     # LOGGING: Mostrar claves después de normalizar
-                    normalized_keys_after = list(data.keys())
-                    logger.info(f"✅ Claves normalizadas del JSON (después de normalizar): {normalized_keys_after}")
+                    logger.debug("✅ Claves normalizadas del JSON (después de normalizar): %s", list(data.keys()))
                 
             except json.JSONDecodeError as e:
-                logger.warning(f"Error parseando JSON (estrategia 1): {str(e)}")
-                logger.debug(f"JSON intentado (primeros 500 chars): {json_str[:500]}...")
+                logger.warning("Error parseando JSON (estrategia 1): %s", e)
+                logger.debug("JSON intentado (primeros 500 chars): %.500s...", json_str)
                 
                 # Estrategia 3: Intentar encontrar JSON válido buscando desde el inicio
                 # Buscar el primer { y luego encontrar el } correspondiente balanceado
@@ -859,10 +880,11 @@ IMPORTANTE:
                             if isinstance(data, dict):
                                 data = self._normalize_dict_keys(data)
                         except json.JSONDecodeError as e2:
-                            logger.warning(f"Error parseando JSON (estrategia 2): {str(e2)}")
-                            logger.warning(f"JSON intentado (primeros 1000 chars): {json_str[:1000]}...")
-                            logger.warning(f"JSON intentado (últimos 500 chars): {json_str[-500:] if len(json_str) > 500 else json_str}")
-                            logger.warning(f"Posición del error: {e2.pos if hasattr(e2, 'pos') else 'N/A'}")
+                            logger.warning(
+                                "Error parseando JSON (estrategia 2): %s (posición %s)",
+                                e2,
+                                getattr(e2, 'pos', 'N/A')
+                            )
                             
                             # Estrategia 4: Intentar reparar JSON común malformado
                             try:
@@ -895,7 +917,7 @@ IMPORTANTE:
                                     data = self._normalize_dict_keys(data)
                                     logger.info("JSON reparado exitosamente usando estrategia 4")
                             except Exception as e3:
-                                logger.warning(f"Error reparando JSON (estrategia 4): {str(e3)}")
+                                logger.warning("Error reparando JSON (estrategia 4): %s", e3)
                                 
                                 # Estrategia 5: Intentar extraer JSON de texto mixto (texto + JSON)
                                 try:
@@ -910,10 +932,9 @@ IMPORTANTE:
                                             data = self._normalize_dict_keys(data)
                                             logger.info("JSON extraído exitosamente usando estrategia 5 (bloque más grande)")
                                 except Exception as e4:
-                                    logger.warning(f"Error en estrategia 5: {str(e4)}")
-                                    logger.debug(f"Respuesta completa (primeros 2000 chars): {raw_response[:2000]}")
+                                    logger.warning("Error en estrategia 5: %s", e4)
                     else:
-                        logger.warning(f"JSON no balanceado: {brace_count} llaves abiertas sin cerrar")
+                        logger.warning("JSON no balanceado: %d llaves abiertas sin cerrar", brace_count)
         
         # Si logramos parsear el JSON, procesarlo
         if data:
@@ -927,9 +948,10 @@ IMPORTANTE:
                 data = None
             else:
                 # Logging para debugging: mostrar las claves originales antes de normalizar
-                original_keys = list(data.keys())
                 logger.debug(
-                    f"Claves originales del JSON parseado para {candidate_id or filename}: {original_keys}"
+                    "Claves originales del JSON parseado para %s: %s",
+                    candidate_id or filename,
+                    list(data.keys())
                 )
                 # La normalización ya se hizo arriba, solo validar campos
                 # Validar que tenga al menos algunos campos esperados
@@ -976,8 +998,7 @@ IMPORTANTE:
                     data = safe_data
                 except (KeyError, AttributeError, TypeError) as e:
                     # Si hay un error al iterar sobre data.items(), registrar y usar data original
-                    logger.error(f"Error iterando sobre claves del diccionario: {type(e).__name__} - {str(e)}")
-                    logger.error(f"Tipo de data: {type(data)}, Claves disponibles: {list(data.keys()) if isinstance(data, dict) else 'N/A'}")
+                    logger.error("Error iterando sobre claves del diccionario: %s - %s", type(e).__name__, e)
                     # Continuar con data original pero usando solo .get()
                     pass
                 
@@ -1117,18 +1138,22 @@ IMPORTANTE:
             except KeyError as ke:
                 # Capturar KeyError específicamente
                 logger.error(
-                    f"KeyError al procesar datos parseados para {candidate_id or filename}: {str(ke)}"
+                    "KeyError al procesar datos parseados para %s: %s (claves: %s)",
+                    candidate_id or filename,
+                    ke,
+                    list(data.keys()) if isinstance(data, dict) else 'N/A'
                 )
-                logger.error(f"Claves disponibles en data: {list(data.keys()) if isinstance(data, dict) else 'N/A'}")
-                logger.error(f"Tipo de datos: {type(data)}, Contenido: {str(data)[:500] if data else 'None'}")
                 # Continuar al fallback
                 data = None
             except (ValueError, TypeError, AttributeError) as ve:
                 # Capturar errores de tipo y valor
                 logger.error(
-                    f"Error de tipo/valor al procesar datos parseados para {candidate_id or filename}: {type(ve).__name__} - {str(ve)}"
+                    "Error de tipo/valor al procesar datos parseados para %s: %s - %s (tipo de datos: %s)",
+                    candidate_id or filename,
+                    type(ve).__name__,
+                    ve,
+                    type(data).__name__
                 )
-                logger.error(f"Tipo de datos: {type(data)}, Contenido: {str(data)[:500] if data else 'None'}")
                 # Continuar al fallback
                 data = None
             except Exception as e:
@@ -1136,30 +1161,26 @@ IMPORTANTE:
                 error_type = type(e).__name__
                 error_msg = str(e)
                 logger.error(
-                    f"Error inesperado procesando datos parseados para {candidate_id or filename}: {error_type} - {error_msg}"
+                    "Error inesperado procesando datos parseados para %s: %s - %s (tipo de datos: %s)",
+                    candidate_id or filename,
+                    error_type,
+                    error_msg,
+                    type(data).__name__
                 )
-                logger.error(f"Tipo de datos: {type(data)}, Contenido: {str(data)[:500] if data else 'None'}")
-                logger.debug(f"Traceback completo:", exc_info=True)
+                logger.debug("Traceback completo:", exc_info=True)
                 # Continuar al fallback
                 data = None
         
         # Fallback: respuesta básica cuando no se puede parsear o procesar
         if data is None:
-            # Logging detallado para diagnóstico - MEJORADO PARA VISIBILIDAD
-            logger.error("=" * 80)
-            logger.error(f"❌ ERROR: No se pudo parsear respuesta de IA para candidato: {candidate_id or filename}")
-            logger.error("=" * 80)
-            logger.error(f"📏 Longitud total de respuesta: {len(raw_response)} caracteres")
-            logger.error(f"📄 Respuesta completa de IA (primeros 3000 chars):")
-            logger.error("-" * 80)
-            logger.error(raw_response[:3000])
-            logger.error("-" * 80)
-            if len(raw_response) > 3000:
-                logger.error(f"📄 Respuesta completa de IA (últimos 1000 chars):")
-                logger.error("-" * 80)
-                logger.error(raw_response[-1000:])
-                logger.error("-" * 80)
-            logger.error("=" * 80)
+            # Un solo registro por candidato; el contenido de la respuesta se muestrea
+            # (LOG_PAYLOAD_SAMPLE_RATE) y solo se vuelca completo al spool local si está habilitado
+            logger.error(
+                "❌ No se pudo parsear respuesta de IA para candidato %s (%d caracteres)",
+                candidate_id or filename,
+                len(raw_response)
+            )
+            log_payload(logger, "ai_response", raw_response, candidate=candidate_id or filename)
             
             # Intentar extraer información parcial incluso si el JSON está malformado
             partial_data = {}
@@ -1212,7 +1233,7 @@ IMPORTANTE:
                         }]
                     )
                 except Exception as e:
-                    logger.error(f"Error construyendo resultado parcial: {str(e)}")
+                    logger.error("Error construyendo resultado parcial: %s", e)
                     # Continuar con el fallback normal
         
         return CandidateAnalysisResult(
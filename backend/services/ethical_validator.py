@@ -2,18 +2,37 @@
 Validador de principios éticos para el análisis de candidatos
 Asegura que todas las operaciones cumplan con los principios establecidos
 """
+import os
 import re
+import json
+import time
+import hashlib
 import logging
-from typing import List
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
 from models.schemas import (
     CandidateAnalysisRequest,
     CandidateAnalysisResult,
+    ObjectiveCriterion,
 )
+from utils.term_matcher import TermMatcher
+from utils.lru_cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Veredictos por CV memoizados por hash de contenido + versión de términos
+VALIDATION_CACHE_SIZE = int(os.getenv("ETHICAL_VALIDATION_CACHE_SIZE", "2048"))
+
+# Diccionarios de términos editables sin redeploy (se recargan al cambiar el archivo)
+_BACKEND_DIR = Path(__file__).parent.parent
+ETHICAL_TERMS_FILE = Path(os.getenv("ETHICAL_TERMS_FILE", str(_BACKEND_DIR / "config" / "ethical_terms.json")))
+ETHICAL_TERMS_RELOAD_INTERVAL = float(os.getenv("ETHICAL_TERMS_RELOAD_INTERVAL", "5"))
+
 
 @dataclass
 class ValidationResult:
@@ -27,6 +46,90 @@ class ValidationResult:
             self.warnings = []
 
 
+class TermDictionaryStore:
+    """
+    Diccionarios de términos cargados desde un archivo JSON local.
+    Revisa el mtime del archivo como máximo cada `check_interval` segundos; si
+    cambió, compila un TermMatcher nuevo completo y solo entonces reemplaza la
+    referencia, de modo que ninguna petición ve un buscador a medio construir.
+    Si el archivo no existe o es inválido se conservan los términos vigentes.
+    """
+    
+    def __init__(self, path: Path, defaults: Dict[str, List[str]], check_interval: float = 5.0):
+        self.path = path
+        self.defaults = defaults
+        self.check_interval = check_interval
+        self.source = "defaults"
+        self._matcher = TermMatcher(defaults)
+        self._mtime_ns: Optional[int] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+    
+    @property
+    def matcher(self) -> TermMatcher:
+        """Buscador vigente (recarga el archivo si cambió desde la última revisión)"""
+        now = time.monotonic()
+        if now >= self._next_check and self._lock.acquire(blocking=False):
+            # Si otro hilo ya está revisando, se sirve el buscador actual sin esperar
+            try:
+                self._next_check = now + self.check_interval
+                if self._current_mtime() != self._mtime_ns:
+                    self._reload_locked()
+            finally:
+                self._lock.release()
+        return self._matcher
+    
+    @property
+    def version(self) -> str:
+        return self.matcher.version
+    
+    def reload(self) -> bool:
+        """Fuerza la recarga del archivo. Devuelve True si se aplicaron términos nuevos."""
+        with self._lock:
+            return self._reload_locked()
+    
+    def _current_mtime(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def _reload_locked(self) -> bool:
+        mtime = self._current_mtime()
+        self._mtime_ns = mtime
+        if mtime is None:
+            logger.warning(f"Archivo de términos éticos no encontrado: {self.path}. Usando términos vigentes.")
+            return False
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+            if not isinstance(loaded, dict):
+                raise ValueError("el archivo debe contener un objeto {categoría: [términos]}")
+            
+            dictionaries = dict(self.defaults)
+            for category, terms in loaded.items():
+                if not isinstance(terms, list) or not all(isinstance(term, str) for term in terms):
+                    raise ValueError(f"la categoría '{category}' debe ser una lista de textos")
+                dictionaries[category] = terms
+            missing = [category for category in self.defaults if category not in loaded]
+            if missing:
+                logger.warning(f"Categorías ausentes en {self.path.name}, se usan valores por defecto: {missing}")
+            
+            matcher = TermMatcher(dictionaries)
+        except Exception as e:
+            logger.error(f"Error cargando términos éticos desde {self.path}: {e}. Se conservan los términos vigentes.")
+            return False
+        
+        previous_version = self._matcher.version
+        self._matcher = matcher  # Intercambio atómico de la referencia
+        self.source = str(self.path)
+        if matcher.version != previous_version:
+            logger.info(f"Términos éticos cargados desde {self.path.name} (versión {matcher.version})")
+        return True
+
+
 class EthicalValidator:
     """
     Valida que las solicitudes y análisis cumplan con principios éticos:
@@ -37,6 +140,8 @@ class EthicalValidator:
     5. Privacidad activa
     """
     
+    # Términos por defecto; los vigentes se cargan de ETHICAL_TERMS_FILE (ver TermDictionaryStore)
+    
     # Palabras prohibidas que indican juicios de valor
     SUBJECTIVE_TERMS = [
         "excelente", "malo", "bueno", "terrible", "perfecto",
@@ -71,11 +176,37 @@ class EthicalValidator:
         "prestigio", "reconocida", "conocida"
     ]
     
+    # Todas las listas compiladas en un buscador de una pasada (límites de palabra,
+    # insensible a mayúsculas y acentos), recargable en caliente desde el archivo
+    _term_store = TermDictionaryStore(
+        ETHICAL_TERMS_FILE,
+        defaults={
+            "subjective_terms": SUBJECTIVE_TERMS,
+            "personal_attributes": PERSONAL_ATTRIBUTES,
+            "bias_indicators": BIAS_INDICATORS,
+            "industry_bias_terms": INDUSTRY_BIAS_TERMS,
+        },
+        check_interval=ETHICAL_TERMS_RELOAD_INTERVAL,
+    )
+    
+    # Categorías que adjust_analysis elimina de cada tipo de texto
+    _RECOMMENDATION_REMOVALS = ["subjective_terms", "bias_indicators", "personal_attributes"]
+    _CRITERIA_REMOVALS = ["subjective_terms", "bias_indicators"]
+    
+    # Compartida entre instancias: los mismos CVs se validan por cada posición y reintento
+    _validation_cache = LRUCache(VALIDATION_CACHE_SIZE)
+    
+    @property
+    def terms_version(self) -> str:
+        """Versión de los diccionarios vigentes (para invalidar cachés dependientes)"""
+        return self._term_store.version
+    
     def validate_request(self, request: CandidateAnalysisRequest) -> ValidationResult:
         """
         Valida que la solicitud solo contenga información laboral válida
         """
         warnings: List[str] = []
+        matcher = self._term_store.matcher
 
         # Validar longitud mínima del job description
         if len(request.jobDescription.strip()) < 30:
@@ -90,17 +221,15 @@ class EthicalValidator:
             )
 
         for candidate in request.candidates:
-            candidate_text = f"{candidate.content}".lower()
-
-            for attr in self.PERSONAL_ATTRIBUTES:
-                if attr in candidate_text:
-                    return ValidationResult(
-                        is_valid=False,
-                        reason=f"El CV '{candidate.filename}' contiene información personal no permitida: {attr}",
-                        warnings=warnings
-                    )
+            personal_term, too_short = self._candidate_verdict(candidate.content, matcher)
+            if personal_term:
+                return ValidationResult(
+                    is_valid=False,
+                    reason=f"El CV '{candidate.filename}' contiene información personal no permitida: {personal_term}",
+                    warnings=warnings
+                )
 
-            if len(candidate.content.strip()) < 30:
+            if too_short:
                 warnings.append(
                     f"El CV '{candidate.filename}' parece tener muy poco texto para evaluar."
                 )
@@ -110,21 +239,35 @@ class EthicalValidator:
             warnings=warnings
         )
     
+    def _candidate_verdict(self, content: str, matcher: TermMatcher) -> Tuple[Optional[str], bool]:
+        """
+        Veredicto de un CV: (atributo personal encontrado o None, texto demasiado corto).
+        Se memoiza por SHA-256 del contenido y versión del diccionario de términos,
+        así los reintentos y lotes con varias posiciones no vuelven a escanear el texto.
+        """
+        key = (hashlib.sha256(content.encode("utf-8")).hexdigest(), matcher.version)
+        verdict = self._validation_cache.get(key)
+        if verdict is None:
+            personal = matcher.find_terms(content, ["personal_attributes"])["personal_attributes"]
+            verdict = (personal[0] if personal else None, len(content.strip()) < 30)
+            self._validation_cache.set(key, verdict)
+        return verdict
+    
     def validate_analysis(self, analysis: CandidateAnalysisResult) -> ValidationResult:
         """
         Valida que el análisis cumpla con principios éticos y no contenga sesgos
         """
         warnings = []
+        matcher = self._term_store.matcher
         
         # Verificar lenguaje neutral
-        recommendation_lower = analysis.recommendation.lower()
-        for term in self.SUBJECTIVE_TERMS:
-            if term in recommendation_lower:
-                return ValidationResult(
-                    is_valid=False,
-                    reason=f"El análisis contiene lenguaje subjetivo no permitido: '{term}'",
-                    warnings=warnings
-                )
+        subjective = matcher.find_terms(analysis.recommendation, ["subjective_terms"])["subjective_terms"]
+        if subjective:
+            return ValidationResult(
+                is_valid=False,
+                reason=f"El análisis contiene lenguaje subjetivo no permitido: '{subjective[0]}'",
+                warnings=warnings
+            )
         
         # Verificar que tenga criterios objetivos
         if not analysis.objective_criteria or len(analysis.objective_criteria) == 0:
@@ -134,51 +277,52 @@ class EthicalValidator:
                 warnings=warnings
             )
         
-        # Verificar que no contenga datos personales
+        # Verificar datos personales y sesgos en una sola pasada sobre el texto
         all_text = f"{analysis.recommendation} {analysis.confidence_explanation}"
-        all_text_lower = all_text.lower()
+        found = matcher.find_terms(
+            all_text,
+            ["personal_attributes", "bias_indicators", "industry_bias_terms"]
+        )
         
-        for attr in self.PERSONAL_ATTRIBUTES:
-            if attr in all_text_lower:
-                return ValidationResult(
-                    is_valid=False,
-                    reason=f"El análisis contiene referencias a atributos personales: {attr}",
-                    warnings=warnings
-                )
+        if found["personal_attributes"]:
+            return ValidationResult(
+                is_valid=False,
+                reason=f"El análisis contiene referencias a atributos personales: {found['personal_attributes'][0]}",
+                warnings=warnings
+            )
         
         # Verificar indicadores de sesgos potenciales
-        for bias_term in self.BIAS_INDICATORS:
-            if bias_term in all_text_lower:
-                warnings.append(
-                    f"Posible sesgo detectado: el término '{bias_term}' puede indicar evaluación no objetiva"
-                )
+        for bias_term in found["bias_indicators"]:
+            warnings.append(
+                f"Posible sesgo detectado: el término '{bias_term}' puede indicar evaluación no objetiva"
+            )
         
         # Verificar sesgos por industria o tipo de experiencia
-        for industry_term in self.INDUSTRY_BIAS_TERMS:
-            if industry_term in all_text_lower:
-                warnings.append(
-                    f"Posible sesgo por tipo de experiencia detectado: '{industry_term}' puede indicar discriminación por industria"
-                )
+        for industry_term in found["industry_bias_terms"]:
+            warnings.append(
+                f"Posible sesgo por tipo de experiencia detectado: '{industry_term}' puede indicar discriminación por industria"
+            )
         
         # Verificar que los criterios objetivos no contengan sesgos
         for criterion in analysis.objective_criteria:
-            criterion_text = f"{criterion.name} {criterion.value}".lower()
+            criterion_found = matcher.find_terms(
+                f"{criterion.name} {criterion.value}",
+                ["personal_attributes", "subjective_terms"]
+            )
             
             # Verificar atributos personales en criterios
-            for attr in self.PERSONAL_ATTRIBUTES:
-                if attr in criterion_text:
-                    return ValidationResult(
-                        is_valid=False,
-                        reason=f"El criterio '{criterion.name}' contiene referencias a atributos personales: {attr}",
-                        warnings=warnings
-                    )
+            if criterion_found["personal_attributes"]:
+                return ValidationResult(
+                    is_valid=False,
+                    reason=f"El criterio '{criterion.name}' contiene referencias a atributos personales: {criterion_found['personal_attributes'][0]}",
+                    warnings=warnings
+                )
             
             # Verificar términos subjetivos en criterios
-            for term in self.SUBJECTIVE_TERMS:
-                if term in criterion_text:
-                    warnings.append(
-                        f"El criterio '{criterion.name}' contiene lenguaje subjetivo: '{term}'"
-                    )
+            for term in criterion_found["subjective_terms"]:
+                warnings.append(
+                    f"El criterio '{criterion.name}' contiene lenguaje subjetivo: '{term}'"
+                )
         
         return ValidationResult(
             is_valid=True,
@@ -187,59 +331,29 @@ class EthicalValidator:
     
     def adjust_analysis(self, analysis: CandidateAnalysisResult) -> CandidateAnalysisResult:
         """
-        Ajusta un análisis para cumplir con principios éticos y eliminar sesgos
+        Ajusta un análisis para cumplir con principios éticos y eliminar sesgos.
+        Cada texto se limpia en una sola pasada con la expresión precompilada.
         """
-        # Remover términos subjetivos
-        recommendation = analysis.recommendation
-        for term in self.SUBJECTIVE_TERMS:
-            recommendation = re.sub(
-                rf'\b{term}\b',
-                '',
-                recommendation,
-                flags=re.IGNORECASE
-            )
-        
-        # Remover términos que indican sesgos
-        for bias_term in self.BIAS_INDICATORS:
-            recommendation = re.sub(
-                rf'\b{bias_term}\b',
-                '',
-                recommendation,
-                flags=re.IGNORECASE
-            )
-        
-        # Remover referencias a atributos personales
-        for attr in self.PERSONAL_ATTRIBUTES:
-            recommendation = re.sub(
-                rf'\b{attr}\b',
-                '',
-                recommendation,
-                flags=re.IGNORECASE
-            )
+        matcher = self._term_store.matcher
         
-        # Limpiar espacios múltiples
-        recommendation = re.sub(r'\s+', ' ', recommendation).strip()
+        # Remover términos subjetivos, de sesgo y atributos personales
+        recommendation = self._remove_terms(matcher, analysis.recommendation, self._RECOMMENDATION_REMOVALS)
+        confidence_explanation = self._remove_terms(
+            matcher,
+            analysis.confidence_explanation,
+            self._RECOMMENDATION_REMOVALS
+        )
         
         # Si quedó vacío, usar descripción neutral
         if not recommendation:
             recommendation = "Análisis basado en criterios objetivos disponibles"
         
-        # Limpiar criterios objetivos también
+        # Limpiar criterios objetivos también (términos subjetivos y de sesgo)
         cleaned_criteria = []
         for criterion in analysis.objective_criteria:
-            criterion_value = criterion.value
-            # Remover términos subjetivos y de sesgo de los valores
-            for term in self.SUBJECTIVE_TERMS + self.BIAS_INDICATORS:
-                criterion_value = re.sub(
-                    rf'\b{term}\b',
-                    '',
-                    criterion_value,
-                    flags=re.IGNORECASE
-                )
-            criterion_value = re.sub(r'\s+', ' ', criterion_value).strip()
+            criterion_value = self._remove_terms(matcher, criterion.value, self._CRITERIA_REMOVALS)
             
             if criterion_value:  # Solo agregar si quedó contenido
-                from models.schemas import ObjectiveCriterion
                 cleaned_criteria.append(
                     ObjectiveCriterion(
                         name=criterion.name,
@@ -250,7 +364,6 @@ class EthicalValidator:
         
         # Si no quedaron criterios, crear uno genérico
         if not cleaned_criteria:
-            from models.schemas import ObjectiveCriterion
             cleaned_criteria = [
                 ObjectiveCriterion(
                     name="Evaluación objetiva",
@@ -265,9 +378,16 @@ class EthicalValidator:
             recommendation=recommendation,
             objective_criteria=cleaned_criteria,
             confidence_level=analysis.confidence_level,
-            confidence_explanation=analysis.confidence_explanation,
+            confidence_explanation=confidence_explanation,
             missing_information=analysis.missing_information,
             ethical_compliance=True
         )
+    
+    @staticmethod
+    def _remove_terms(matcher: TermMatcher, text: str, categories: List[str]) -> str:
+        """Elimina los términos de las categorías y normaliza espacios"""
+        if not text:
+            return ""
+        return _WHITESPACE_RE.sub(' ', matcher.remove(text, categories)).strip()
 
 
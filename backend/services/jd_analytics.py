@@ -0,0 +1,130 @@
+"""
+Analítica precalculada del texto de un Job Description
+Se calcula una vez por versión del JD (SHA-256 del texto) y se guarda en
+job_description.analytics de la posición:
+- normalized_text: NFC, espacios y saltos de línea colapsados (lo que va al prompt)
+- token_counts: tokens por familia de modelos. Exactos para GPT con tiktoken si
+  está instalado (pip install tiktoken); para el resto, estimados a 1 token ≈ 4
+  caracteres como en CandidateAnalyzer. token_counts_exact indica cuáles son exactos
+- terms: frecuencia de cada término, con los tokens del índice de búsqueda
+- content_hash: SHA-256 del texto original
+El analizador recibe solo el texto del JD: lo busca por hash en una caché que
+PositionService llena con la analítica de cada posición, así no se recalcula.
+"""
+import os
+import re
+import hashlib
+import logging
+import unicodedata
+from collections import Counter
+from typing import Dict, Optional
+
+from services.position_index import tokenize
+from utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # dependencia opcional
+    tiktoken = None
+
+# Cambiar al modificar el cálculo: la analítica guardada se recalcula
+JD_ANALYTICS_VERSION = 1
+JD_ANALYTICS_CACHE_SIZE = int(os.getenv("JD_ANALYTICS_CACHE_SIZE", "512"))
+
+# Familias de modelos y su codificación de tiktoken (None = sin tokenizador local)
+MODEL_FAMILIES = {
+    "gpt": "cl100k_base",
+    "claude": None,
+    "gemini": None,
+}
+CHARS_PER_TOKEN = 4
+
+_SPACES_RE = re.compile(r"[^\S\n]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+_analytics_cache = LRUCache(JD_ANALYTICS_CACHE_SIZE)
+_encodings: Dict[str, object] = {}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def normalize_jd_text(text: str) -> str:
+    """Texto del JD sin espacios sobrantes (los PDFs dejan muchos), mismo contenido"""
+    text = unicodedata.normalize("NFC", text or "").replace("\r\n", "\n").replace("\r", "\n")
+    lines = [_SPACES_RE.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def model_family(model_id: Optional[str]) -> Optional[str]:
+    model = (model_id or "").lower()
+    return next((family for family in MODEL_FAMILIES if model.startswith(family)), None)
+
+
+def _encoding(name: str):
+    if name not in _encodings:
+        try:
+            _encodings[name] = tiktoken.get_encoding(name)
+        except Exception as e:
+            # Sin red para descargar la codificación, p. ej.: se estima
+            logger.warning(f"Codificación {name} de tiktoken no disponible ({e}); se estiman tokens")
+            _encodings[name] = None
+    return _encodings[name]
+
+
+def count_tokens(text: str) -> Dict[str, Dict]:
+    """{familia: {"tokens": n, "exact": bool}}"""
+    counts = {}
+    estimate = len(text) // CHARS_PER_TOKEN
+    for family, encoding_name in MODEL_FAMILIES.items():
+        encoding = _encoding(encoding_name) if encoding_name and tiktoken is not None else None
+        if encoding is not None:
+            counts[family] = {"tokens": len(encoding.encode(text, disallowed_special=())), "exact": True}
+        else:
+            counts[family] = {"tokens": estimate, "exact": False}
+    return counts
+
+
+def term_frequencies(text: str) -> Dict[str, int]:
+    """Frecuencia de términos (minúsculas, sin acentos ni palabras vacías)"""
+    return dict(Counter(token for _, token in tokenize(text)))
+
+
+def compute_jd_analytics(text: str) -> Dict:
+    normalized = normalize_jd_text(text)
+    counts = count_tokens(normalized)
+    return {
+        "version": JD_ANALYTICS_VERSION,
+        "content_hash": content_hash(text),
+        "normalized_text": normalized,
+        "token_counts": {family: count["tokens"] for family, count in counts.items()},
+        "token_counts_exact": [family for family, count in counts.items() if count["exact"]],
+        "terms": term_frequencies(normalized),
+    }
+
+
+def is_current(analytics: Optional[Dict], text: str, text_hash: Optional[str] = None) -> bool:
+    """True si la analítica guardada corresponde a este texto y a la versión vigente"""
+    return (
+        isinstance(analytics, dict)
+        and analytics.get("version") == JD_ANALYTICS_VERSION
+        and analytics.get("content_hash") == (text_hash or content_hash(text))
+    )
+
+
+def remember_jd_analytics(analytics: Dict) -> None:
+    """Deja la analítica de una posición a mano para get_jd_analytics"""
+    _analytics_cache.set(analytics["content_hash"], analytics)
+
+
+def get_jd_analytics(text: str) -> Dict:
+    """Analítica de un texto de JD: de la caché por hash, o calculada y guardada en ella"""
+    text_hash = content_hash(text)
+    analytics = _analytics_cache.get(text_hash)
+    if analytics is None or analytics.get("version") != JD_ANALYTICS_VERSION:
+        analytics = compute_jd_analytics(text)
+        _analytics_cache.set(text_hash, analytics)
+    return analytics
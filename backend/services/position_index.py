@@ -0,0 +1,277 @@
+"""
+Índice invertido para búsqueda de posiciones (Job Descriptions)
+- Tokens en minúsculas y sin acentos, sin palabras vacías del español/inglés
+- Ranking BM25, con mayor peso para coincidencias en el título
+- Frases entre comillas ("gerente de contraloría") con posiciones por término
+- Prefijos: el último término de la búsqueda (mientras se escribe) o "term*"
+- Actualización incremental al cargar, crear o recargar posiciones
+"""
+import re
+import math
+import bisect
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.term_matcher import fold_text
+
+_TOKEN_RE = re.compile(r"\w+")
+_QUERY_RE = re.compile(r'"([^"]*)"?|(\S+)')
+
+STOPWORDS = frozenset("""
+a al ante bajo con de del desde durante e el en entre es esta este esto hacia hasta la las le les lo
+los mas mediante para pero por que se segun sin sobre su sus tras u un una unas uno unos y o ni como cual
+and are as at be by for from in is it of on or the to with
+""".split())
+
+# Separación de posiciones entre título y cuerpo: una frase no cruza de uno al otro
+_BODY_OFFSET = 1_000_000
+# Máximo de términos del vocabulario en que se expande un prefijo
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def tokenize(text: str) -> List[Tuple[int, str]]:
+    """(posición, token) sin acentos; las palabras vacías se omiten pero cuentan posición"""
+    return [
+        (position, token)
+        for position, token in enumerate(_TOKEN_RE.findall(fold_text(text or "")))
+        if token not in STOPWORDS
+    ]
+
+
+@dataclass
+class _Posting:
+    weight: float = 0.0               # frecuencia ponderada (título x title_boost)
+    positions: List[int] = field(default_factory=list)
+
+
+@dataclass
+class _QueryPart:
+    terms: List[Tuple[int, str]]      # (posición relativa, token)
+    phrase: bool = False
+    prefix: bool = False
+
+
+class PositionIndex:
+    """
+    Índice invertido con ranking BM25.
+
+    Args:
+        title_boost: peso de una aparición en el título frente al cuerpo
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_boost: float = 3.0):
+        self.k1 = k1
+        self.b = b
+        self.title_boost = title_boost
+        self._postings: Dict[str, Dict[str, _Posting]] = {}
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_length: Dict[str, float] = {}
+        self._total_length = 0.0
+        # Vocabulario ordenado para expandir prefijos con bisect
+        self._vocabulary: List[str] = []
+        self._norm_cache: Optional[Dict[str, float]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_length)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_length
+
+    def add(self, doc_id: str, title: str, text: str) -> None:
+        """Indexa (o reindexa) un documento"""
+        title_tokens = tokenize(title)
+        body_tokens = tokenize(text)
+        postings: Dict[str, _Posting] = {}
+        for position, token in title_tokens:
+            posting = postings.setdefault(token, _Posting())
+            posting.weight += self.title_boost
+            posting.positions.append(position)
+        for position, token in body_tokens:
+            posting = postings.setdefault(token, _Posting())
+            posting.weight += 1.0
+            posting.positions.append(_BODY_OFFSET + position)
+        length = len(body_tokens) + self.title_boost * len(title_tokens)
+
+        with self._lock:
+            self._remove_locked(doc_id)
+            for token, posting in postings.items():
+                if token not in self._postings:
+                    self._postings[token] = {}
+                    bisect.insort(self._vocabulary, token)
+                self._postings[token][doc_id] = posting
+            self._doc_terms[doc_id] = set(postings)
+            self._doc_length[doc_id] = length
+            self._total_length += length
+            self._norm_cache = None
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_length.pop(doc_id)
+        self._norm_cache = None
+        for token in terms:
+            docs = self._postings[token]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._postings[token]
+                index = bisect.bisect_left(self._vocabulary, token)
+                if index < len(self._vocabulary) and self._vocabulary[index] == token:
+                    self._vocabulary.pop(index)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_length.clear()
+            self._vocabulary.clear()
+            self._total_length = 0.0
+            self._norm_cache = None
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        expansions = []
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            expansions.append(token)
+        if len(expansions) > MAX_PREFIX_EXPANSIONS:
+            # Los más frecuentes primero
+            expansions.sort(key=lambda token: len(self._postings[token]), reverse=True)
+            expansions = expansions[:MAX_PREFIX_EXPANSIONS]
+        return expansions
+
+    @staticmethod
+    def parse_query(query: str) -> List[_QueryPart]:
+        """
+        Separa la búsqueda en frases ("...") y términos sueltos. El último
+        término suelto se trata como prefijo si la búsqueda no termina en
+        espacio (el usuario sigue escribiendo), y cualquier término con "*".
+        """
+        parts: List[_QueryPart] = []
+        matches = list(_QUERY_RE.finditer(query or ""))
+        for index, match in enumerate(matches):
+            if match.group(1) is not None:
+                terms = tokenize(match.group(1))
+                if terms:
+                    base = terms[0][0]
+                    parts.append(_QueryPart([(pos - base, tok) for pos, tok in terms], phrase=len(terms) > 1))
+                continue
+            word = match.group(2)
+            tokens = tokenize(word)
+            if not tokens:
+                continue
+            parts.extend(_QueryPart([(0, token)]) for _, token in tokens)
+            still_typing = index == len(matches) - 1 and not query[-1:].isspace()
+            if word.endswith("*") or still_typing:
+                parts[-1].prefix = True
+        return parts
+
+    @staticmethod
+    def _idf(postings: Dict[str, _Posting], total_docs: int) -> float:
+        df = len(postings)
+        return math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+
+    def _norms(self) -> Dict[str, float]:
+        """Normalización BM25 por longitud de documento; se recalcula solo si el índice cambió"""
+        if self._norm_cache is None:
+            avg_length = (self._total_length / len(self._doc_length)) or 1.0
+            self._norm_cache = {
+                doc_id: self.k1 * (1 - self.b + self.b * length / avg_length)
+                for doc_id, length in self._doc_length.items()
+            }
+        return self._norm_cache
+
+    @staticmethod
+    def _has_phrase(postings: List[_Posting], offsets: List[int]) -> bool:
+        first = set(postings[0].positions)
+        for offset, posting in zip(offsets[1:], postings[1:]):
+            shifted = {position - offset for position in posting.positions}
+            first &= shifted
+            if not first:
+                return False
+        return True
+
+    def search(
+        self,
+        query: str,
+        candidates: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None
+    ) -> Optional[List[Tuple[str, float]]]:
+        """
+        Documentos que contienen todos los términos/frases de la búsqueda,
+        ordenados por puntaje BM25 (mayor primero).
+
+        Args:
+            candidates: restringe la búsqueda a estos ids (filtros previos)
+
+        Returns:
+            [(doc_id, puntaje)], o None si la búsqueda no tiene términos indexables
+        """
+        parts = self.parse_query(query)
+        if not parts:
+            return None
+
+        with self._lock:
+            total_docs = len(self._doc_length)
+            if total_docs == 0:
+                return []
+            norms = self._norms()
+
+            # 1) Documentos que cumplen cada parte (solo operaciones de conjuntos)
+            resolved: List[Tuple[_QueryPart, List[Dict[str, _Posting]], Set[str]]] = []
+            for part in parts:
+                if part.prefix:
+                    term_postings = [self._postings[token] for token in self._expand_prefix(part.terms[0][1])]
+                    docs = set().union(*term_postings) if term_postings else set()
+                else:
+                    term_postings = [self._postings.get(token) for _, token in part.terms]
+                    if any(postings is None for postings in term_postings):
+                        return []
+                    docs = set(min(term_postings, key=len))
+                    for postings in term_postings:
+                        docs.intersection_update(postings)
+                if not docs:
+                    return []
+                resolved.append((part, term_postings, docs))
+
+            # 2) Intersección, de la parte más selectiva a la menos
+            resolved.sort(key=lambda item: len(item[2]))
+            matches = set(resolved[0][2])
+            if candidates is not None:
+                matches.intersection_update(candidates)
+            for _, _, docs in resolved[1:]:
+                matches.intersection_update(docs)
+            for part, term_postings, _ in resolved:
+                if part.phrase and matches:
+                    offsets = [offset for offset, _ in part.terms]
+                    matches = {
+                        doc_id for doc_id in matches
+                        if self._has_phrase([postings[doc_id] for postings in term_postings], offsets)
+                    }
+            if not matches:
+                return []
+
+            # 3) Puntaje BM25 solo de los documentos que quedaron
+            k1_plus_1 = self.k1 + 1
+            totals = dict.fromkeys(matches, 0.0)
+            for part, term_postings, _ in resolved:
+                idfs = [self._idf(postings, total_docs) for postings in term_postings]
+                for doc_id in matches:
+                    norm = norms[doc_id]
+                    term_scores = [
+                        idf * posting.weight * k1_plus_1 / (posting.weight + norm)
+                        for postings, idf in zip(term_postings, idfs)
+                        for posting in (postings.get(doc_id),) if posting is not None
+                    ]
+                    # Prefijo: la mejor expansión; términos y frases: la suma
+                    totals[doc_id] += max(term_scores) if part.prefix else sum(term_scores)
+
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
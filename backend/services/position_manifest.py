@@ -0,0 +1,127 @@
+"""
+Manifiesto de los PDFs de posiciones ya procesados
+Guarda, junto a los JSON de posiciones, el tamaño, mtime y SHA-256 de cada PDF
+con la versión del extractor y la posición que generó. Al arrancar o recargar
+solo se extraen los PDFs nuevos o modificados; el resto se omite sin leerlos.
+También registra el resultado de la última pasada (procesados, omitidos y por qué).
+"""
+import os
+import json
+import logging
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Container, Dict, List, Optional, Tuple
+
+from utils.extraction_cache import hash_pdf_source
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "_manifest.json"
+MANIFEST_FORMAT = 1
+
+# Motivos por los que un PDF no se vuelve a procesar
+SKIP_UNCHANGED = "unchanged"                  # mismo tamaño y mtime
+SKIP_SAME_CONTENT = "same_content"            # mtime distinto pero mismo hash
+SKIP_INSUFFICIENT_TEXT = "insufficient_text"  # ya se intentó: el PDF casi no tiene texto
+
+STATUS_OK = "ok"
+STATUS_INSUFFICIENT_TEXT = "insufficient_text"
+
+
+class PdfManifest:
+    """Estado de los PDFs procesados, persistido en data_dir/_manifest.json"""
+
+    def __init__(self, data_dir: Path):
+        self.path = Path(data_dir) / MANIFEST_FILENAME
+        self.files: Dict[str, dict] = {}
+        self.last_run: Optional[dict] = None
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifiesto de PDFs ilegible ({e}); se reprocesarán todos los PDFs")
+            return
+        if data.get("format") != MANIFEST_FORMAT:
+            return
+        self.files = data.get("files", {})
+        self.last_run = data.get("last_run")
+
+    def save(self) -> None:
+        """Escritura atómica (temporal + os.replace)"""
+        data = {"format": MANIFEST_FORMAT, "files": self.files, "last_run": self.last_run}
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp_manifest_", suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_name, self.path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el manifiesto de PDFs: {e}")
+
+    def check(
+        self,
+        pdf_path: Path,
+        extractor_version: str,
+        known_ids: Container[str]
+    ) -> Tuple[Optional[str], os.stat_result, Optional[str]]:
+        """
+        Decide si un PDF debe procesarse.
+
+        Returns:
+            (motivo para omitirlo o None si hay que procesarlo, stat del archivo,
+            SHA-256 si se calculó)
+        """
+        stat = pdf_path.stat()
+        entry = self.files.get(pdf_path.name)
+        if not entry or entry.get("extractor_version") != extractor_version:
+            return None, stat, None
+        # La posición generada debe seguir existiendo
+        if entry.get("status") == STATUS_OK and entry.get("position_id") not in known_ids:
+            return None, stat, None
+
+        reason = SKIP_INSUFFICIENT_TEXT if entry.get("status") == STATUS_INSUFFICIENT_TEXT else SKIP_UNCHANGED
+        if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return reason, stat, None
+
+        # Archivo tocado (copiado, restaurado): comparar el contenido
+        digest = hash_pdf_source(pdf_path)
+        if digest != entry.get("sha256"):
+            return None, stat, digest
+        entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+        return (SKIP_SAME_CONTENT if reason == SKIP_UNCHANGED else reason), stat, digest
+
+    def record(
+        self,
+        pdf_path: Path,
+        stat: os.stat_result,
+        sha256: Optional[str],
+        extractor_version: str,
+        status: str,
+        position_id: Optional[str] = None
+    ) -> None:
+        self.files[pdf_path.name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256 or hash_pdf_source(pdf_path),
+            "extractor_version": extractor_version,
+            "status": status,
+            "position_id": position_id,
+            "processed_at": datetime.utcnow().isoformat(),
+        }
+
+    def forget(self, name: str) -> bool:
+        """Quita un PDF borrado del manifiesto; True si estaba"""
+        return self.files.pop(name, None) is not None
+
+    def prune(self, present: List[str]) -> List[str]:
+        """Quita del manifiesto los PDFs que ya no están en la carpeta"""
+        present = set(present)
+        removed = [name for name in self.files if name not in present]
+        for name in removed:
+            del self.files[name]
+        return removed
@@ -0,0 +1,180 @@
+"""
+Búsqueda inversa: posiciones activas que mejor encajan con un CV
+Matriz TF-IDF del catálogo en NumPy, guardada por columnas (término -> posiciones),
+armada con la frecuencia de términos precalculada de cada JD (services.jd_analytics)
+más el título con peso extra. Se reconstruye solo cuando cambia el contenido
+del catálogo (PositionService.content_version), no con cada uso.
+Un CV se puntúa contra todas las posiciones (similitud coseno) en milisegundos y
+sin llamar a la IA; al análisis completo se envían solo las mejores.
+"""
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.jd_analytics import get_jd_analytics
+from services.position_index import tokenize
+from services.position_service import PositionService, position_service
+
+logger = logging.getLogger(__name__)
+
+POSITIONS_MATCH_TOP_K = int(os.getenv("POSITIONS_MATCH_TOP_K", "10"))
+POSITIONS_MATCH_MAX_TOP_K = 50
+# Una aparición en el título cuenta como tantas en el texto del JD
+POSITIONS_MATCH_TITLE_WEIGHT = float(os.getenv("POSITIONS_MATCH_TITLE_WEIGHT", "3.0"))
+# Términos en común que se devuelven por posición (los de mayor aporte)
+MATCHED_TERMS_LIMIT = 15
+
+_SUMMARY_FIELDS = ("id", "code", "title", "department", "location")
+
+
+@dataclass
+class _CatalogMatrix:
+    """Matriz TF-IDF normalizada por fila, en formato disperso por columnas (CSC)"""
+    version: int
+    positions: List[Dict]           # resumen de cada fila
+    terms: List[str]                # columna -> término
+    vocabulary: Dict[str, int]      # término -> columna
+    idf: np.ndarray                 # (términos,)
+    indptr: np.ndarray              # (términos + 1,) inicio de cada columna en rows/weights
+    rows: np.ndarray                # (nnz,) fila de cada peso
+    weights: np.ndarray             # (nnz,) tf-idf normalizado
+
+
+def _tf_weight(counts: np.ndarray) -> np.ndarray:
+    """TF sublineal: 1 + log(tf)"""
+    return 1.0 + np.log(counts)
+
+
+class PositionMatcher:
+    """Ranking de posiciones activas para un texto de CV"""
+
+    def __init__(self, service: PositionService, title_weight: float = POSITIONS_MATCH_TITLE_WEIGHT):
+        self.service = service
+        self.title_weight = title_weight
+        self._matrix: Optional[_CatalogMatrix] = None
+        self._build_lock = threading.Lock()
+
+    def _position_terms(self, position: Dict) -> Dict[str, float]:
+        job_description = position.get('job_description') or {}
+        analytics = job_description.get('analytics')
+        if not isinstance(analytics, dict) or 'terms' not in analytics:
+            # Posición sin analítica guardada (p. ej. leída de una base anterior)
+            analytics = get_jd_analytics(job_description.get('raw_text') or '')
+        terms: Dict[str, float] = dict(analytics['terms'])
+        for _, token in tokenize(position.get('title') or ''):
+            terms[token] = terms.get(token, 0) + self.title_weight
+        return terms
+
+    def _build(self, version: int) -> _CatalogMatrix:
+        started = time.perf_counter()
+        positions = self.service.list_positions(status="active")
+        vocabulary: Dict[str, int] = {}
+        summaries, row_index, col_index, counts = [], [], [], []
+        for row, position in enumerate(positions):
+            for term, count in self._position_terms(position).items():
+                row_index.append(row)
+                col_index.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+            summaries.append({field: position.get(field) for field in _SUMMARY_FIELDS})
+
+        n_docs, n_terms = len(summaries), len(vocabulary)
+        rows = np.asarray(row_index, dtype=np.int32)
+        cols = np.asarray(col_index, dtype=np.int32)
+        # IDF suavizado (como scikit-learn): un término en todas las posiciones pesa 1
+        df = np.bincount(cols, minlength=n_terms)
+        idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+        weights = _tf_weight(np.asarray(counts, dtype=np.float64)) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_docs))
+        if weights.size:
+            weights /= norms[rows]
+
+        # Ordenar por columna: los pesos de un término quedan contiguos
+        order = np.argsort(cols, kind="stable")
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=n_terms), out=indptr[1:])
+
+        matrix = _CatalogMatrix(
+            version=version,
+            positions=summaries,
+            terms=list(vocabulary),
+            vocabulary=vocabulary,
+            idf=idf,
+            indptr=indptr,
+            rows=rows[order],
+            weights=weights[order].astype(np.float32),
+        )
+        logger.info(
+            f"Matriz de matching: {n_docs} posiciones activas, {n_terms} términos, "
+            f"{weights.size} pesos en {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return matrix
+
+    def matrix(self) -> _CatalogMatrix:
+        """Matriz vigente; se reconstruye si cambió el contenido del catálogo"""
+        matrix = self._matrix
+        version = self.service.content_version
+        if matrix is not None and matrix.version == version:
+            return matrix
+        with self._build_lock:
+            matrix = self._matrix
+            if matrix is None or matrix.version != version:
+                # La versión se lee antes de listar: un cambio en medio fuerza otra reconstrucción
+                matrix = self._build(version)
+                self._matrix = matrix
+        return matrix
+
+    def match(self, cv_text: str, top_k: int = POSITIONS_MATCH_TOP_K) -> Dict:
+        """
+        Posiciones activas ordenadas por similitud con el CV.
+
+        Returns:
+            {"matches": [{..., "score", "matched_terms"}], "total_positions", "took_ms"}
+        """
+        started = time.perf_counter()
+        matrix = self.matrix()
+        top_k = max(1, min(top_k, POSITIONS_MATCH_MAX_TOP_K))
+        result = {"matches": [], "total_positions": len(matrix.positions)}
+
+        counts = Counter(token for _, token in tokenize(cv_text))
+        known = [(matrix.vocabulary[term], count) for term, count in counts.items() if term in matrix.vocabulary]
+        if known:
+            cols = np.fromiter((col for col, _ in known), dtype=np.int64, count=len(known))
+            query = _tf_weight(np.fromiter((count for _, count in known), dtype=np.float64, count=len(known)))
+            query *= matrix.idf[cols]
+            query /= np.linalg.norm(query)
+
+            # Pesos de las columnas del CV: scores = M[:, cols] @ query
+            starts = matrix.indptr[cols]
+            lengths = matrix.indptr[cols + 1] - starts
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            hit_rows = matrix.rows[offsets]
+            hit_cols = np.repeat(cols, lengths)
+            contributions = matrix.weights[offsets] * np.repeat(query, lengths)
+            scores = np.bincount(hit_rows, weights=contributions, minlength=len(matrix.positions))
+
+            candidates = np.flatnonzero(scores > 0)
+            if candidates.size > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            # Mayor similitud primero; empates por id
+            ranked = sorted(candidates.tolist(), key=lambda row: (-scores[row], matrix.positions[row]["id"]))
+            for row in ranked:
+                mask = hit_rows == row
+                term_order = np.argsort(-contributions[mask], kind="stable")[:MATCHED_TERMS_LIMIT]
+                result["matches"].append({
+                    **matrix.positions[row],
+                    "score": round(float(scores[row]), 4),
+                    "matched_terms": [matrix.terms[col] for col in hit_cols[mask][term_order]],
+                })
+
+        result["took_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+
+# Instancia global
+position_matcher = PositionMatcher(position_service)
@@ -0,0 +1,191 @@
+"""
+Recarga de posiciones en segundo plano
+POST /api/positions/reload crea un trabajo y responde de inmediato con su id.
+El trabajo extrae los PDFs nuevos o modificados en paralelo en el pool de
+procesos (utils.pdf_pool), reporta su avance (hechos/total, archivos en curso,
+fallos) y al terminar publica todas las posiciones de una vez en el cache.
+Solo corre un trabajo a la vez; los últimos RELOAD_JOBS_HISTORY se conservan.
+"""
+import os
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.position_service import PositionService, position_service
+from utils.pdf_pool import extract_pdf_async, PDF_WORKERS
+
+logger = logging.getLogger(__name__)
+
+RELOAD_JOBS_HISTORY = int(os.getenv("RELOAD_JOBS_HISTORY", "20"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+@dataclass
+class ReloadJob:
+    """Estado de una recarga de posiciones"""
+    id: str
+    force: bool
+    requested_by: Optional[str] = None
+    status: str = JOB_QUEUED
+    total: int = 0
+    done: int = 0
+    current_file: Optional[str] = None
+    in_progress: List[str] = field(default_factory=list)
+    failures: List[Dict] = field(default_factory=list)
+    skipped: List[Dict] = field(default_factory=list)
+    created: int = 0
+    error: Optional[str] = None
+    report: Optional[Dict] = None
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "force": self.force,
+            "requested_by": self.requested_by,
+            "progress": {
+                "done": self.done,
+                "total": self.total,
+                "current_file": self.current_file,
+                "in_progress": list(self.in_progress),
+            },
+            "failures": list(self.failures),
+            "skipped": list(self.skipped),
+            "created": self.created,
+            "error": self.error,
+            "report": self.report,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ReloadJobManager:
+    """Lanza y registra trabajos de recarga sobre un PositionService"""
+
+    def __init__(self, service: PositionService, history: int = RELOAD_JOBS_HISTORY):
+        self.service = service
+        self.history = history
+        self._jobs: "OrderedDict[str, ReloadJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def get(self, job_id: str) -> Optional[ReloadJob]:
+        return self._jobs.get(job_id)
+
+    def running(self) -> Optional[ReloadJob]:
+        return next((job for job in self._jobs.values() if not job.finished), None)
+
+    def start(self, force: bool = False, requested_by: Optional[str] = None) -> ReloadJob:
+        """
+        Crea un trabajo y lo lanza en el event loop actual. Si ya hay uno en
+        curso se devuelve ese (no se corren dos recargas a la vez).
+        """
+        active = self.running()
+        if active is not None:
+            return active
+
+        job = ReloadJob(id=uuid.uuid4().hex[:12], force=force, requested_by=requested_by)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.finished:
+                break
+            self._jobs.pop(oldest_id)
+            self._tasks.pop(oldest_id, None)
+        self._tasks[job.id] = asyncio.create_task(self._run(job))
+        return job
+
+    async def _extract(self, job: ReloadJob, slots: asyncio.Semaphore, pdf_file: Path, stat, digest):
+        """Extrae un PDF en el pool; devuelve (ruta, stat, sha256, texto o None, error o None)"""
+        async with slots:
+            job.in_progress.append(pdf_file.name)
+            try:
+                extraction = await extract_pdf_async(pdf_file)
+                return pdf_file, stat, digest, extraction.text, None
+            except Exception as e:
+                return pdf_file, stat, digest, None, str(e) or type(e).__name__
+            finally:
+                job.in_progress.remove(pdf_file.name)
+
+    async def _run(self, job: ReloadJob) -> None:
+        service = self.service
+        job.status = JOB_RUNNING
+        job.started_at = datetime.utcnow().isoformat()
+        report = {
+            "started_at": job.started_at,
+            "directory": str(service.pdfs_dir),
+            "job_id": job.id,
+            "processed": [],
+            "skipped": [],
+            "errors": [],
+            "removed": []
+        }
+        try:
+            pdf_files = sorted(service.pdfs_dir.glob("*.pdf")) if service.pdfs_dir.exists() else []
+            to_process, skipped = await asyncio.to_thread(service.plan_pdf_reload, pdf_files, job.force)
+            job.skipped = skipped
+            report["skipped"] = list(skipped)
+            job.total = len(to_process)
+            logger.info(f"Recarga {job.id}: {job.total} PDFs a extraer, {len(skipped)} sin cambios")
+
+            # A lo sumo PDF_WORKERS extracciones en curso: el resto espera aquí,
+            # sin ocupar la cola del pool que comparten las subidas de CVs
+            slots = asyncio.Semaphore(max(1, PDF_WORKERS))
+            tasks = [
+                asyncio.create_task(self._extract(job, slots, pdf_file, stat, digest))
+                for pdf_file, stat, digest in to_process
+            ]
+            extracted = []
+            for task in asyncio.as_completed(tasks):
+                pdf_file, stat, digest, text, error = await task
+                job.done += 1
+                job.current_file = pdf_file.name
+                if error is not None:
+                    logger.error(f"Recarga {job.id}: error extrayendo {pdf_file.name}: {error}")
+                    failure = {"file": pdf_file.name, "error": error}
+                    job.failures.append(failure)
+                    report["errors"].append(failure)
+                    continue
+                extracted.append((pdf_file, stat, digest, text))
+            # Mismo orden que una recarga síncrona
+            extracted.sort(key=lambda item: item[0].name)
+
+            # Publicar todo junto: cache, índices, store y manifiesto
+            created = await asyncio.to_thread(
+                service.commit_pdf_reload, extracted, report, pdf_files
+            )
+            job.created = len(created)
+            job.skipped = list(report["skipped"])
+            job.report = report
+            job.status = JOB_COMPLETED
+        except Exception as e:
+            logger.error(f"Recarga {job.id} falló: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = JOB_FAILED
+        finally:
+            job.current_file = None
+            job.finished_at = datetime.utcnow().isoformat()
+            logger.info(
+                f"Recarga {job.id} {job.status}: {job.created} posiciones, "
+                f"{len(job.failures)} fallos, {len(job.skipped)} omitidos"
+            )
+
+
+# Instancia global
+reload_jobs = ReloadJobManager(position_service)
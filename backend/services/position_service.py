@@ -4,12 +4,25 @@ Lee PDFs de una carpeta y los convierte en posiciones disponibles
 """
 import os
 import json
+import shutil
+import copy
+import uuid
+import base64
+import bisect
+import hashlib
 import logging
-from typing import List, Optional, Dict
+import threading
+from typing import Any, List, Optional, Dict, Set, Tuple
 from datetime import datetime
 from pathlib import Path
 
-from utils.pdf_parser import extract_text_from_pdf
+from utils.pdf_parser import extract_text_from_pdf, PdfSource, EXTRACTOR_VERSION
+from services.position_index import PositionIndex
+from services.position_manifest import PdfManifest, STATUS_OK, STATUS_INSUFFICIENT_TEXT
+from services.position_stats import PositionStatsStore
+from services.position_store import create_position_store, fts_query, JsonPositionStore
+from services.jd_analytics import compute_jd_analytics, is_current as analytics_is_current, remember_jd_analytics
+from utils.lru_cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +31,138 @@ _BACKEND_DIR = Path(__file__).parent.parent
 POSITIONS_DATA_DIR = Path(os.getenv("POSITIONS_DATA_DIR", str(_BACKEND_DIR / "positions" / "data")))
 POSITIONS_PDFS_DIR = Path(os.getenv("POSITIONS_PDFS_DIR", str(_BACKEND_DIR / "positions" / "pdfs")))
 
+# Paginación del listado de posiciones
+POSITIONS_PAGE_SIZE = int(os.getenv("POSITIONS_PAGE_SIZE", "50"))
+POSITIONS_MAX_PAGE_SIZE = int(os.getenv("POSITIONS_MAX_PAGE_SIZE", "200"))
+
+# Posiciones con su JSON ya serializado en memoria (GET /api/positions/{id})
+POSITIONS_RESPONSE_CACHE_SIZE = int(os.getenv("POSITIONS_RESPONSE_CACHE_SIZE", "256"))
+
+# Vista resumida del listado: lo que necesita el selector, sin el texto del JD
+POSITION_SUMMARY_FIELDS = (
+    "id", "code", "title", "department", "location", "status",
+    "word_count", "last_used", "candidates_analyzed",
+)
+# Campos de la vista que viven dentro de job_description / statistics
+_NESTED_FIELDS = {
+    "word_count": ("job_description", "word_count"),
+    "last_used": ("statistics", "last_used"),
+    "times_used": ("statistics", "times_used"),
+    "candidates_analyzed": ("statistics", "candidates_analyzed"),
+}
+_TOP_LEVEL_FIELDS = {
+    "id", "code", "title", "department", "location", "status", "created_at", "created_by",
+    "updated_at", "updated_by", "job_description", "metadata", "statistics",
+}
+FULL_VIEW = "full"
+# Analítica del JD de uso interno (voluminosa): no se envía al cliente
+_PRIVATE_ANALYTICS_FIELDS = ("normalized_text", "terms")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Campos pedidos en `fields=`: vacío = vista resumida, "full" = posición completa
+    (None), o una lista separada por comas. El id siempre se incluye.
+
+    Raises:
+        ValueError: si algún campo no existe
+    """
+    if not fields or not fields.strip():
+        return POSITION_SUMMARY_FIELDS
+    if fields.strip() == FULL_VIEW:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in _TOP_LEVEL_FIELDS and name not in _NESTED_FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
+def public_position(position: Dict) -> Dict:
+    """La posición tal como se entrega al cliente: sin la analítica interna del JD"""
+    job_description = position.get('job_description')
+    analytics = job_description.get('analytics') if isinstance(job_description, dict) else None
+    if not isinstance(analytics, dict):
+        return position
+    public_analytics = {key: value for key, value in analytics.items() if key not in _PRIVATE_ANALYTICS_FIELDS}
+    return {**position, 'job_description': {**job_description, 'analytics': public_analytics}}
+
+
+def project_position(position: Dict, fields: Optional[Tuple[str, ...]]) -> Dict:
+    """Proyección de una posición a los campos indicados (None = completa)"""
+    if fields is None:
+        return public_position(position)
+    projected = {}
+    for name in fields:
+        if name == 'job_description':
+            projected[name] = public_position(position).get(name)
+        elif name in _NESTED_FIELDS:
+            parent, key = _NESTED_FIELDS[name]
+            projected[name] = (position.get(parent) or {}).get(key)
+        else:
+            projected[name] = position.get(name)
+    return projected
+
+
+def encode_cursor(order: str, key: List[Any]) -> str:
+    """Cursor opaco: clave de orden del último elemento entregado"""
+    payload = json.dumps({"o": order, "k": key}, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[Any]]:
+    """
+    Raises:
+        ValueError: si el cursor no es válido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        order, key = payload["o"], payload["k"]
+    except Exception:
+        raise ValueError("Cursor inválido")
+    expected = {"rank": (int, float), "recent": str}.get(order)
+    if (
+        expected is None or not isinstance(key, list) or len(key) != 2
+        or not isinstance(key[0], expected) or not isinstance(key[1], str)
+    ):
+        raise ValueError("Cursor inválido")
+    return order, key
+
+
+def serialize_json(data: Any) -> bytes:
+    """JSON compacto en UTF-8, el mismo formato que JSONResponse"""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def position_modified_at(position: Dict) -> Optional[datetime]:
+    """Último cambio de una posición: edición o último uso"""
+    stamps = [
+        _parse_timestamp(position.get('updated_at')),
+        _parse_timestamp(position.get('created_at')),
+        _parse_timestamp((position.get('statistics') or {}).get('last_used')),
+    ]
+    stamps = [stamp.replace(tzinfo=None) for stamp in stamps if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+# Texto mínimo para considerar que un PDF es un JD
+MIN_JD_TEXT_CHARS = 50
+
+
+def has_enough_text(text: Optional[str]) -> bool:
+    return bool(text) and len(text.strip()) >= MIN_JD_TEXT_CHARS
+
+
 # Asegurar que las carpetas existan
 POSITIONS_DATA_DIR.mkdir(parents=True, exist_ok=True)
 POSITIONS_PDFS_DIR.mkdir(parents=True, exist_ok=True)
@@ -26,37 +171,228 @@ POSITIONS_PDFS_DIR.mkdir(parents=True, exist_ok=True)
 class PositionService:
     """Servicio para gestionar posiciones y Job Descriptions"""
     
-    def __init__(self, auto_load_pdfs: bool = True):
+    def __init__(self, auto_load_pdfs: bool = True, load_on_init: bool = True):
+        """
+        Args:
+            auto_load_pdfs: Importar los PDFs nuevos o modificados al cargar
+            load_on_init: Cargar en el constructor; con False se llama a load()
+                después (la app lo hace en segundo plano desde el lifespan)
+        """
         self.data_dir = POSITIONS_DATA_DIR
         self.pdfs_dir = POSITIONS_PDFS_DIR
+        # JSON por posición (por defecto) o SQLite (POSITIONS_STORE=sqlite)
+        self.store = create_position_store(self.data_dir)
+        # Con JSON, todas las posiciones en memoria; con SQLite, solo las ya leídas
         self.positions_cache: Dict[str, Dict] = {}
+        # Índice de búsqueda (título + texto del JD), actualizado junto con el cache
+        self.search_index = PositionIndex()
+        # Índices secundarios: código -> id, status/departamento -> ids
+        self._by_code: Dict[str, str] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._by_department: Dict[str, Set[str]] = {}
+        # Vista por último uso: claves (last_used, id) en orden ascendente
+        self._recent: List[Tuple[str, str]] = []
+        # Valores indexados de cada posición (el dict puede modificarse en sitio)
+        self._indexed: Dict[str, Tuple[Optional[str], Optional[str], Optional[str], Tuple[str, str]]] = {}
+        # PDFs ya procesados (tamaño, mtime, hash): solo se extraen los nuevos o modificados
+        self.manifest = PdfManifest(self.data_dir)
+        # Estadísticas de uso: en memoria, guardadas en lote fuera del JSON de cada posición
+        self.stats_store = PositionStatsStore(
+            self.data_dir,
+            sink=self.store.save_statistics if self.store.queryable else None
+        )
+        # Resultado de la última pasada de load_pdfs_from_directory
+        self.last_reload_report: Optional[Dict] = self.manifest.last_run
+        self.auto_load_pdfs = auto_load_pdfs
+        # La carga puede correr en un hilo mientras se atienden peticiones:
+        # el lock protege cache e índices; la extracción de PDFs va fuera de él
+        self._lock = threading.RLock()
+        # Serializa las pasadas sobre PDFs (manifiesto y escritura de JSON)
+        self._pdf_lock = threading.Lock()
+        self.loading = False
+        self.ready = False
+        self.load_error: Optional[str] = None
+        # Versiones para los ETag: la del catálogo cambia con cualquier posición;
+        # el epoch distingue los contadores de cada arranque
+        self._epoch = uuid.uuid4().hex[:8]
+        self.catalog_version = 0
+        self.catalog_modified = datetime.utcnow()
+        # Solo altas, bajas y ediciones (no el uso): para índices derivados del texto
+        self.content_version = 0
+        self._versions: Dict[str, int] = {}
+        # (id, versión) -> (JSON serializado, ETag, última modificación)
+        self._serialized = LRUCache(POSITIONS_RESPONSE_CACHE_SIZE)
         
+        if load_on_init:
+            self.load()
+    
+    def load(self):
+        """
+        Carga las posiciones guardadas y después los PDFs nuevos o modificados.
+        Mientras corre, `loading` es True y los listados devuelven lo ya cargado.
+        `ready` queda en True solo si la carga termina sin error; si falla, el
+        error queda en `load_error` y el servicio sigue con el cache vacío.
+        """
+        self.loading = True
+        self.load_error = None
+        started = datetime.utcnow()
         try:
             self._load_positions()
             
             # Cargar automáticamente PDFs si están disponibles
-            if auto_load_pdfs:
+            if self.auto_load_pdfs:
                 self._auto_load_pdfs()
         except Exception as e:
             logger.error(f"Error inicializando PositionService: {e}", exc_info=True)
+            self.load_error = str(e)
             # Continuar con cache vacío en lugar de fallar completamente
-            self.positions_cache = {}
+            with self._lock:
+                self.positions_cache = {}
+                self.search_index.clear()
+                self._clear_indexes()
+        finally:
+            self.loading = False
+            self.ready = self.load_error is None
+            # El listado incluye `loading`: invalida los ETag emitidos durante la carga
+            self._touch()
+        if self.ready:
+            elapsed = (datetime.utcnow() - started).total_seconds()
+            logger.info(f"Posiciones listas: {self.count_positions()} en {elapsed:.2f}s")
+    
+    def count_positions(self) -> int:
+        return self.store.count() if self.store.queryable else len(self.positions_cache)
+    
+    def _known_ids(self):
+        """Contenedor de ids existentes (para `in`)"""
+        return self.store if self.store.queryable else self.positions_cache.keys()
+    
+    def _touch(self, position_id: Optional[str] = None, content: bool = True):
+        """
+        Registra un cambio: nueva versión del catálogo (y de la posición).
+        `content=False` para cambios que solo afectan las estadísticas de uso.
+        """
+        with self._lock:
+            self.catalog_version += 1
+            if content:
+                self.content_version += 1
+            self.catalog_modified = datetime.utcnow()
+            if position_id is not None:
+                self._versions[position_id] = self._versions.get(position_id, 0) + 1
+    
+    def _put_position(self, position: Dict, changed: bool = True):
+        """
+        Agrega o reemplaza una posición en el cache, el índice de búsqueda y los
+        índices secundarios. `changed=False` para lecturas de la base (SQLite),
+        que no cambian el catálogo.
+        """
+        self._apply_stored_statistics(position)
+        self._ensure_analytics(position)
+        with self._lock:
+            self.positions_cache[position['id']] = position
+            if changed:
+                self._touch(position['id'])
+            # Con SQLite, filtros y búsqueda se resuelven en la base
+            if self.store.queryable:
+                return
+            self.search_index.add(
+                position['id'],
+                position.get('title', ''),
+                position.get('job_description', {}).get('raw_text', '')
+            )
+            self._index_position(position)
+    
+    def _ensure_analytics(self, position: Dict) -> bool:
+        """
+        Calcula la analítica del JD (ver services.jd_analytics) si falta o es de
+        otro texto; True si la calculó y conviene guardar la posición.
+        """
+        job_description = position.get('job_description')
+        if not isinstance(job_description, dict):
+            return False
+        text = job_description.get('raw_text') or ''
+        computed = not analytics_is_current(job_description.get('analytics'), text)
+        if computed:
+            job_description['analytics'] = compute_jd_analytics(text)
+        # Para el analizador, que recibe solo el texto del JD
+        remember_jd_analytics(job_description['analytics'])
+        return computed
+    
+    def _apply_stored_statistics(self, position: Dict) -> Dict:
+        """Las estadísticas guardadas aparte (aún no escritas) tienen prioridad sobre las de la posición"""
+        stats = self.stats_store.get(position['id'])
+        if stats is not None:
+            position['statistics'] = stats
+        return position
+    
+    def _remove_position(self, position_id: str):
+        """Quita una posición del cache y de todos los índices"""
+        with self._lock:
+            self.positions_cache.pop(position_id, None)
+            self.stats_store.discard(position_id)
+            self._touch(position_id)
+            self.search_index.remove(position_id)
+            self._unindex_position(position_id)
+    
+    def _clear_indexes(self):
+        self._serialized.clear()
+        self._by_code.clear()
+        self._by_status.clear()
+        self._by_department.clear()
+        self._recent.clear()
+        self._indexed.clear()
+    
+    def _unindex_position(self, position_id: str):
+        indexed = self._indexed.pop(position_id, None)
+        if indexed is None:
+            return
+        code, status, department, recent_key = indexed
+        if code is not None and self._by_code.get(code) == position_id:
+            del self._by_code[code]
+        for index, value in ((self._by_status, status), (self._by_department, department)):
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(position_id)
+                if not ids:
+                    del index[value]
+        i = bisect.bisect_left(self._recent, recent_key)
+        if i < len(self._recent) and self._recent[i] == recent_key:
+            self._recent.pop(i)
+    
+    def _index_position(self, position: Dict):
+        """Actualiza los índices secundarios de una posición (código, status, departamento, último uso)"""
+        position_id = position['id']
+        self._unindex_position(position_id)
+        code, status, department = position.get('code'), position.get('status'), position.get('department')
+        recent_key = (self._last_used(position), position_id)
+        if code is not None:
+            self._by_code[code] = position_id
+        if status is not None:
+            self._by_status.setdefault(status, set()).add(position_id)
+        if department is not None:
+            self._by_department.setdefault(department, set()).add(position_id)
+        bisect.insort(self._recent, recent_key)
+        self._indexed[position_id] = (code, status, department, recent_key)
     
     def _load_positions(self):
-        """Carga todas las posiciones desde archivos JSON"""
-        self.positions_cache = {}
-        if not self.data_dir.exists():
-            logger.warning(f"Directorio de posiciones no existe: {self.data_dir}")
+        """
+        Carga todas las posiciones desde archivos JSON. Con SQLite solo abre la
+        base (la primera vez importa los JSON existentes) y no precarga nada.
+        """
+        with self._lock:
+            self.positions_cache = {}
+            self.search_index.clear()
+            self._clear_indexes()
+        
+        if self.store.queryable:
+            json_store = JsonPositionStore(self.data_dir)
+            self.store.migrate_from(json_store, PositionStatsStore(self.data_dir).snapshot())
             return
         
-        for json_file in self.data_dir.glob("position_*.json"):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    position = json.load(f)
-                    self.positions_cache[position['id']] = position
-                logger.info(f"Cargada posición: {position.get('title', 'Unknown')}")
-            except Exception as e:
-                logger.error(f"Error cargando {json_file}: {e}")
+        for position in self.store.load_all():
+            # Posiciones guardadas sin analítica (o con la de otro texto): se guarda una vez
+            if self._ensure_analytics(position):
+                self.store.save(position)
+            self._put_position(position)
     
     def _auto_load_pdfs(self):
         """Carga automáticamente PDFs de la carpeta al iniciar"""
@@ -72,13 +408,50 @@ class PositionService:
         logger.info(f"Encontrados {len(pdf_files)} PDFs. Procesando automáticamente...")
         try:
             created = self.load_pdfs_from_directory(self.pdfs_dir)
+            skipped = len(self.last_reload_report.get('skipped', [])) if self.last_reload_report else 0
             if created:
-                logger.info(f"✅ {len(created)} posiciones cargadas automáticamente desde PDFs")
+                logger.info(f"✅ {len(created)} posiciones cargadas automáticamente desde PDFs ({skipped} sin cambios)")
             else:
-                logger.info("No se crearon nuevas posiciones (posiblemente ya existían)")
+                logger.info(f"No se crearon nuevas posiciones ({skipped} PDFs sin cambios)")
         except Exception as e:
             logger.error(f"Error al cargar PDFs automáticamente: {e}")
     
+    @staticmethod
+    def _last_used(position: Dict) -> str:
+        return (position.get('statistics') or {}).get('last_used') or ''
+    
+    def _candidate_ids(self, status: Optional[str], department: Optional[str]) -> Optional[Set[str]]:
+        """Ids que cumplen los filtros (None = sin filtros); el conjunto devuelto es de solo lectura"""
+        filters = []
+        if status:
+            filters.append(self._by_status.get(status, set()))
+        if department:
+            filters.append(self._by_department.get(department, set()))
+        if not filters:
+            return None
+        if len(filters) == 1:
+            return filters[0]
+        filters.sort(key=len)
+        return filters[0].intersection(*filters[1:])
+    
+    def _iter_recent(self, candidates: Optional[Set[str]], before: Optional[Tuple[str, str]] = None):
+        """Claves (last_used, id) de la vista por último uso, más recientes primero, desde `before` (excluido)"""
+        end = len(self._recent) if before is None else bisect.bisect_left(self._recent, before)
+        for i in range(end - 1, -1, -1):
+            key = self._recent[i]
+            if candidates is None or key[1] in candidates:
+                yield key
+    
+    def _ranked(
+        self,
+        candidates: Optional[Set[str]],
+        search: Optional[str]
+    ) -> Optional[List[Tuple[str, float]]]:
+        """Resultados de la búsqueda por relevancia, o None si no hay búsqueda con términos"""
+        if not search:
+            return None
+        return self.search_index.search(search, candidates=candidates)
+    
     def list_positions(
         self,
         status: Optional[str] = "active",
@@ -91,56 +464,168 @@ class PositionService:
         Args:
             status: 'active', 'closed', 'draft', o None para todas
             department: Filtrar por departamento
-            search: Buscar en título o descripción
+            search: Buscar en título o descripción; resultados ordenados por relevancia
+                (BM25). Admite frases entre comillas y prefijos ("contra", "analis*")
         """
         try:
-            positions = list(self.positions_cache.values())
-            
-            # Filtrar por status
-            if status:
-                positions = [p for p in positions if p.get('status') == status]
-            
-            # Filtrar por departamento
-            if department:
-                positions = [p for p in positions if p.get('department') == department]
-            
-            # Buscar en título o descripción
-            if search:
-                search_lower = search.lower()
-                positions = [
-                    p for p in positions
-                    if search_lower in p.get('title', '').lower() or
-                       search_lower in p.get('job_description', {}).get('raw_text', '').lower()
-                ]
-            
-            # Ordenar por último uso (más recientes primero)
-            positions.sort(
-                key=lambda x: x.get('statistics', {}).get('last_used', '') or '',
-                reverse=True
-            )
-            
-            return positions
+            if self.store.queryable:
+                rows, _ = self.store.query(status, department, fts_query(search) if search else None)
+                return [self._apply_stored_statistics(position) for _, position in rows]
+            with self._lock:
+                candidates = self._candidate_ids(status, department)
+                ranked = self._ranked(candidates, search)
+                # None: sin búsqueda, o solo palabras vacías/puntuación; no filtra
+                if ranked is not None:
+                    return [self.positions_cache[doc_id] for doc_id, _ in ranked]
+                # Más recientes primero, desde la vista ya ordenada
+                return [self.positions_cache[position_id] for _, position_id in self._iter_recent(candidates)]
         except Exception as e:
             logger.error(f"Error en list_positions: {e}", exc_info=True)
             return []
     
+    def list_positions_page(
+        self,
+        status: Optional[str] = "active",
+        department: Optional[str] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None
+    ) -> Dict:
+        """
+        Página del listado de posiciones con proyección de campos
+        
+        Args:
+            limit: Tamaño de página (por defecto POSITIONS_PAGE_SIZE, máximo POSITIONS_MAX_PAGE_SIZE)
+            cursor: `next_cursor` de la página anterior
+            fields: Vista resumida (por defecto), "full" o lista de campos separada por comas
+        
+        Returns:
+            {"positions", "total", "next_cursor", "loading"}; next_cursor es None en la
+            última página y loading es True mientras sigue la carga inicial
+        
+        Raises:
+            ValueError: si el cursor o los campos no son válidos
+        """
+        if self.store.queryable:
+            page = self._list_page_from_store(status, department, search, limit, cursor, fields)
+        else:
+            with self._lock:
+                page = self._list_page_locked(status, department, search, limit, cursor, fields)
+        # Durante la carga inicial el listado puede estar incompleto
+        page["loading"] = self.loading
+        return page
+    
+    def _list_page_from_store(
+        self,
+        status: Optional[str],
+        department: Optional[str],
+        search: Optional[str],
+        limit: Optional[int],
+        cursor: Optional[str],
+        fields: Optional[str]
+    ) -> Dict:
+        """Misma página que _list_page_locked, resuelta con consultas indexadas en SQLite"""
+        projection = parse_fields(fields)
+        page_size = max(1, min(POSITIONS_PAGE_SIZE if limit is None else limit, POSITIONS_MAX_PAGE_SIZE))
+        match = fts_query(search) if search else None
+        order = "rank" if match else "recent"
+        after = None
+        if cursor:
+            cursor_order, after = decode_cursor(cursor)
+            if cursor_order != order:
+                raise ValueError("El cursor no corresponde a esta búsqueda")
+        
+        # El texto del JD solo se lee si la proyección lo incluye
+        with_text = projection is None or "job_description" in projection
+        rows, total = self.store.query(status, department, match, after, page_size + 1, with_text)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        positions = []
+        for _, position in rows:
+            self._apply_stored_statistics(position)
+            positions.append(project_position(position, projection))
+        return {
+            "positions": positions,
+            "total": total,
+            "next_cursor": encode_cursor(order, rows[-1][0]) if has_more else None
+        }
+    
+    def _list_page_locked(
+        self,
+        status: Optional[str],
+        department: Optional[str],
+        search: Optional[str],
+        limit: Optional[int],
+        cursor: Optional[str],
+        fields: Optional[str]
+    ) -> Dict:
+        projection = parse_fields(fields)
+        page_size = max(1, min(POSITIONS_PAGE_SIZE if limit is None else limit, POSITIONS_MAX_PAGE_SIZE))
+        candidates = self._candidate_ids(status, department)
+        ranked = self._ranked(candidates, search)
+        order = "rank" if ranked is not None else "recent"
+        after = None
+        if cursor:
+            cursor_order, after = decode_cursor(cursor)
+            if cursor_order != order:
+                raise ValueError("El cursor no corresponde a esta búsqueda")
+        
+        if ranked is not None:
+            keys = [[-score, doc_id] for doc_id, score in ranked]
+            total = len(keys)
+            start = 0
+            if after is not None:
+                # Claves en orden ascendente (-puntaje, id)
+                start = next((i for i, key in enumerate(keys) if key > after), total)
+            # Un elemento de más para saber si hay otra página
+            page_keys = keys[start:start + page_size + 1]
+        else:
+            total = len(self._recent) if candidates is None else len(candidates)
+            before = tuple(after) if after is not None else None
+            page_keys = []
+            for key in self._iter_recent(candidates, before):
+                page_keys.append(list(key))
+                if len(page_keys) > page_size:
+                    break
+        
+        has_more = len(page_keys) > page_size
+        page_keys = page_keys[:page_size]
+        return {
+            "positions": [project_position(self.positions_cache[key[1]], projection) for key in page_keys],
+            "total": total,
+            "next_cursor": encode_cursor(order, page_keys[-1]) if has_more else None
+        }
+    
     def get_position(self, position_id: str) -> Optional[Dict]:
         """Obtiene una posición específica por ID"""
-        return self.positions_cache.get(position_id)
+        position = self.positions_cache.get(position_id)
+        if position is None and self.store.queryable:
+            position = self.store.get(position_id)
+            if position is not None:
+                if self._ensure_analytics(position):
+                    self.store.save(position)
+                self._put_position(position, changed=False)
+        return position
     
     def get_position_by_code(self, code: str) -> Optional[Dict]:
         """Obtiene una posición por código"""
-        for position in self.positions_cache.values():
-            if position.get('code') == code:
-                return position
-        return None
+        if self.store.queryable:
+            position = self.store.get_by_code(code)
+            return self.get_position(position['id']) if position is not None else None
+        with self._lock:
+            position_id = self._by_code.get(code)
+            return self.positions_cache.get(position_id) if position_id is not None else None
     
-    def load_pdfs_from_directory(self, pdf_dir: Optional[Path] = None) -> List[Dict]:
+    def load_pdfs_from_directory(self, pdf_dir: Optional[Path] = None, force: bool = False) -> List[Dict]:
         """
-        Escanea una carpeta de PDFs y crea posiciones automáticamente
+        Escanea una carpeta de PDFs y crea posiciones automáticamente.
+        Los PDFs sin cambios según el manifiesto (tamaño, mtime, hash) se omiten;
+        el detalle queda en self.last_reload_report.
         
         Args:
             pdf_dir: Directorio con PDFs (opcional, usa el default si no se especifica)
+            force: Reprocesar todos los PDFs aunque no hayan cambiado
         
         Returns:
             Lista de posiciones creadas/actualizadas
@@ -152,85 +637,280 @@ class PositionService:
             logger.warning(f"Directorio de PDFs no existe: {pdf_dir}")
             return []
         
+        # Buscar todos los PDFs
+        pdf_files = sorted(pdf_dir.glob("*.pdf"))
+        # PDFs borrados de la carpeta: se olvidan (sus posiciones se conservan)
+        prune = pdf_dir == self.pdfs_dir
+        return self.load_pdf_files(pdf_files, force=force, directory=pdf_dir, prune=prune)
+    
+    def load_pdf_files(
+        self,
+        pdf_files: List[Path],
+        force: bool = False,
+        directory: Optional[Path] = None,
+        prune: bool = False
+    ) -> List[Dict]:
+        """
+        Procesa solo los PDFs indicados (p. ej. los que cambiaron según el watcher).
+        Los que ya no existen se quitan del manifiesto.
+        
+        Returns:
+            Lista de posiciones creadas/actualizadas
+        """
         created_positions = []
+        report = {
+            "started_at": datetime.utcnow().isoformat(),
+            "directory": str(directory or self.pdfs_dir),
+            "processed": [],
+            "skipped": [],
+            "errors": [],
+            "removed": []
+        }
         
-        # Buscar todos los PDFs
-        for pdf_file in pdf_dir.glob("*.pdf"):
-            try:
-                # Leer el PDF
-                with open(pdf_file, 'rb') as f:
-                    pdf_bytes = f.read()
-                
-                # Extraer texto
-                text, warnings = extract_text_from_pdf(pdf_bytes)
-                
-                if not text or len(text.strip()) < 50:
-                    logger.warning(f"PDF {pdf_file.name} no tiene suficiente texto")
+        # Una pasada a la vez (arranque, recarga y watcher comparten el manifiesto)
+        with self._pdf_lock:
+            existing_files = []
+            for pdf_file in pdf_files:
+                if not pdf_file.exists():
+                    if self.manifest.forget(pdf_file.name):
+                        report["removed"].append(pdf_file.name)
                     continue
-                
-                # Generar ID y código basado en el nombre del archivo
-                filename_base = pdf_file.stem  # nombre sin extensión
-                position_id = f"position_{filename_base}"
-                code = filename_base.upper().replace('_', '-')
-                
-                # Verificar si ya existe
-                existing = self.get_position(position_id)
-                
-                if existing:
-                    # Actualizar posición existente
-                    position = existing
-                    position['job_description']['raw_text'] = text
-                    position['job_description']['word_count'] = len(text.split())
-                    position['job_description']['extracted_at'] = datetime.utcnow().isoformat()
-                    position['updated_at'] = datetime.utcnow().isoformat()
-                    logger.info(f"Actualizada posición: {position_id}")
-                else:
-                    # Crear nueva posición
-                    position = {
-                        "id": position_id,
-                        "code": code,
-                        "title": self._extract_title_from_text(text) or filename_base.replace('_', ' ').title(),
-                        "department": "RH",  # Default, puede ajustarse manualmente
-                        "location": "CDMX",  # Default, puede ajustarse manualmente
-                        "status": "active",
-                        "created_at": datetime.utcnow().isoformat(),
-                        "created_by": "system",
-                        "updated_at": datetime.utcnow().isoformat(),
-                        "updated_by": "system",
-                        "job_description": {
-                            "raw_text": text,
-                            "pdf_path": f"positions/pdfs/{pdf_file.name}",
-                            "word_count": len(text.split()),
-                            "extracted_at": datetime.utcnow().isoformat()
-                        },
-                        "metadata": {
-                            "salary_range": "Competitivo",
-                            "experience_required": "A definir",
-                            "education_level": "A definir",
-                            "employment_type": "Tiempo completo"
-                        },
-                        "statistics": {
-                            "times_used": 0,
-                            "candidates_analyzed": 0,
-                            "last_used": None
-                        }
-                    }
-                    logger.info(f"Creada nueva posición: {position_id}")
-                
-                # Guardar en JSON
-                json_path = self.data_dir / f"{position_id}.json"
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(position, f, ensure_ascii=False, indent=2)
-                
-                # Actualizar cache
-                self.positions_cache[position_id] = position
-                created_positions.append(position)
-                
-            except Exception as e:
-                logger.error(f"Error procesando PDF {pdf_file.name}: {e}")
+                existing_files.append(pdf_file)
+                position = self._process_pdf_file(pdf_file, report, force)
+                if position is not None:
+                    created_positions.append(position)
+            
+            if prune:
+                report["removed"] += self.manifest.prune([pdf_file.name for pdf_file in existing_files])
+            
+            report["finished_at"] = datetime.utcnow().isoformat()
+            self.manifest.last_run = report
+            self.manifest.save()
+            self.last_reload_report = report
         
+        logger.info(
+            f"PDFs de posiciones: {len(report['processed'])} procesados, "
+            f"{len(report['skipped'])} omitidos, {len(report['errors'])} con error"
+        )
         return created_positions
     
+    def _process_pdf_file(self, pdf_file: Path, report: Dict, force: bool) -> Optional[Dict]:
+        """Crea o actualiza la posición de un PDF; None si se omitió o falló"""
+        try:
+            skip_reason, stat, digest = self.manifest.check(
+                pdf_file, EXTRACTOR_VERSION, self._known_ids()
+            )
+            if skip_reason and not force:
+                report["skipped"].append({"file": pdf_file.name, "reason": skip_reason})
+                return None
+            
+            # Extraer texto (el parser abre el archivo con mmap)
+            text, warnings = extract_text_from_pdf(pdf_file)
+            
+            if not has_enough_text(text):
+                logger.warning(f"PDF {pdf_file.name} no tiene suficiente texto")
+                self.manifest.record(pdf_file, stat, digest, EXTRACTOR_VERSION, STATUS_INSUFFICIENT_TEXT)
+                report["skipped"].append({"file": pdf_file.name, "reason": STATUS_INSUFFICIENT_TEXT})
+                return None
+            
+            position = self._build_pdf_position(pdf_file, text)
+            
+            # Guardar (JSON o SQLite)
+            self.store.save(position)
+            
+            # Actualizar cache e índice de búsqueda
+            self._put_position(position)
+            self.manifest.record(pdf_file, stat, digest, EXTRACTOR_VERSION, STATUS_OK, position['id'])
+            report["processed"].append({"file": pdf_file.name, "position_id": position['id']})
+            return position
+            
+        except Exception as e:
+            logger.error(f"Error procesando PDF {pdf_file.name}: {e}")
+            report["errors"].append({"file": pdf_file.name, "error": str(e)})
+            return None
+    
+    def _build_pdf_position(self, pdf_file: Path, text: str) -> Dict:
+        """Posición nueva, o copia actualizada de la existente, para el texto de un PDF (sin guardarla)"""
+        # Generar ID y código basado en el nombre del archivo
+        filename_base = pdf_file.stem  # nombre sin extensión
+        position_id = f"position_{filename_base}"
+        code = filename_base.upper().replace('_', '-')
+        
+        # Verificar si ya existe
+        existing = self.get_position(position_id)
+        
+        if existing:
+            # Actualizar una copia: el cache se reemplaza junto con los índices
+            position = copy.deepcopy(existing)
+            position['job_description']['raw_text'] = text
+            position['job_description']['word_count'] = len(text.split())
+            position['job_description']['extracted_at'] = datetime.utcnow().isoformat()
+            position['updated_at'] = datetime.utcnow().isoformat()
+            logger.info(f"Actualizada posición: {position_id}")
+        else:
+            # Crear nueva posición
+            position = {
+                "id": position_id,
+                "code": code,
+                "title": self._extract_title_from_text(text) or filename_base.replace('_', ' ').title(),
+                "department": "RH",  # Default, puede ajustarse manualmente
+                "location": "CDMX",  # Default, puede ajustarse manualmente
+                "status": "active",
+                "created_at": datetime.utcnow().isoformat(),
+                "created_by": "system",
+                "updated_at": datetime.utcnow().isoformat(),
+                "updated_by": "system",
+                "job_description": {
+                    "raw_text": text,
+                    "pdf_path": f"positions/pdfs/{pdf_file.name}",
+                    "word_count": len(text.split()),
+                    "extracted_at": datetime.utcnow().isoformat()
+                },
+                "metadata": {
+                    "salary_range": "Competitivo",
+                    "experience_required": "A definir",
+                    "education_level": "A definir",
+                    "employment_type": "Tiempo completo"
+                },
+                "statistics": {
+                    "times_used": 0,
+                    "candidates_analyzed": 0,
+                    "last_used": None
+                }
+            }
+            logger.info(f"Creada nueva posición: {position_id}")
+        self._ensure_analytics(position)
+        return position
+    
+    def plan_pdf_reload(self, pdf_files: List[Path], force: bool = False) -> Tuple[List[Tuple[Path, Any, Optional[str]]], List[Dict]]:
+        """
+        Primera fase de una recarga en segundo plano: qué PDFs hay que extraer.
+        
+        Returns:
+            ([(ruta, stat, sha256 o None)] a extraer, [{"file", "reason"}] omitidos)
+        """
+        to_process, skipped = [], []
+        with self._pdf_lock:
+            for pdf_file in pdf_files:
+                skip_reason, stat, digest = self.manifest.check(pdf_file, EXTRACTOR_VERSION, self._known_ids())
+                if skip_reason and not force:
+                    skipped.append({"file": pdf_file.name, "reason": skip_reason})
+                else:
+                    to_process.append((pdf_file, stat, digest))
+        return to_process, skipped
+    
+    def commit_pdf_reload(
+        self,
+        extracted: List[Tuple[Path, Any, Optional[str], str]],
+        report: Dict,
+        present_files: Optional[List[Path]] = None
+    ) -> List[Dict]:
+        """
+        Última fase de una recarga en segundo plano: con los textos ya extraídos
+        [(ruta, stat, sha256, texto)] arma las posiciones, las guarda y las
+        publica en el cache e índices de una sola vez (bajo el lock).
+        `report` trae "skipped"/"errors" de las fases previas y se completa aquí.
+        """
+        positions = []
+        with self._pdf_lock:
+            for pdf_file, stat, digest, text in extracted:
+                if not has_enough_text(text):
+                    self.manifest.record(pdf_file, stat, digest, EXTRACTOR_VERSION, STATUS_INSUFFICIENT_TEXT)
+                    report["skipped"].append({"file": pdf_file.name, "reason": STATUS_INSUFFICIENT_TEXT})
+                    continue
+                positions.append((pdf_file, stat, digest, self._build_pdf_position(pdf_file, text)))
+            
+            self.store.save_many([position for _, _, _, position in positions])
+            with self._lock:
+                for _, _, _, position in positions:
+                    self._put_position(position)
+            
+            for pdf_file, stat, digest, position in positions:
+                self.manifest.record(pdf_file, stat, digest, EXTRACTOR_VERSION, STATUS_OK, position['id'])
+                report["processed"].append({"file": pdf_file.name, "position_id": position['id']})
+            if present_files is not None:
+                report["removed"] += self.manifest.prune([pdf_file.name for pdf_file in present_files])
+            
+            report["finished_at"] = datetime.utcnow().isoformat()
+            self.manifest.last_run = report
+            self.manifest.save()
+            self.last_reload_report = report
+        return [position for _, _, _, position in positions]
+    
+    def reload_position_file(self, json_path: Path) -> Optional[str]:
+        """
+        Sincroniza una posición con su JSON (editado, agregado o borrado fuera de la app).
+        
+        Returns:
+            "updated", "removed", o None si no hubo cambios
+        """
+        position_id = json_path.stem
+        if not json_path.exists():
+            with self._lock:
+                if position_id not in self.positions_cache:
+                    return None
+                self._remove_position(position_id)
+            logger.info(f"Posición eliminada (JSON borrado): {position_id}")
+            return "removed"
+        
+        with open(json_path, 'r', encoding='utf-8') as f:
+            position = json.load(f)
+        self._apply_stored_statistics(position)
+        self._ensure_analytics(position)
+        # Escrituras propias (p. ej. PDF procesado): el cache ya está al día
+        if position == self.positions_cache.get(position.get('id')):
+            return None
+        self._put_position(position)
+        logger.info(f"Posición recargada desde {json_path.name}")
+        return "updated"
+    
+    def apply_file_changes(self, paths: List[Path]) -> Dict:
+        """
+        Aplica cambios detectados en las carpetas de PDFs y de datos: procesa
+        solo los PDFs afectados y recarga solo los JSON afectados.
+        """
+        pdf_files = sorted({p for p in paths if p.parent == self.pdfs_dir and p.suffix.lower() == ".pdf"})
+        # Con SQLite los JSON ya no son la fuente de las posiciones
+        json_files = [] if self.store.queryable else sorted({
+            p for p in paths
+            if p.parent == self.data_dir and p.name.startswith("position_") and p.suffix == ".json"
+        })
+        result = {"pdfs": [], "positions": []}
+        if pdf_files:
+            self.load_pdf_files(pdf_files)
+            result["pdfs"] = [p.name for p in pdf_files]
+        for json_path in json_files:
+            try:
+                change = self.reload_position_file(json_path)
+                if change:
+                    result["positions"].append({"file": json_path.name, "change": change})
+            except Exception as e:
+                logger.error(f"Error recargando {json_path.name}: {e}")
+        return result
+    
+    def rescan_files(self) -> Dict:
+        """
+        Resincroniza todo cuando el watcher perdió eventos: la carpeta de PDFs
+        completa (el manifiesto omite los que no cambiaron) y todos los JSON de
+        posiciones, incluidos los de posiciones en cache cuyo JSON ya no existe.
+        """
+        created = self.load_pdfs_from_directory()
+        result = {"rescan": True, "pdfs": [position['id'] for position in created], "positions": []}
+        # Con SQLite los JSON ya no son la fuente de las posiciones
+        if self.store.queryable:
+            return result
+        with self._lock:
+            known = {self.data_dir / f"{position_id}.json" for position_id in self.positions_cache}
+        json_files = sorted(known | set(self.data_dir.glob("position_*.json")))
+        for json_path in json_files:
+            try:
+                change = self.reload_position_file(json_path)
+                if change:
+                    result["positions"].append({"file": json_path.name, "change": change})
+            except Exception as e:
+                logger.error(f"Error recargando {json_path.name}: {e}")
+        return result
+    
     def _extract_title_from_text(self, text: str) -> Optional[str]:
         """Intenta extraer el título del JD del texto"""
         lines = text.split('\n')
@@ -244,26 +924,29 @@ class PositionService:
     
     def create_position_from_pdf(
         self,
-        pdf_bytes: bytes,
+        pdf_source: PdfSource,
         filename: str,
         title: str,
         department: str,
         location: str,
-        created_by: str
+        created_by: str,
+        text: Optional[str] = None
     ) -> Dict:
         """
         Crea una nueva posición desde un PDF subido (solo admin)
         
         Args:
-            pdf_bytes: Contenido del PDF
+            pdf_source: Ruta al PDF (p. ej. la subida volcada a disco) o su contenido en bytes
             filename: Nombre del archivo
             title: Título de la posición
             department: Departamento
             location: Ubicación
             created_by: Usuario que crea la posición
+            text: Texto ya extraído (p. ej. en el pool de procesos); si falta se extrae aquí
         """
         # Extraer texto del PDF
-        text, warnings = extract_text_from_pdf(pdf_bytes)
+        if text is None:
+            text, warnings = extract_text_from_pdf(pdf_source)
         
         # Generar ID único
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
@@ -272,8 +955,11 @@ class PositionService:
         
         # Guardar PDF
         pdf_path = self.pdfs_dir / f"{position_id}.pdf"
-        with open(pdf_path, 'wb') as f:
-            f.write(pdf_bytes)
+        if isinstance(pdf_source, (bytes, bytearray)):
+            with open(pdf_path, 'wb') as f:
+                f.write(pdf_source)
+        else:
+            shutil.copyfile(pdf_source, pdf_path)
         
         # Ruta relativa para almacenar
         pdf_relative_path = f"positions/pdfs/{position_id}.pdf"
@@ -308,37 +994,69 @@ class PositionService:
                 "last_used": None
             }
         }
+        self._ensure_analytics(position)
         
-        # Guardar JSON
-        json_path = self.data_dir / f"{position_id}.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(position, f, ensure_ascii=False, indent=2)
+        # Guardar (JSON o SQLite)
+        self.store.save(position)
         
-        # Actualizar cache
-        self.positions_cache[position_id] = position
+        # Actualizar cache e índice de búsqueda
+        self._put_position(position)
+        # El PDF guardado ya tiene posición: que la recarga o el watcher no lo importen otra vez
+        with self._pdf_lock:
+            self.manifest.record(pdf_path, pdf_path.stat(), None, EXTRACTOR_VERSION, STATUS_OK, position_id)
+            self.manifest.save()
         
         logger.info(f"Posición creada: {position_id} por {created_by}")
         return position
     
     def update_position_statistics(self, position_id: str, candidates_count: int = 1):
-        """Actualiza estadísticas de uso de una posición"""
-        position = self.positions_cache.get(position_id)
+        """
+        Actualiza estadísticas de uso de una posición. Solo en memoria: se
+        guardan en lote en _statistics.json (ver services.position_stats).
+        """
+        position = self.get_position(position_id)
         if not position:
             return
         
-        stats = position.setdefault('statistics', {})
-        stats['times_used'] = stats.get('times_used', 0) + 1
-        stats['candidates_analyzed'] = stats.get('candidates_analyzed', 0) + candidates_count
-        stats['last_used'] = datetime.utcnow().isoformat()
-        
-        # Guardar actualización
-        json_path = self.data_dir / f"{position_id}.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(position, f, ensure_ascii=False, indent=2)
+        stats = self.stats_store.record_use(position_id, position.get('statistics'), candidates_count)
+        with self._lock:
+            position['statistics'] = stats
+            # Reubicar en la vista por último uso (el texto no cambió: no se reindexa la búsqueda)
+            self._index_position(position)
+            self._touch(position_id, content=False)
         
-        logger.info(f"Estadísticas actualizadas para {position_id}")
+        logger.debug("Estadísticas actualizadas para %s", position_id)
+    
+    def catalog_etag(self) -> str:
+        """ETag del listado: cambia con cualquier alta, baja, edición o uso de una posición"""
+        return f'"c{self._epoch}-{self.catalog_version}"'
+    
+    def get_position_response(self, position_id: str) -> Optional[Tuple[bytes, str, Optional[datetime]]]:
+        """
+        Posición ya serializada para GET /api/positions/{id}: (JSON, ETag,
+        última modificación). Se serializa una vez por versión de la posición.
+        """
+        # La versión se lee antes que la posición: si cambia en medio, lo
+        # serializado queda bajo la versión anterior y no se vuelve a servir
+        version = self._versions.get(position_id, 0)
+        cached = self._serialized.get((position_id, version))
+        if cached is not None:
+            return cached
+        position = self.get_position(position_id)
+        if position is None:
+            return None
+        body = serialize_json(public_position(position))
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        entry = (body, etag, position_modified_at(position))
+        self._serialized.set((position_id, version), entry)
+        return entry
+    
+    def flush_statistics(self):
+        """Guarda las estadísticas pendientes y detiene el flush periódico (al apagar)"""
+        self.stats_store.close()
 
 
-# Instancia global del servicio
-position_service = PositionService()
+# Instancia global del servicio; las posiciones se cargan en segundo plano
+# al arrancar la app (ver lifespan en main.py)
+position_service = PositionService(load_on_init=False)
 
@@ -0,0 +1,167 @@
+"""
+Estadísticas de uso de posiciones con escritura diferida
+Los contadores (times_used, candidates_analyzed, last_used) viven en memoria y
+se guardan en lote en un archivo propio (_statistics.json junto a los JSON de
+posiciones), cada POSITIONS_STATS_FLUSH_INTERVAL segundos o en cuanto se
+acumulan POSITIONS_STATS_FLUSH_THRESHOLD cambios. Un flush nunca reescribe el
+texto del JD, y la escritura es atómica (temporal + os.replace).
+Con el store SQLite, el flush actualiza solo las filas modificadas (ver `sink`).
+"""
+import os
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+POSITIONS_STATS_FLUSH_INTERVAL = float(os.getenv("POSITIONS_STATS_FLUSH_INTERVAL", "30"))
+POSITIONS_STATS_FLUSH_THRESHOLD = int(os.getenv("POSITIONS_STATS_FLUSH_THRESHOLD", "50"))
+
+STATS_FILENAME = "_statistics.json"
+
+
+def empty_statistics() -> Dict:
+    return {"times_used": 0, "candidates_analyzed": 0, "last_used": None}
+
+
+class PositionStatsStore:
+    """Contadores por posición en memoria con flush periódico a disco"""
+
+    def __init__(
+        self,
+        data_dir: Path,
+        flush_interval: float = POSITIONS_STATS_FLUSH_INTERVAL,
+        flush_threshold: int = POSITIONS_STATS_FLUSH_THRESHOLD,
+        sink: Optional[Callable[[Dict[str, Dict]], None]] = None
+    ):
+        """
+        Args:
+            sink: Si se indica, el flush le entrega {id: estadísticas} de las
+                posiciones modificadas en lugar de escribir _statistics.json
+        """
+        self.path = Path(data_dir) / STATS_FILENAME
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._stats: Dict[str, Dict] = {}
+        self._pending = 0
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        # Serializa las escrituras (hilo de flush y flush al apagar)
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        if sink is None:
+            self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Estadísticas de posiciones ilegibles ({e}); se usan las de cada JSON")
+            return
+        with self._lock:
+            self._stats = data.get("positions", {})
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {position_id: dict(stats) for position_id, stats in self._stats.items()}
+
+    def get(self, position_id: str) -> Optional[Dict]:
+        with self._lock:
+            stats = self._stats.get(position_id)
+            return dict(stats) if stats is not None else None
+
+    def record_use(self, position_id: str, base: Optional[Dict], candidates_count: int = 1) -> Dict:
+        """
+        Suma un uso; `base` son las estadísticas previas de la posición (las del
+        JSON) si aún no hay registro en memoria. Devuelve las estadísticas nuevas.
+        """
+        with self._lock:
+            stats = self._stats.get(position_id)
+            if stats is None:
+                stats = {**empty_statistics(), **(base or {})}
+                self._stats[position_id] = stats
+            stats["times_used"] = stats.get("times_used", 0) + 1
+            stats["candidates_analyzed"] = stats.get("candidates_analyzed", 0) + candidates_count
+            stats["last_used"] = datetime.utcnow().isoformat()
+            self._dirty.add(position_id)
+            self._pending += 1
+            pending = self._pending
+            updated = dict(stats)
+
+        self._ensure_flusher()
+        if pending >= self.flush_threshold:
+            self._wake.set()
+        return updated
+
+    def discard(self, position_id: str) -> None:
+        with self._lock:
+            if self._stats.pop(position_id, None) is not None:
+                self._dirty.discard(position_id)
+                self._pending += 1
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def flush(self) -> bool:
+        """Escribe los cambios pendientes; True si escribió"""
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return False
+                pending, dirty = self._pending, self._dirty
+                ids = dirty if self.sink is not None else self._stats.keys()
+                snapshot = {position_id: dict(self._stats[position_id]) for position_id in ids if position_id in self._stats}
+                self._pending, self._dirty = 0, set()
+            try:
+                if self.sink is not None:
+                    self.sink(snapshot)
+                else:
+                    data = {"updated_at": datetime.utcnow().isoformat(), "positions": snapshot}
+                    fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp_stats_", suffix=".json")
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(data, f, ensure_ascii=False)
+                    os.replace(tmp_name, self.path)
+            except Exception as e:
+                logger.error(f"No se pudieron guardar las estadísticas de posiciones: {e}")
+                # Reintentar en el siguiente flush
+                with self._lock:
+                    self._pending += pending
+                    self._dirty |= dirty
+                return False
+        logger.debug("Estadísticas de posiciones guardadas (%d cambios)", pending)
+        return True
+
+    def _ensure_flusher(self) -> None:
+        if self._thread is not None or self._closed:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="position-stats-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Detiene el hilo de flush y guarda lo pendiente (al apagar la app)"""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
@@ -0,0 +1,453 @@
+"""
+Almacenamiento de posiciones
+- json   : un archivo position_<id>.json por posición (por defecto)
+- sqlite : una base SQLite en modo WAL con columnas indexadas (status,
+           departamento, código) y una tabla FTS5 sobre título y texto del JD;
+           filtros, orden y búsqueda se resuelven con consultas. Las
+           estadísticas de uso (y el último uso, para el orden) van en la
+           tabla position_statistics: guardarlas no reescribe la fila con el JD.
+           La primera vez importa los JSON existentes (se conservan como respaldo).
+Se elige con POSITIONS_STORE; la ruta de la base con POSITIONS_DB_PATH.
+"""
+import os
+import re
+import json
+import sqlite3
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from services.position_index import STOPWORDS
+from utils.term_matcher import fold_text
+
+logger = logging.getLogger(__name__)
+
+POSITIONS_STORE = os.getenv("POSITIONS_STORE", "json").strip().lower()
+POSITIONS_DB_PATH = os.getenv("POSITIONS_DB_PATH", "")
+
+# Peso del título frente al texto del JD en el ranking (bm25 de FTS5)
+TITLE_WEIGHT = 3.0
+
+_QUERY_RE = re.compile(r'"([^"]*)"?|(\S+)')
+_WORD_RE = re.compile(r"\w+")
+
+
+class JsonPositionStore:
+    """Un JSON por posición en data_dir (formato histórico)"""
+
+    queryable = False
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+
+    def path_for(self, position_id: str) -> Path:
+        return self.data_dir / f"{position_id}.json"
+
+    def load_all(self) -> Iterator[Dict]:
+        if not self.data_dir.exists():
+            logger.warning(f"Directorio de posiciones no existe: {self.data_dir}")
+            return
+        for json_file in self.data_dir.glob("position_*.json"):
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    position = json.load(f)
+                logger.info(f"Cargada posición: {position.get('title', 'Unknown')}")
+                yield position
+            except Exception as e:
+                logger.error(f"Error cargando {json_file}: {e}")
+
+    def save(self, position: Dict) -> None:
+        """Escritura atómica: un lector (o el watcher) nunca ve un JSON a medias"""
+        path = self.path_for(position['id'])
+        fd, tmp_name = tempfile.mkstemp(dir=self.data_dir, prefix=".tmp_position_", suffix=".json")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(position, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def save_many(self, positions: List[Dict]) -> None:
+        for position in positions:
+            self.save(position)
+
+    def close(self) -> None:
+        pass
+
+
+def fts_query(search: str) -> Optional[str]:
+    """
+    Traduce la búsqueda al formato de FTS5 con las mismas reglas que el índice
+    en memoria: frases entre comillas, términos sin palabras vacías (AND) y el
+    último término como prefijo mientras se escribe (o cualquiera con "*").
+    None si no quedan términos.
+    """
+    parts: List[str] = []
+    matches = list(_QUERY_RE.finditer(search or ""))
+    for index, match in enumerate(matches):
+        if match.group(1) is not None:
+            words = _WORD_RE.findall(fold_text(match.group(1)))
+            if words:
+                parts.append('"' + " ".join(words) + '"')
+            continue
+        word = match.group(2)
+        words = [w for w in _WORD_RE.findall(fold_text(word)) if w not in STOPWORDS]
+        if not words:
+            continue
+        terms = [f'"{w}"' for w in words]
+        still_typing = index == len(matches) - 1 and not search[-1:].isspace()
+        if word.endswith("*") or still_typing:
+            terms[-1] += "*"
+        parts.extend(terms)
+    return " ".join(parts) if parts else None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    code TEXT,
+    title TEXT NOT NULL DEFAULT '',
+    department TEXT,
+    status TEXT,
+    raw_text TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    analytics TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_positions_code ON positions(code);
+CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status);
+CREATE INDEX IF NOT EXISTS idx_positions_department ON positions(department);
+CREATE TABLE IF NOT EXISTS position_statistics (
+    id TEXT PRIMARY KEY,
+    last_used TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_position_statistics_last_used ON position_statistics(last_used, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS positions_fts USING fts5(
+    title, raw_text, content='positions', content_rowid='pk',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS positions_ai AFTER INSERT ON positions BEGIN
+    INSERT INTO positions_fts(rowid, title, raw_text) VALUES (new.pk, new.title, new.raw_text);
+END;
+CREATE TRIGGER IF NOT EXISTS positions_ad AFTER DELETE ON positions BEGIN
+    INSERT INTO positions_fts(positions_fts, rowid, title, raw_text) VALUES ('delete', old.pk, old.title, old.raw_text);
+END;
+CREATE TRIGGER IF NOT EXISTS positions_au AFTER UPDATE OF title, raw_text ON positions BEGIN
+    INSERT INTO positions_fts(positions_fts, rowid, title, raw_text) VALUES ('delete', old.pk, old.title, old.raw_text);
+    INSERT INTO positions_fts(rowid, title, raw_text) VALUES (new.pk, new.title, new.raw_text);
+END;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_UPSERT_STATISTICS = """
+INSERT INTO position_statistics (id, last_used, data) VALUES (?1, ?2, ?3)
+ON CONFLICT(id) DO UPDATE SET last_used = excluded.last_used, data = excluded.data
+"""
+_SELECT_POSITIONS = (
+    "SELECT p.data, p.raw_text, p.analytics, s.data FROM positions p "
+    "LEFT JOIN position_statistics s ON s.id = p.id"
+)
+# Igual, pero omite posiciones que ya no existen (borradas antes del guardado)
+_UPDATE_STATISTICS = """
+INSERT INTO position_statistics (id, last_used, data)
+SELECT ?1, ?2, ?3 WHERE EXISTS (SELECT 1 FROM positions WHERE id = ?1)
+ON CONFLICT(id) DO UPDATE SET last_used = excluded.last_used, data = excluded.data
+"""
+
+
+class SqlitePositionStore:
+    """Posiciones en SQLite (WAL) con índices y búsqueda FTS5"""
+
+    queryable = True
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Una conexión compartida entre hilos (carga en segundo plano, watcher, peticiones)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            # Bases creadas antes de guardar la analítica del JD aparte
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(positions)")}
+            if "analytics" not in columns:
+                self._conn.execute("ALTER TABLE positions ADD COLUMN analytics TEXT NOT NULL DEFAULT ''")
+            # Bases con las estadísticas dentro de `data` (y su columna last_used, que
+            # queda sin uso): se pasan a position_statistics una sola vez
+            if "last_used" in columns and not self.get_meta("statistics_table"):
+                self._move_statistics()
+
+    def _move_statistics(self) -> None:
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO position_statistics (id, last_used, data)
+                SELECT id, last_used, json_extract(data, '$.statistics') FROM positions
+                WHERE json_type(data, '$.statistics') = 'object'
+                """
+            )
+            self._conn.execute("UPDATE positions SET data = json_remove(data, '$.statistics')")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('statistics_table', '1')")
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        logger.info("Estadísticas de posiciones movidas a la tabla position_statistics")
+
+    # --- Filas <-> posiciones ---
+
+    # El texto del JD y su analítica van en columnas propias: los listados
+    # sin texto no los leen. Las estadísticas, en position_statistics
+    @staticmethod
+    def _row_values(position: Dict) -> Tuple:
+        data = dict(position)
+        job_description = dict(data.get('job_description') or {})
+        raw_text = job_description.pop('raw_text', '') or ''
+        analytics = job_description.pop('analytics', None)
+        data['job_description'] = job_description
+        data.pop('statistics', None)
+        return (
+            position['id'], position.get('code'), position.get('title') or '',
+            position.get('department'), position.get('status'),
+            raw_text, json.dumps(data, ensure_ascii=False),
+            json.dumps(analytics, ensure_ascii=False) if analytics else ''
+        )
+
+    @staticmethod
+    def _statistics_values(position_id: str, stats: Dict) -> Tuple:
+        return (position_id, stats.get('last_used') or '', json.dumps(stats, ensure_ascii=False))
+
+    @staticmethod
+    def _to_position(
+        data: str,
+        raw_text: Optional[str],
+        analytics: Optional[str] = None,
+        statistics: Optional[str] = None
+    ) -> Dict:
+        position = json.loads(data)
+        if raw_text is not None:
+            position.setdefault('job_description', {})['raw_text'] = raw_text
+        if analytics:
+            position.setdefault('job_description', {})['analytics'] = json.loads(analytics)
+        if statistics:
+            position['statistics'] = json.loads(statistics)
+        return position
+
+    # --- Escritura ---
+
+    def save(self, position: Dict) -> None:
+        self.save_many([position])
+
+    def save_many(self, positions: List[Dict]) -> None:
+        rows = [self._row_values(position) for position in positions]
+        stats_rows = [
+            self._statistics_values(position['id'], position['statistics'])
+            for position in positions if position.get('statistics')
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO positions (id, code, title, department, status, raw_text, data, analytics)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        code = excluded.code, title = excluded.title, department = excluded.department,
+                        status = excluded.status, raw_text = excluded.raw_text,
+                        data = excluded.data, analytics = excluded.analytics
+                    """,
+                    rows
+                )
+                self._conn.executemany(_UPSERT_STATISTICS, stats_rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, position_id: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM positions WHERE id = ?", (position_id,))
+                self._conn.execute("DELETE FROM position_statistics WHERE id = ?", (position_id,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def save_statistics(self, statistics: Dict[str, Dict]) -> None:
+        """Actualiza en lote las estadísticas; solo escribe en position_statistics"""
+        rows = [self._statistics_values(position_id, stats) for position_id, stats in statistics.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(_UPDATE_STATISTICS, rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # --- Migración desde JSON ---
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_from(self, json_store: JsonPositionStore, statistics: Optional[Dict[str, Dict]] = None) -> int:
+        """Importa una sola vez las posiciones JSON existentes; devuelve cuántas importó"""
+        if self.get_meta("json_migrated"):
+            return 0
+        positions = list(json_store.load_all())
+        for position in positions:
+            stats = (statistics or {}).get(position['id'])
+            if stats:
+                position['statistics'] = stats
+        self.save_many(positions)
+        self.set_meta("json_migrated", str(len(positions)))
+        logger.info(f"Migradas {len(positions)} posiciones de JSON a SQLite ({self.db_path})")
+        return len(positions)
+
+    # --- Lectura ---
+
+    def get(self, position_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(_SELECT_POSITIONS + " WHERE p.id = ?", (position_id,)).fetchone()
+        return self._to_position(*row) if row else None
+
+    def get_by_code(self, code: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                _SELECT_POSITIONS + " WHERE p.code = ? ORDER BY p.id LIMIT 1", (code,)
+            ).fetchone()
+        return self._to_position(*row) if row else None
+
+    def exists(self, position_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM positions WHERE id = ?", (position_id,)).fetchone() is not None
+
+    def __contains__(self, position_id: str) -> bool:
+        return self.exists(position_id)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def load_all(self) -> Iterator[Dict]:
+        with self._lock:
+            rows = self._conn.execute(_SELECT_POSITIONS).fetchall()
+        for row in rows:
+            yield self._to_position(*row)
+
+    @staticmethod
+    def _filters(status: Optional[str], department: Optional[str]) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        if status:
+            clauses.append("p.status = ?")
+            params.append(status)
+        if department:
+            clauses.append("p.department = ?")
+            params.append(department)
+        return clauses, params
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        department: Optional[str] = None,
+        match: Optional[str] = None,
+        after: Optional[List[Any]] = None,
+        limit: Optional[int] = None,
+        with_text: bool = True
+    ) -> Tuple[List[Tuple[List[Any], Dict]], int]:
+        """
+        Posiciones filtradas en el orden del listado con su clave de orden.
+        Con `match` (expresión FTS5) ordena por relevancia: clave [bm25, id]
+        ascendente; sin él por último uso: clave [last_used, id] descendente.
+        `after` es la clave del último elemento de la página anterior.
+
+        Returns:
+            ([(clave, posición)], total de coincidencias sin paginar)
+        """
+        clauses, params = self._filters(status, department)
+        if with_text:
+            text_columns = "p.raw_text AS raw_text, p.analytics AS analytics"
+        else:
+            text_columns = "NULL AS raw_text, NULL AS analytics"
+        limit_sql = " LIMIT ?" if limit is not None else ""
+
+        if match:
+            base = (
+                f"SELECT p.id AS id, p.data AS data, {text_columns}, s.data AS statistics, "
+                f"bm25(positions_fts, {TITLE_WEIGHT}, 1.0) AS score "
+                "FROM positions_fts JOIN positions p ON p.pk = positions_fts.rowid "
+                "LEFT JOIN position_statistics s ON s.id = p.id "
+                "WHERE positions_fts MATCH ?"
+                + "".join(f" AND {clause}" for clause in clauses)
+            )
+            base_params = [match, *params]
+            count_sql = f"SELECT COUNT(*) FROM ({base})"
+            sql = f"SELECT id, data, raw_text, analytics, statistics, score FROM ({base})"
+            page_params = list(base_params)
+            if after is not None:
+                sql += " WHERE (score, id) > (?, ?)"
+                page_params += after
+            sql += " ORDER BY score, id" + limit_sql
+        else:
+            where = " WHERE " + " AND ".join(clauses) if clauses else ""
+            base_params = params
+            count_sql = f"SELECT COUNT(*) FROM positions p{where}"
+            # Sin estadísticas guardadas cuenta como nunca usada ('')
+            sql = (
+                f"SELECT p.id, p.data, {text_columns}, s.data, COALESCE(s.last_used, '') AS last_used "
+                "FROM positions p LEFT JOIN position_statistics s ON s.id = p.id"
+            )
+            page_clauses = list(clauses)
+            page_params = list(params)
+            if after is not None:
+                page_clauses.append("(COALESCE(s.last_used, ''), p.id) < (?, ?)")
+                page_params += after
+            if page_clauses:
+                sql += " WHERE " + " AND ".join(page_clauses)
+            sql += " ORDER BY last_used DESC, p.id DESC" + limit_sql
+        if limit is not None:
+            page_params.append(limit)
+
+        with self._lock:
+            total = self._conn.execute(count_sql, base_params).fetchone()[0]
+            rows = self._conn.execute(sql, page_params).fetchall()
+        results = []
+        for position_id, data, raw_text, analytics, statistics, sort_value in rows:
+            results.append(([sort_value, position_id], self._to_position(data, raw_text, analytics, statistics)))
+        return results, total
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_position_store(data_dir: Path):
+    """Store configurado en POSITIONS_STORE (json por defecto)"""
+    if POSITIONS_STORE == "sqlite":
+        db_path = Path(POSITIONS_DB_PATH) if POSITIONS_DB_PATH else Path(data_dir) / "positions.db"
+        try:
+            return SqlitePositionStore(db_path)
+        except sqlite3.Error as e:
+            # p. ej. SQLite sin FTS5
+            logger.error(f"No se pudo abrir el store SQLite ({e}); se usan archivos JSON")
+    elif POSITIONS_STORE != "json":
+        logger.warning(f"POSITIONS_STORE desconocido '{POSITIONS_STORE}'; se usan archivos JSON")
+    return JsonPositionStore(data_dir)
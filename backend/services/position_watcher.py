@@ -0,0 +1,217 @@
+"""
+Recarga automática de posiciones al cambiar archivos
+Vigila POSITIONS_PDFS_DIR y POSITIONS_DATA_DIR (inotify en Linux vía ctypes,
+sondeo periódico en otros sistemas), agrupa los eventos hasta que la carpeta
+queda quieta POSITIONS_WATCH_DEBOUNCE segundos y procesa en un hilo solo los
+archivos afectados. Activar con POSITIONS_WATCH=true.
+Si la cola de inotify se desborda (IN_Q_OVERFLOW) se perdieron eventos: en vez
+del lote se llama a `on_rescan`, que resincroniza las carpetas completas.
+"""
+import os
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+POSITIONS_WATCH = os.getenv("POSITIONS_WATCH", "false").strip().lower() in ("1", "true", "yes")
+POSITIONS_WATCH_DEBOUNCE = float(os.getenv("POSITIONS_WATCH_DEBOUNCE", "2.0"))
+# Intervalo del sondeo cuando inotify no está disponible
+POSITIONS_WATCH_POLL_INTERVAL = float(os.getenv("POSITIONS_WATCH_POLL_INTERVAL", "5.0"))
+
+# Constantes de <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+# Temporales de escrituras atómicas y el manifiesto no son posiciones
+_IGNORED_PREFIXES = (".", "_")
+
+
+def _relevant(name: str) -> bool:
+    return not name.startswith(_IGNORED_PREFIXES) and name.lower().endswith((".pdf", ".json"))
+
+
+class _InotifySource:
+    """
+    Eventos de inotify (Linux) leídos con ctypes, sin dependencias.
+    `overflowed` queda en True si el kernel descartó eventos (cola llena).
+    """
+
+    def __init__(self, directories: List[Path]):
+        self.overflowed = False
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._dirs: Dict[int, Path] = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if wd < 0:
+                os.close(self._fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch {directory}")
+            self._dirs[wd] = directory
+
+    def wait(self, timeout: float) -> Set[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                # wd == -1 y sin nombre: no se sabe qué archivos cambiaron
+                self.overflowed = True
+            elif name and wd in self._dirs and _relevant(name):
+                changed.add(self._dirs[wd] / name)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingSource:
+    """Alternativa portátil: compara (tamaño, mtime) de las carpetas cada intervalo"""
+
+    def __init__(self, directories: List[Path], interval: float):
+        # Cada sondeo compara la carpeta completa: nunca pierde cambios
+        self.overflowed = False
+        self._directories = directories
+        self._interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for directory in self._directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not _relevant(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout: float) -> Set[Path]:
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_scan = time.monotonic() + self._interval
+        current = self._scan()
+        previous, self._snapshot = self._snapshot, current
+        return {path for path in previous.keys() | current.keys() if previous.get(path) != current.get(path)}
+
+    def close(self) -> None:
+        pass
+
+
+class PositionWatcher:
+    """
+    Hilo que vigila las carpetas y llama a `on_changes(rutas)` con cada lote
+    de archivos modificados, una vez que dejan de llegar eventos. Si se
+    perdieron eventos llama a `on_rescan()` en su lugar.
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[Path],
+        on_changes: Callable[[List[Path]], object],
+        on_rescan: Optional[Callable[[], object]] = None,
+        debounce: float = POSITIONS_WATCH_DEBOUNCE,
+        poll_interval: float = POSITIONS_WATCH_POLL_INTERVAL
+    ):
+        self.directories = [Path(directory) for directory in directories]
+        self.on_changes = on_changes
+        self.on_rescan = on_rescan
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open_source(self):
+        try:
+            source = _InotifySource(self.directories)
+            self.backend = "inotify"
+            return source
+        except (OSError, AttributeError) as e:
+            # Sin inotify (macOS, Windows, límite de watches): sondeo
+            logger.info(f"inotify no disponible ({e}); vigilando por sondeo cada {self.poll_interval}s")
+            self.backend = "polling"
+            return _PollingSource(self.directories, self.poll_interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        source = self._open_source()
+        self._thread = threading.Thread(target=self._run, args=(source,), name="position-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watcher de posiciones activo ({self.backend}): {', '.join(map(str, self.directories))}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, source) -> None:
+        pending: Set[Path] = set()
+        rescan = False
+        last_event = 0.0
+        try:
+            while not self._stop.is_set():
+                changed = source.wait(0.5)
+                now = time.monotonic()
+                if source.overflowed:
+                    source.overflowed = False
+                    if not rescan:
+                        logger.warning("Cola de inotify desbordada: se resincronizarán las carpetas completas")
+                    rescan = self.on_rescan is not None
+                    last_event = now
+                if changed:
+                    pending |= changed
+                    last_event = now
+                    continue
+                # Procesar cuando la carpeta lleva `debounce` segundos sin eventos
+                if (pending or rescan) and now - last_event >= self.debounce:
+                    batch, pending = sorted(pending), set()
+                    try:
+                        if rescan:
+                            rescan = False
+                            result = self.on_rescan()
+                        else:
+                            result = self.on_changes(batch)
+                        logger.info("Cambios en posiciones aplicados: %s", result)
+                    except Exception as e:
+                        logger.error(f"Error aplicando cambios de posiciones: {e}", exc_info=True)
+        finally:
+            source.close()
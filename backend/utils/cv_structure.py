@@ -0,0 +1,253 @@
+"""
+Estructura de un CV a partir del texto extraído
+Detecta secciones (experiencia, educación, certificaciones, habilidades,
+idiomas, perfil), rangos de fechas y viñetas en una sola pasada por líneas.
+El resultado se cachea por hash del texto: se calcula una vez por documento
+y el analizador, el validador o un pre-filtro pueden trabajar solo con las
+secciones que necesitan.
+"""
+import os
+import re
+import hashlib
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, List, Optional
+
+from utils.lru_cache import LRUCache
+from utils.term_matcher import fold_text
+
+CV_STRUCTURE_CACHE_SIZE = int(os.getenv("CV_STRUCTURE_CACHE_SIZE", "512"))
+# Cambiar cuando cambien las reglas de detección (invalida la caché)
+STRUCTURE_VERSION = "3"
+
+# Sección implícita para el texto antes del primer encabezado (nombre, contacto, título)
+HEADER_SECTION = "encabezado"
+
+# Encabezados reconocidos por sección (sin acentos, minúsculas)
+SECTION_HEADINGS: Dict[str, List[str]] = {
+    "perfil": [
+        "perfil", "perfil profesional", "resumen", "resumen profesional", "acerca de mi",
+        "objetivo", "objetivo profesional", "summary", "profile", "about me",
+    ],
+    "experiencia": [
+        "experiencia", "experiencia laboral", "experiencia profesional", "trayectoria",
+        "trayectoria profesional", "historial laboral", "empleos", "experience",
+        "work experience", "professional experience", "employment history",
+    ],
+    "educacion": [
+        "educacion", "formacion", "formacion academica", "estudios", "estudios realizados",
+        "preparacion academica", "education", "academic background",
+    ],
+    "certificaciones": [
+        "certificaciones", "certificados", "cursos", "cursos y certificaciones",
+        "certificaciones y cursos", "diplomados", "licencias", "certifications",
+        "courses", "licenses and certifications",
+    ],
+    "habilidades": [
+        "habilidades", "habilidades tecnicas", "competencias", "competencias tecnicas",
+        "conocimientos", "conocimientos tecnicos", "aptitudes", "herramientas",
+        "tecnologias", "skills", "technical skills",
+    ],
+    "idiomas": ["idiomas", "lenguas", "languages"],
+}
+
+_HEADING_INDEX = {heading: name for name, headings in SECTION_HEADINGS.items() for heading in headings}
+_MAX_HEADING_CHARS = 60
+
+_BULLET_RE = re.compile(r"^\s*(?:[•●▪◦‣∙·*\-–—]|\d{1,2}[.)](?=\s))\s*")
+# "o" como viñeta (Word la exporta así) se confunde con la conjunción al inicio
+# de una línea partida: solo cuenta si una línea vecina también empieza con "o "
+_O_BULLET_RE = re.compile(r"^\s*o\s+")
+
+_MONTHS = {
+    "ene": 1, "jan": 1, "feb": 2, "mar": 3, "abr": 4, "apr": 4, "may": 5,
+    "jun": 6, "jul": 7, "ago": 8, "aug": 8, "sep": 9, "set": 9, "oct": 10,
+    "nov": 11, "dic": 12, "dec": 12,
+}
+# Nombres completos y abreviaturas (español e inglés); \b evita leer "Summary" como "mar"
+_MONTH = (
+    r"\b(?:ene(?:ro)?|jan(?:uary)?|feb(?:rero|ruary)?|mar(?:zo|ch)?|abr(?:il)?|apr(?:il)?"
+    r"|may(?:o)?|jun(?:io|e)?|jul(?:io|y)?|ago(?:sto)?|aug(?:ust)?"
+    r"|sep(?:t|tiembre|tember)?|set(?:iembre)?|oct(?:ubre|ober)?|nov(?:iembre|ember)?"
+    r"|dic(?:iembre)?|dec(?:ember)?)\b\.?"
+)
+
+
+def _date_pattern(prefix: str) -> str:
+    """Fecha con mes opcional (nombre o número); grupos <prefix>m, <prefix>n y <prefix>y"""
+    return (
+        rf"(?:(?P<{prefix}m>{_MONTH})\s+(?:de\s+|del\s+)?|(?P<{prefix}n>\d{{1,2}})[/.-])?"
+        rf"(?P<{prefix}y>(?:19|20)\d{{2}})"
+    )
+
+
+_CURRENT = r"(?P<current>actualidad|actual|presente|la\s+fecha|hoy|present|current|now)"
+_DATE_RANGE_RE = re.compile(
+    _date_pattern("s")
+    + r"\s*(?:-|–|—|a|al|hasta|to)\s*(?:la\s+)?(?:"
+    + _date_pattern("e") + "|" + _CURRENT + r")\b"
+)
+
+
+@dataclass
+class DateRange:
+    """Periodo encontrado en el texto; fechas como "AAAA-MM" o "AAAA" """
+    start: str
+    end: Optional[str]
+    current: bool
+    raw: str
+
+
+@dataclass
+class CvSection:
+    """Sección del CV con su posición dentro del texto"""
+    name: str
+    title: str
+    start: int
+    end: int
+    text: str
+    items: List[str] = field(default_factory=list)
+    date_ranges: List[DateRange] = field(default_factory=list)
+
+
+@dataclass
+class CvDocument:
+    """CV estructurado por secciones"""
+    text_hash: str
+    sections: List[CvSection]
+
+    def section(self, name: str) -> Optional[CvSection]:
+        """Primera sección con ese nombre (None si el CV no la tiene)"""
+        return next((section for section in self.sections if section.name == name), None)
+
+    def text_for(self, names: Iterable[str]) -> str:
+        """Texto de las secciones indicadas, en el orden del documento"""
+        wanted = set(names)
+        return "\n".join(section.text for section in self.sections if section.name in wanted)
+
+    @property
+    def date_ranges(self) -> List[DateRange]:
+        return [date_range for section in self.sections for date_range in section.date_ranges]
+
+    def to_dict(self, include_text: bool = False) -> dict:
+        """
+        Versión serializable. Por defecto sin el texto de cada sección (ya va en
+        el texto plano; start/end son posiciones dentro de él) para no duplicarlo.
+        """
+        sections = []
+        for section in self.sections:
+            data = asdict(section)
+            if not include_text:
+                data.pop("text")
+            sections.append(data)
+        return {"version": STRUCTURE_VERSION, "sections": sections}
+
+
+def _heading_name(line: str) -> Optional[str]:
+    """Nombre de sección si la línea es un encabezado reconocido"""
+    if len(line) > _MAX_HEADING_CHARS:
+        return None
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", fold_text(line)).split())
+    # Quitar numeración ("1 experiencia")
+    normalized = re.sub(r"^\d+\s+", "", normalized)
+    return _HEADING_INDEX.get(normalized)
+
+
+def _normalize_date(month: Optional[str], month_number: Optional[str], year: str) -> str:
+    if month:
+        return f"{year}-{_MONTHS[month[:3]]:02d}"
+    if month_number and 1 <= int(month_number) <= 12:
+        return f"{year}-{int(month_number):02d}"
+    return year
+
+
+def extract_date_ranges(text: str) -> List[DateRange]:
+    """Rangos "ene 2020 - actual", "03/2018 – 12/2021", "2015 a 2019", etc."""
+    ranges = []
+    folded = fold_text(text)
+    # fold_text conserva las posiciones salvo casos raros; si no, se reporta el texto normalizado
+    same_offsets = len(folded) == len(text)
+    for match in _DATE_RANGE_RE.finditer(folded):
+        groups = match.groupdict()
+        start = _normalize_date(groups["sm"], groups["sn"], groups["sy"])
+        current = groups["current"] is not None
+        end = None if current else _normalize_date(groups["em"], groups["en"], groups["ey"])
+        raw = text[match.start():match.end()] if same_offsets else match.group(0)
+        ranges.append(DateRange(start=start, end=end, current=current, raw=raw))
+    return ranges
+
+
+def _extract_items(lines: List[str]) -> List[str]:
+    """Viñetas de una sección; las líneas de continuación se unen a la viñeta anterior"""
+    items: List[str] = []
+    in_item = False
+    o_marked = [_O_BULLET_RE.match(line) is not None for line in lines]
+    for index, line in enumerate(lines):
+        bullet = _BULLET_RE.match(line)
+        if bullet is None and o_marked[index] and (
+            (index > 0 and o_marked[index - 1]) or (index + 1 < len(lines) and o_marked[index + 1])
+        ):
+            bullet = _O_BULLET_RE.match(line)
+        if bullet:
+            items.append(line[bullet.end():].strip())
+            in_item = True
+        elif in_item and line[:1].islower():
+            # El PDF partió la viñeta en varias líneas
+            items[-1] = f"{items[-1]} {line}"
+        else:
+            in_item = False
+    return [item for item in items if item]
+
+
+def _build_section(name: str, title: str, text: str, start: int, end: int, lines: List[str]) -> CvSection:
+    body = text[start:end]
+    return CvSection(
+        name=name,
+        title=title,
+        start=start,
+        end=end,
+        text=body,
+        items=_extract_items(lines),
+        date_ranges=extract_date_ranges(body),
+    )
+
+
+def _structure(text: str, text_hash: str) -> CvDocument:
+    sections: List[CvSection] = []
+    current_name, current_title = HEADER_SECTION, ""
+    section_start = 0
+    section_lines: List[str] = []
+
+    offset = 0
+    for raw_line in text.splitlines(keepends=True):
+        line = raw_line.strip()
+        name = _heading_name(line) if line else None
+        if name is not None:
+            if section_lines:
+                sections.append(_build_section(
+                    current_name, current_title, text, section_start, offset, section_lines
+                ))
+            current_name, current_title = name, line
+            section_start = offset + len(raw_line)
+            section_lines = []
+        elif line:
+            section_lines.append(line)
+        offset += len(raw_line)
+
+    if section_lines:
+        sections.append(_build_section(current_name, current_title, text, section_start, len(text), section_lines))
+
+    return CvDocument(text_hash=text_hash, sections=sections)
+
+
+_structure_cache = LRUCache(CV_STRUCTURE_CACHE_SIZE)
+
+
+def structure_cv(text: str) -> CvDocument:
+    """CV estructurado; cacheado por hash del texto y versión de las reglas"""
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    key = (text_hash, STRUCTURE_VERSION)
+    document = _structure_cache.get(key)
+    if document is None:
+        document = _structure(text, text_hash)
+        _structure_cache.set(key, document)
+    return document
@@ -0,0 +1,208 @@
+"""
+Caché del texto extraído de PDFs por hash de contenido
+Un mismo CV o JD se extrae una sola vez: la clave es el SHA-256 del PDF más
+la versión del extractor (ver utils.pdf_parser.EXTRACTOR_VERSION), con dos niveles:
+- Memoria: LRU acotada (EXTRACTION_CACHE_SIZE entradas)
+- Disco (opcional): un JSON por documento en EXTRACTION_CACHE_DIR (sobrevive reinicios)
+Solo se guardan extracciones exitosas; los errores se reintentan siempre.
+
+El texto de un CV es dato personal: el nivel en disco está desactivado salvo que
+se configure EXTRACTION_CACHE_DIR. Retención en disco:
+- Cada entrada vive a lo sumo EXTRACTION_CACHE_TTL_HOURS desde que se escribió;
+  las vencidas no se sirven y se borran
+- El directorio se limita a EXTRACTION_CACHE_DISK_MAX_ENTRIES archivos y
+  EXTRACTION_CACHE_DISK_MAX_MB; al pasarse se borran las más antiguas
+La poda corre al iniciar y cada vez que una escritura supera algún límite.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from utils.lru_cache import LRUCache
+from utils.pdf_extractors import PdfSource
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = Path(__file__).parent.parent
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "256"))
+# Vacío (por defecto) desactiva el nivel en disco; p. ej. backend/cache/extraction
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "")
+EXTRACTION_CACHE_TTL_HOURS = float(os.getenv("EXTRACTION_CACHE_TTL_HOURS", "168"))
+EXTRACTION_CACHE_DISK_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_DISK_MAX_ENTRIES", "2000"))
+EXTRACTION_CACHE_DISK_MAX_MB = int(os.getenv("EXTRACTION_CACHE_DISK_MAX_MB", "200"))
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_pdf_source(source: PdfSource) -> str:
+    """SHA-256 del contenido del PDF (bytes o ruta, leída por bloques)"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Caché de dos niveles (memoria + disco) para resultados de extracción"""
+
+    def __init__(
+        self,
+        maxsize: int = EXTRACTION_CACHE_SIZE,
+        cache_dir: Optional[str] = EXTRACTION_CACHE_DIR,
+        version: str = "1",
+        ttl_hours: float = EXTRACTION_CACHE_TTL_HOURS,
+        max_disk_entries: int = EXTRACTION_CACHE_DISK_MAX_ENTRIES,
+        max_disk_mb: int = EXTRACTION_CACHE_DISK_MAX_MB
+    ):
+        self.version = version
+        self._memory = LRUCache(maxsize)
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        # Totales aproximados del disco (se recalculan en cada poda)
+        self._disk_entries = 0
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"No se pudo crear el directorio de caché de extracción ({e}); solo memoria")
+                self.cache_dir = None
+            else:
+                self.prune()
+
+    def key_for(self, source: PdfSource, version: Optional[str] = None) -> str:
+        return f"{hash_pdf_source(source)}:{version or self.version}"
+
+    def _path_for(self, key: str) -> Path:
+        digest, version = key.split(":", 1)
+        safe_version = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in version)
+        return self.cache_dir / digest[:2] / f"{digest}-{safe_version}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Entrada {"text", "warnings", "page_count"} o None"""
+        entry = self._memory.get(key)
+        if entry is not None or self.cache_dir is None:
+            return entry
+
+        path = self._path_for(key)
+        try:
+            if self._expired(path.stat().st_mtime):
+                self._remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché de extracción ilegible ({path.name}): {e}")
+            return None
+
+        self._memory.set(key, entry)
+        return entry
+
+    def set(self, key: str, text: str, warnings: list, page_count: int) -> None:
+        entry = {"text": text, "warnings": list(warnings), "page_count": page_count}
+        self._memory.set(key, entry)
+        if self.cache_dir is None:
+            return
+
+        path = self._path_for(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: un lector concurrente nunca ve un JSON a medias
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp_", suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_name, path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la extracción en disco: {e}")
+            return
+
+        with self._disk_lock:
+            self._disk_entries += 1
+            self._disk_bytes += size
+            over_limit = self._disk_entries > self.max_disk_entries or self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self.prune()
+
+    def _expired(self, mtime: float, now: Optional[float] = None) -> bool:
+        return self.ttl_seconds > 0 and (now or time.time()) - mtime > self.ttl_seconds
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"No se pudo borrar la entrada de caché de extracción {path.name}: {e}")
+
+    def prune(self) -> int:
+        """
+        Borra del disco las entradas vencidas y, si aún se superan los límites,
+        las más antiguas. Devuelve cuántas se borraron.
+        """
+        if self.cache_dir is None:
+            return 0
+        with self._disk_lock:
+            now = time.time()
+            entries, removed = [], 0
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if self._expired(stat.st_mtime, now):
+                    self._remove(path)
+                    removed += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            # Más antiguas primero
+            entries.sort(key=lambda item: item[0])
+            total_bytes = sum(size for _, size, _ in entries)
+            evicted = 0
+            while evicted < len(entries) and (
+                len(entries) - evicted > self.max_disk_entries or total_bytes > self.max_disk_bytes
+            ):
+                _, size, path = entries[evicted]
+                self._remove(path)
+                total_bytes -= size
+                evicted += 1
+
+            removed += evicted
+            self._disk_entries = len(entries) - evicted
+            self._disk_bytes = total_bytes
+        if removed:
+            logger.info(
+                f"Caché de extracción: {removed} entradas borradas del disco, "
+                f"quedan {self._disk_entries} ({self._disk_bytes / (1024 * 1024):.1f} MB)"
+            )
+        return removed
+
+    def lookup(self, source: PdfSource, version: Optional[str] = None) -> Tuple[str, Optional[dict]]:
+        """Calcula la clave de la fuente y devuelve (clave, entrada o None)"""
+        key = self.key_for(source, version)
+        return key, self.get(key)
+
+    def clear(self) -> None:
+        """Vacía el nivel en memoria (el de disco se invalida cambiando la versión)"""
+        self._memory.clear()
+
+    def stats(self) -> dict:
+        stats = {**self._memory.stats(), "disk": str(self.cache_dir) if self.cache_dir else None}
+        if self.cache_dir is not None:
+            stats.update(disk_entries=self._disk_entries, disk_bytes=self._disk_bytes)
+        return stats
+
@@ -0,0 +1,211 @@
+"""
+Configuración de logging estructurado de bajo costo para producción
+- Formato JSON (una línea por registro) o texto, según LOG_FORMAT
+- QueueHandler no bloqueante: el event loop solo encola; la escritura a stderr
+  y a disco ocurre en un hilo aparte (QueueListener)
+- request_id por petición mediante contextvars (el X-Request-ID del cliente se
+  acepta solo si es un identificador simple; si no, se genera uno)
+- Payloads grandes (p. ej. respuestas de IA) muestreados a una tasa configurable,
+  con volcados completos a un spool local solo cuando está habilitado
+"""
+import os
+import re
+import sys
+import json
+import uuid
+import queue
+import random
+import atexit
+import hashlib
+import logging
+import logging.handlers
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fracción de payloads grandes cuyo extracto se incluye en el log (0.0 - 1.0)
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.05"))
+LOG_PAYLOAD_PREVIEW_CHARS = int(os.getenv("LOG_PAYLOAD_PREVIEW_CHARS", "500"))
+# Carpeta local para volcados completos de payloads (vacío = desactivado)
+LOG_SPOOL_DIR = os.getenv("LOG_SPOOL_DIR", "")
+
+# Identificador de la petición en curso (lo asigna el middleware de main.py)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+# Termina en logs, en la respuesta y en nombres de archivo del spool
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Campos de log_payload que el formato texto agrega al final de la línea
+_TEXT_PAYLOAD_FIELDS = ("payload_label", "payload_chars", "payload_sha1", "payload_head", "payload_tail")
+
+# Atributos estándar de LogRecord que no se repiten como campos extra en JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "spool_payload",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def resolve_request_id(client_value: Optional[str]) -> str:
+    """El X-Request-ID recibido si es válido; si no, uno nuevo"""
+    if client_value and _REQUEST_ID_RE.fullmatch(client_value):
+        return client_value
+    return uuid.uuid4().hex[:12]
+
+
+class RequestIdFilter(logging.Filter):
+    """Agrega el request_id del contexto actual a cada registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que nunca bloquea al llamador.
+    Solo resuelve el mensaje (formato % perezoso) y delega el resto del trabajo
+    (tracebacks, JSON, I/O) al hilo del listener. Si la cola está llena,
+    descarta el registro y lo contabiliza.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Serializa cada registro como una línea JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Una línea legible; los registros de log_payload llevan además sus campos (extracto incluido)"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - [%(levelname)s] - %(name)s - [%(request_id)s] - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [
+            f"{key}={json.dumps(getattr(record, key), ensure_ascii=False, default=str)}"
+            for key in _TEXT_PAYLOAD_FIELDS
+            if hasattr(record, key)
+        ]
+        return f"{line} | {' '.join(fields)}" if fields else line
+
+
+class PayloadSpoolHandler(logging.Handler):
+    """Escribe en LOG_SPOOL_DIR el payload completo de los registros que lo traen"""
+
+    def __init__(self, spool_dir: Path):
+        super().__init__()
+        self.spool_dir = spool_dir
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        payload = getattr(record, "spool_payload", None)
+        if payload is None:
+            return
+        try:
+            timestamp = datetime.fromtimestamp(record.created, tz=timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+            label = getattr(record, "payload_label", "payload")
+            path = self.spool_dir / f"{timestamp}_{getattr(record, 'request_id', '-')}_{label}.txt"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(payload)
+        except Exception:
+            self.handleError(record)
+
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """
+    Configura el logging raíz con una cola no bloqueante.
+    Es idempotente: llamadas posteriores devuelven el listener existente.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(TextFormatter())
+
+    handlers = [stream_handler]
+    if LOG_SPOOL_DIR:
+        handlers.append(PayloadSpoolHandler(Path(LOG_SPOOL_DIR)))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def log_payload(
+    logger: logging.Logger,
+    label: str,
+    payload: str,
+    level: int = logging.ERROR,
+    **context
+) -> None:
+    """
+    Registra un payload grande de forma acotada.
+    Siempre se registra su longitud y huella (sha1); el extracto solo se
+    incluye en una fracción LOG_PAYLOAD_SAMPLE_RATE de los casos, y el
+    contenido completo solo va al spool local si LOG_SPOOL_DIR está definido.
+    """
+    if not logger.isEnabledFor(level):
+        return
+
+    payload = payload or ""
+    extra = {
+        "payload_label": label,
+        "payload_chars": len(payload),
+        "payload_sha1": hashlib.sha1(payload.encode("utf-8", "replace")).hexdigest()[:12],
+        **context,
+    }
+    if random.random() < LOG_PAYLOAD_SAMPLE_RATE:
+        extra["payload_head"] = payload[:LOG_PAYLOAD_PREVIEW_CHARS]
+        if len(payload) > LOG_PAYLOAD_PREVIEW_CHARS:
+            extra["payload_tail"] = payload[-LOG_PAYLOAD_PREVIEW_CHARS:]
+    if LOG_SPOOL_DIR:
+        extra["spool_payload"] = payload
+
+    logger.log(level, "Payload %s (%d caracteres)", label, len(payload), extra=extra)
@@ -0,0 +1,234 @@
+"""
+Backends intercambiables de extracción de texto de PDFs
+PyPDF2 es el backend por defecto (el que está en requirements.txt). Se pueden
+activar alternativas más rápidas o con mejor texto en CVs a varias columnas
+instalando el paquete correspondiente y configurando PDF_EXTRACTOR_BACKEND:
+- pypdf2   : PyPDF2 (por defecto)
+- pypdf    : pypdf, sucesor mantenido de PyPDF2 (pip install pypdf)
+- pymupdf  : PyMuPDF/MuPDF en C, el más rápido (pip install pymupdf)
+- pdfminer : pdfminer.six, análisis de layout (pip install pdfminer.six)
+Si el backend configurado no está instalado se usa PyPDF2.
+Ver scripts/bench_pdf_extractors.py para compararlos sobre un corpus.
+"""
+import os
+import io
+import mmap
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from io import BytesIO
+from typing import ContextManager, Dict, Iterator, List, Optional, Type, Union
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTRACTOR_BACKEND = os.getenv("PDF_EXTRACTOR_BACKEND", "pypdf2").strip().lower()
+DEFAULT_BACKEND = "pypdf2"
+
+# Un PDF puede venir en memoria (bytes) o como ruta a un archivo en disco
+# (p. ej. una subida ya volcada a un temporal, ver utils.upload_spool)
+PdfSource = Union[bytes, str, os.PathLike]
+
+
+def _is_in_memory(source: PdfSource) -> bool:
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+@contextmanager
+def open_pdf_stream(source: PdfSource) -> Iterator:
+    """
+    Abre la fuente como stream binario sin copiarla completa a memoria.
+    Las rutas se mapean en memoria (mmap de solo lectura): el sistema operativo
+    carga las páginas del archivo bajo demanda.
+    """
+    if _is_in_memory(source):
+        yield BytesIO(source)
+        return
+
+    with open(source, "rb") as fh:
+        try:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Archivo vacío: no se puede mapear; el backend reportará el error
+            yield fh
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+class PdfDocument(ABC):
+    """Documento abierto por un backend: número de páginas y texto por página"""
+
+    num_pages: int = 0
+
+    @abstractmethod
+    def page_text(self, index: int) -> str:
+        """Texto de la página `index` (desde 0)"""
+
+
+class PdfExtractor(ABC):
+    """
+    Interfaz de un backend de extracción.
+    Las subclases implementan open() como context manager que entrega un PdfDocument.
+    """
+
+    name: str = ""
+    # Paquete que debe poder importarse para usar el backend
+    module: str = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            __import__(cls.module)
+            return True
+        except ImportError:
+            return False
+
+    @property
+    def version(self) -> str:
+        lib = __import__(self.module)
+        return str(getattr(lib, "__version__", getattr(lib, "VersionBind", "0")))
+
+    @abstractmethod
+    def open(self, source: PdfSource) -> ContextManager[PdfDocument]:
+        """Abre la fuente; al salir del bloque se liberan el documento y el stream"""
+
+
+_EXTRACTORS: Dict[str, Type[PdfExtractor]] = {}
+
+
+def register_extractor(cls: Type[PdfExtractor]) -> Type[PdfExtractor]:
+    """Registra un backend bajo su nombre (decorador)"""
+    _EXTRACTORS[cls.name] = cls
+    return cls
+
+
+def available_extractors() -> List[str]:
+    return [name for name, cls in _EXTRACTORS.items() if cls.available()]
+
+
+class _PagesDocument(PdfDocument):
+    """Documento para lectores con la API de PyPDF2/pypdf (reader.pages[i].extract_text())"""
+
+    def __init__(self, reader):
+        self._reader = reader
+        self.num_pages = len(reader.pages)
+
+    def page_text(self, index: int) -> str:
+        return self._reader.pages[index].extract_text() or ""
+
+
+@register_extractor
+class PyPDF2Extractor(PdfExtractor):
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    @contextmanager
+    def open(self, source: PdfSource) -> Iterator[PdfDocument]:
+        import PyPDF2
+        with open_pdf_stream(source) as stream:
+            yield _PagesDocument(PyPDF2.PdfReader(stream))
+
+
+@register_extractor
+class PypdfExtractor(PdfExtractor):
+    name = "pypdf"
+    module = "pypdf"
+
+    @contextmanager
+    def open(self, source: PdfSource) -> Iterator[PdfDocument]:
+        import pypdf
+        with open_pdf_stream(source) as stream:
+            yield _PagesDocument(pypdf.PdfReader(stream))
+
+
+class _PyMuPDFDocument(PdfDocument):
+    def __init__(self, document):
+        self._document = document
+        self.num_pages = document.page_count
+
+    def page_text(self, index: int) -> str:
+        # sort=True ordena los bloques por posición (mejor en CVs a varias columnas)
+        return self._document[index].get_text("text", sort=True) or ""
+
+
+@register_extractor
+class PyMuPDFExtractor(PdfExtractor):
+    name = "pymupdf"
+    module = "pymupdf"
+
+    @contextmanager
+    def open(self, source: PdfSource) -> Iterator[PdfDocument]:
+        import pymupdf
+        # MuPDF abre rutas directamente (sin pasar por Python) y bytes en memoria
+        if _is_in_memory(source):
+            document = pymupdf.open(stream=bytes(source), filetype="pdf")
+        else:
+            document = pymupdf.open(os.fspath(source), filetype="pdf")
+        try:
+            yield _PyMuPDFDocument(document)
+        finally:
+            document.close()
+
+
+class _PdfMinerDocument(PdfDocument):
+    def __init__(self, stream):
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+
+        self._pages = list(PDFPage.get_pages(stream))
+        self._resources = PDFResourceManager(caching=True)
+        self._laparams = LAParams()
+        self.num_pages = len(self._pages)
+
+    def page_text(self, index: int) -> str:
+        from pdfminer.converter import TextConverter
+        from pdfminer.pdfinterp import PDFPageInterpreter
+
+        output = io.StringIO()
+        device = TextConverter(self._resources, output, laparams=self._laparams)
+        try:
+            PDFPageInterpreter(self._resources, device).process_page(self._pages[index])
+        finally:
+            device.close()
+        return output.getvalue()
+
+
+@register_extractor
+class PdfMinerExtractor(PdfExtractor):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    @contextmanager
+    def open(self, source: PdfSource) -> Iterator[PdfDocument]:
+        with open_pdf_stream(source) as stream:
+            yield _PdfMinerDocument(stream)
+
+
+_active: Optional[PdfExtractor] = None
+
+
+def get_extractor(name: Optional[str] = None) -> PdfExtractor:
+    """
+    Backend por nombre, o el configurado en PDF_EXTRACTOR_BACKEND.
+    Si no existe o no está instalado, se usa PyPDF2.
+    """
+    global _active
+    if name is None and _active is not None:
+        return _active
+
+    requested = (name or PDF_EXTRACTOR_BACKEND).strip().lower()
+    cls = _EXTRACTORS.get(requested)
+    if cls is None:
+        logger.warning(f"Backend de extracción desconocido '{requested}'; usando {DEFAULT_BACKEND}")
+        cls = _EXTRACTORS[DEFAULT_BACKEND]
+    elif not cls.available():
+        logger.warning(f"Backend de extracción '{requested}' no instalado ({cls.module}); usando {DEFAULT_BACKEND}")
+        cls = _EXTRACTORS[DEFAULT_BACKEND]
+
+    extractor = cls()
+    if name is None:
+        _active = extractor
+    return extractor
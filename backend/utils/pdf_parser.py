@@ -2,49 +2,238 @@
 Utility functions to extract text from PDF files securely
 SIN RESTRICCIONES DE TAMAÑO para Job Descriptions y CVs
 """
-from typing import Tuple
-from io import BytesIO
-import PyPDF2
+from typing import Iterator, List, Optional, Tuple
+from dataclasses import dataclass
 import logging
 
+from utils.extraction_cache import ExtractionCache
+from utils.pdf_extractors import PdfDocument, PdfExtractor, PdfSource, get_extractor
+
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(file_bytes: bytes) -> Tuple[str, list[str]]:
+# Cambiar el sufijo cuando cambie la normalización del texto: invalida la caché
+_NORMALIZATION_VERSION = "1"
+
+# Estimación de tokens por caracteres (aprox. para español/inglés en modelos GPT/Claude)
+CHARS_PER_TOKEN = 4
+
+
+def extractor_version(extractor: PdfExtractor) -> str:
+    """Identifica backend, versión de la librería y normalización (clave de la caché)"""
+    return f"{extractor.name}-{extractor.version}-{_NORMALIZATION_VERSION}"
+
+
+EXTRACTOR_VERSION = extractor_version(get_extractor())
+
+
+def count_pdf_pages(source: PdfSource, extractor: Optional[PdfExtractor] = None) -> int:
+    """Número de páginas del PDF (0 si no se puede leer)"""
+    try:
+        with (extractor or get_extractor()).open(source) as document:
+            return document.num_pages
+    except Exception as e:
+        logger.warning(f"No se pudo contar páginas del PDF: {str(e)}")
+        return 0
+
+
+def extract_pages(document: PdfDocument, start: int, stop: int) -> Tuple[List[str], List[str]]:
+    """
+    Extrae el texto de las páginas [start, stop) de un documento ya abierto,
+    sin normalizar; las páginas con error se omiten con advertencia.
+    """
+    parts: List[str] = []
+    warnings: List[str] = []
+    for page_index in range(start, stop):
+        try:
+            parts.append(document.page_text(page_index))
+        except Exception as e:
+            logger.warning(f"Error extrayendo texto de la página {page_index + 1}: {str(e)}")
+            warnings.append(f"Error en página {page_index + 1}: {str(e)}")
+            continue
+    return parts, warnings
+
+
+def extract_page_range(source: PdfSource, start: int, stop: int) -> Tuple[List[str], List[str]]:
     """
-    Extrae texto de un archivo PDF (bytes) y retorna texto más advertencias.
+    Extrae un rango de páginas [start, stop) sin normalizar.
+    Pensado para ejecutarse en paralelo en varios procesos (ver utils.pdf_pool).
+    """
+    with get_extractor().open(source) as document:
+        return extract_pages(document, start, min(stop, document.num_pages))
+
+
+def join_page_texts(parts: List[str]) -> str:
+    """Une el texto de las páginas y normaliza espacios"""
+    combined_text = "\n".join(parts)
+    # Normalizar espacios (mantener estructura pero limpiar espacios excesivos)
+    return "\n".join(
+        line.strip() for line in combined_text.splitlines() if line.strip()
+    )
+
+
+# Caché compartida por hash de contenido (memoria + disco)
+extraction_cache = ExtractionCache(version=EXTRACTOR_VERSION)
+
+
+def extract_text_from_pdf(source: PdfSource, extractor: Optional[PdfExtractor] = None) -> Tuple[str, list[str]]:
+    """
+    Extrae texto de un archivo PDF (bytes o ruta) y retorna texto más advertencias.
     SIN RESTRICCIONES DE TAMAÑO: Extrae todo el texto del PDF sin límites.
+    Los documentos ya extraídos se sirven desde extraction_cache.
+
+    Args:
+        extractor: backend a usar (por defecto el de PDF_EXTRACTOR_BACKEND)
     """
+    extractor = extractor or get_extractor()
+    try:
+        cache_key, cached = extraction_cache.lookup(source, extractor_version(extractor))
+    except OSError as e:
+        logger.warning(f"No se pudo calcular el hash del PDF: {e}")
+        cache_key, cached = None, None
+    if cached is not None:
+        logger.debug("Extracción servida desde caché (%d caracteres)", len(cached["text"]))
+        return cached["text"], list(cached["warnings"])
+
     warnings: list[str] = []
-    
+
     try:
-        reader = PyPDF2.PdfReader(BytesIO(file_bytes))
-        num_pages = len(reader.pages)
-        
-        logger.info(f"Extrayendo texto de PDF con {num_pages} páginas (sin restricciones de tamaño)")
-        
-        extracted_text_parts: list[str] = []
-        for page_index in range(num_pages):
+        with extractor.open(source) as document:
+            num_pages = document.num_pages
+
+            logger.info(f"Extrayendo texto de PDF con {num_pages} páginas (sin restricciones de tamaño)")
+
+            extracted_text_parts, page_warnings = extract_pages(document, 0, num_pages)
+            warnings.extend(page_warnings)
+
+        combined_text = join_page_texts(extracted_text_parts)
+
+        logger.info(f"Texto extraído: {len(combined_text)} caracteres de {num_pages} páginas")
+
+        if cache_key is not None:
+            extraction_cache.set(cache_key, combined_text, warnings, num_pages)
+        return combined_text, warnings
+
+    except Exception as e:
+        logger.error(f"Error extrayendo texto del PDF: {str(e)}")
+        warnings.append(f"Error general al procesar PDF: {str(e)}")
+        return "", warnings
+
+
+@dataclass
+class PdfPage:
+    """Página extraída por iter_pdf_pages"""
+    number: int               # 1-based
+    text: str                 # normalizada (ver join_page_texts)
+    total_pages: int = 0
+    warning: Optional[str] = None
+    truncated: bool = False   # la página se cortó al alcanzar el presupuesto
+
+
+# Por qué se detuvo iter_pdf_pages (valor de retorno del generador)
+PAGES_EXHAUSTED = "exhausted"   # no quedó texto sin entregar
+PAGES_BUDGET = "budget"         # quedó texto fuera del presupuesto de caracteres/tokens
+PAGES_MAX_PAGES = "max_pages"   # quedó texto en páginas después de max_pages
+
+
+def _char_budget(max_chars: Optional[int], max_tokens: Optional[int]) -> Optional[int]:
+    budgets = [b for b in (max_chars, max_tokens * CHARS_PER_TOKEN if max_tokens is not None else None) if b is not None]
+    return min(budgets) if budgets else None
+
+
+def iter_pdf_pages(
+    source: PdfSource,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    extractor: Optional[PdfExtractor] = None
+) -> Iterator[PdfPage]:
+    """
+    Extrae páginas de forma perezosa: solo se parsea la siguiente página cuando
+    el consumidor la pide, y se detiene al alcanzar el presupuesto de
+    caracteres, de tokens (estimados con CHARS_PER_TOKEN) o de páginas.
+    La última página se recorta para no exceder el presupuesto. Las páginas con
+    error se entregan vacías con su advertencia.
+
+    Unir los textos con "\n" da el mismo resultado que extract_text_from_pdf
+    (hasta el presupuesto).
+
+    El valor de retorno del generador (StopIteration.value) dice por qué se
+    detuvo: PAGES_EXHAUSTED, PAGES_BUDGET o PAGES_MAX_PAGES. Para saberlo se
+    leen las páginas siguientes hasta encontrar una con texto, así las páginas
+    en blanco al final no cuentan como contenido perdido.
+
+    Raises:
+        Exception: si el documento no se puede abrir (error del backend)
+    """
+    budget = _char_budget(max_chars, max_tokens)
+    used = 0
+    with (extractor or get_extractor()).open(source) as document:
+        total = document.num_pages
+        last_page = total if max_pages is None else min(max_pages, total)
+        for page_index in range(last_page):
             try:
-                page = reader.pages[page_index]
-                page_text = page.extract_text() or ""
-                extracted_text_parts.append(page_text)
+                text = join_page_texts([document.page_text(page_index)])
             except Exception as e:
                 logger.warning(f"Error extrayendo texto de la página {page_index + 1}: {str(e)}")
-                warnings.append(f"Error en página {page_index + 1}: {str(e)}")
+                yield PdfPage(number=page_index + 1, text="", total_pages=total,
+                              warning=f"Error en página {page_index + 1}: {str(e)}")
+                continue
+            if not text:
                 continue
 
-        combined_text = "\n".join(extracted_text_parts)
-        
-        logger.info(f"Texto extraído: {len(combined_text)} caracteres de {num_pages} páginas")
+            # El separador "\n" entre páginas también cuenta para el presupuesto
+            cost = len(text) + (1 if used else 0)
+            if budget is not None and used + cost > budget:
+                remaining = budget - used - (1 if used else 0)
+                if remaining > 0:
+                    yield PdfPage(number=page_index + 1, text=text[:remaining].rstrip(), total_pages=total, truncated=True)
+                return PAGES_BUDGET
+            used += cost
+            yield PdfPage(number=page_index + 1, text=text, total_pages=total)
 
-        # Normalizar espacios (mantener estructura pero limpiar espacios excesivos)
-        combined_text = "\n".join(
-            line.strip() for line in combined_text.splitlines() if line.strip()
-        )
+        if _has_text(document, last_page, total):
+            return PAGES_MAX_PAGES
+        return PAGES_EXHAUSTED
 
-        return combined_text, warnings
-        
+
+def _has_text(document: PdfDocument, start: int, stop: int) -> bool:
+    """True si alguna página de [start, stop) tiene texto; una ilegible cuenta como que sí"""
+    for page_index in range(start, stop):
+        try:
+            if document.page_text(page_index).strip():
+                return True
+        except Exception:
+            return True
+    return False
+
+
+def extract_text_within_budget(
+    source: PdfSource,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    max_pages: Optional[int] = None
+) -> Tuple[str, List[str], bool]:
+    """
+    Versión acotada de extract_text_from_pdf sobre iter_pdf_pages.
+    Retorna (texto, advertencias, truncado); truncado indica que quedó
+    contenido sin extraer por el presupuesto.
+    """
+    texts: List[str] = []
+    warnings: List[str] = []
+    try:
+        pages = iter_pdf_pages(source, max_chars, max_tokens, max_pages)
+        while True:
+            try:
+                page = next(pages)
+            except StopIteration as stop:
+                truncated = stop.value != PAGES_EXHAUSTED
+                break
+            if page.warning:
+                warnings.append(page.warning)
+            if page.text:
+                texts.append(page.text)
+        return "\n".join(texts), warnings, truncated
     except Exception as e:
         logger.error(f"Error extrayendo texto del PDF: {str(e)}")
         warnings.append(f"Error general al procesar PDF: {str(e)}")
-        return "", warnings
+        return "", warnings, False
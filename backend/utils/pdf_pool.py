@@ -0,0 +1,340 @@
+"""
+Pool de procesos para extraer texto de PDFs fuera del event loop
+PyPDF2 es CPU puro en Python: ejecutarlo dentro de un handler async bloquea
+todas las peticiones. Aquí se ejecuta en procesos aparte, con:
+- Tamaño de pool configurable (PDF_WORKERS)
+- Tiempo máximo por archivo (PDF_EXTRACTION_TIMEOUT, segundos)
+- Límite de memoria por proceso (PDF_WORKER_MEMORY_MB, solo Linux/Unix)
+- PDFs grandes (>= PDF_PARALLEL_MIN_PAGES) repartidos por rangos de páginas
+  entre varios procesos y reensamblados en orden
+
+Si un worker no responde ni a su propia alarma, se terminan todos los procesos
+del pool (ProcessPoolExecutor no permite matar uno solo). Las extracciones que
+corrían en ese momento en otros workers se pierden: se reintentan una vez en el
+pool nuevo y, si vuelve a fallar, se lanza PdfPoolUnavailable (503 en la API).
+"""
+import os
+import signal
+import asyncio
+import logging
+import weakref
+import threading
+import multiprocessing
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from utils.pdf_parser import (
+    PdfSource, extract_page_range, extract_pages, extraction_cache, get_extractor, join_page_texts
+)
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_EXTRACTION_TIMEOUT = float(os.getenv("PDF_EXTRACTION_TIMEOUT", "60"))
+PDF_WORKER_MEMORY_MB = int(os.getenv("PDF_WORKER_MEMORY_MB", "1024"))
+# PDFs con al menos estas páginas se extraen en paralelo (0 = nunca)
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+# Páginas mínimas por tarea, para que el costo de abrir el PDF en cada proceso compense
+PDF_MIN_PAGES_PER_TASK = int(os.getenv("PDF_MIN_PAGES_PER_TASK", "4"))
+# "spawn" evita heredar locks de hilos del proceso principal (logging, carga de posiciones)
+PDF_POOL_START_METHOD = os.getenv("PDF_POOL_START_METHOD", "spawn")
+
+# Margen del tiempo máximo de respaldo sobre PDF_EXTRACTION_TIMEOUT (arranque del worker)
+_BACKSTOP_MARGIN = 10.0
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Workers libres: solo se envía una tarea cuando hay uno, así el tiempo máximo
+# de respaldo corre desde que la tarea empieza y no incluye la espera en cola
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+# Pools terminados por el tiempo máximo de respaldo de alguna de sus tareas
+_terminated_pools: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+
+@dataclass
+class PdfExtraction:
+    """Resultado de extraer un PDF en el pool"""
+    text: str
+    warnings: List[str] = field(default_factory=list)
+    page_count: int = 0
+
+
+class PdfExtractionTimeout(Exception):
+    """La extracción de un PDF excedió PDF_EXTRACTION_TIMEOUT"""
+
+
+class PdfPoolUnavailable(Exception):
+    """El pool se cayó durante la extracción (p. ej. un worker murió); se puede reintentar"""
+
+
+class _WorkerTimeout(BaseException):
+    """
+    Señal interna del worker. Hereda de BaseException para que no la
+    absorban los `except Exception` del parser página por página.
+    """
+
+
+def _init_worker(memory_mb: int):
+    """Inicializa cada proceso del pool: límite de memoria y señales"""
+    # Ctrl+C lo gestiona el proceso principal, que cierra el pool ordenadamente
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memory_mb > 0:
+        try:
+            import resource
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning(f"No se pudo aplicar límite de memoria al worker de PDFs: {e}")
+
+
+def _raise_timeout(signum, frame):
+    raise _WorkerTimeout()
+
+
+class _Alarm:
+    """Temporizador por tarea dentro del worker (SIGALRM)"""
+
+    def __init__(self, timeout: float):
+        self.enabled = timeout > 0 and hasattr(signal, "setitimer")
+        self.timeout = timeout
+
+    def __enter__(self):
+        if self.enabled:
+            signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        return False
+
+
+def _extract_in_worker(source: PdfSource, timeout: float, parallel_min_pages: int) -> tuple:
+    """
+    Extrae el PDF completo dentro del worker.
+    Devuelve uno de:
+        ("ok", texto, advertencias, páginas)
+        ("split", páginas)   -> el documento es grande; el llamador lo reparte por rangos
+        ("timeout",)
+    """
+    try:
+        with _Alarm(timeout):
+            try:
+                with get_extractor().open(source) as document:
+                    num_pages = document.num_pages
+                    if parallel_min_pages > 0 and num_pages >= parallel_min_pages:
+                        return ("split", num_pages)
+
+                    parts, warnings = extract_pages(document, 0, num_pages)
+                    return ("ok", join_page_texts(parts), warnings, num_pages)
+            except Exception as e:
+                logger.error(f"Error extrayendo texto del PDF: {str(e)}")
+                return ("ok", "", [f"Error general al procesar PDF: {str(e)}"], 0)
+    except _WorkerTimeout:
+        return ("timeout",)
+
+
+def _extract_range_in_worker(source: PdfSource, start: int, stop: int, timeout: float) -> Optional[Tuple[List[str], List[str]]]:
+    """Extrae un rango de páginas dentro del worker; None si excede el tiempo máximo"""
+    try:
+        with _Alarm(timeout):
+            return extract_page_range(source, start, stop)
+    except _WorkerTimeout:
+        return None
+
+
+def split_page_ranges(num_pages: int, workers: int, min_pages_per_task: int = 1) -> List[Tuple[int, int]]:
+    """Divide [0, num_pages) en rangos contiguos de tamaño similar, uno por worker como máximo"""
+    if num_pages <= 0:
+        return []
+    tasks = max(1, min(workers, num_pages // max(1, min_pages_per_task)))
+    size, extra = divmod(num_pages, tasks)
+    ranges = []
+    start = 0
+    for index in range(tasks):
+        stop = start + size + (1 if index < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Pool compartido, creado bajo demanda"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, PDF_WORKERS),
+                mp_context=multiprocessing.get_context(PDF_POOL_START_METHOD),
+                initializer=_init_worker,
+                initargs=(PDF_WORKER_MEMORY_MB,),
+            )
+            logger.info(
+                f"Pool de extracción de PDFs iniciado: {PDF_WORKERS} procesos, "
+                f"timeout {PDF_EXTRACTION_TIMEOUT}s, memoria {PDF_WORKER_MEMORY_MB} MB"
+            )
+        return _executor
+
+
+def _discard_executor(broken: ProcessPoolExecutor, terminate: bool = False):
+    """
+    Descarta un pool roto (p. ej. un worker murió por memoria) para que se recree.
+    Con `terminate` además termina todos sus procesos (un worker colgado no se
+    libera solo); las tareas de los demás workers fallan con BrokenProcessPool
+    y _run_in_pool las reintenta en el pool nuevo.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    if terminate:
+        _terminated_pools.add(broken)
+        terminate_workers = getattr(broken, "terminate_workers", None)  # API pública, Python 3.14+
+        if terminate_workers is not None:
+            terminate_workers()
+        else:
+            # Versiones anteriores: sin API pública, se terminan los procesos del pool
+            for process in list((getattr(broken, "_processes", None) or {}).values()):
+                process.terminate()
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pdf_pool():
+    """Cierra el pool (se llama al apagar la aplicación)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Pool de extracción de PDFs cerrado")
+
+
+def _pool_slots() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots, _slots_loop = asyncio.Semaphore(max(1, PDF_WORKERS)), loop
+    return _slots
+
+
+async def _run_in_pool(executor: ProcessPoolExecutor, func, *args, retry: bool = True):
+    """
+    Ejecuta una función en el pool con un tiempo máximo de respaldo, medido desde
+    que un worker la toma (la espera por un worker libre no cuenta).
+    Si el pool lo terminó el tiempo máximo de otra tarea, se reintenta una vez
+    en el pool nuevo.
+
+    Raises:
+        PdfExtractionTimeout: si esta tarea excede el tiempo máximo de respaldo
+        PdfPoolUnavailable: si el pool se cayó y no se pudo reintentar
+    """
+    loop = asyncio.get_running_loop()
+    slots = _pool_slots()
+    await slots.acquire()
+
+    def release(_future):
+        # El lugar se libera cuando el worker termina, no cuando se deja de esperar
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:
+            pass  # event loop ya cerrado (apagado)
+
+    backstop = PDF_EXTRACTION_TIMEOUT + _BACKSTOP_MARGIN if PDF_EXTRACTION_TIMEOUT > 0 else None
+    try:
+        future = executor.submit(func, *args)
+    except (BrokenProcessPool, RuntimeError) as e:
+        # RuntimeError: el pool ya estaba cerrado (lo descartó otra tarea)
+        slots.release()
+        if retry and executor in _terminated_pools:
+            return await _run_in_pool(get_pdf_executor(), func, *args, retry=False)
+        raise PdfPoolUnavailable("El pool de extracción de PDFs no está disponible") from e
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(release)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=backstop)
+    except asyncio.TimeoutError:
+        # El worker no respondió a su propia alarma (p. ej. bloqueado en código nativo):
+        # se termina el pool para recuperar el proceso
+        logger.error(f"Un worker de PDFs no respondió en {backstop:.0f}s; se recreará el pool")
+        _discard_executor(executor, terminate=True)
+        raise PdfExtractionTimeout(f"La extracción excedió {backstop:.0f}s")
+    except BrokenProcessPool as e:
+        if retry and executor in _terminated_pools:
+            logger.warning("El pool de PDFs se terminó por otra tarea; se reintenta la extracción")
+            return await _run_in_pool(get_pdf_executor(), func, *args, retry=False)
+        logger.error("Un worker de extracción de PDFs terminó inesperadamente; se recreará el pool")
+        _discard_executor(executor)
+        raise PdfPoolUnavailable("Un worker de extracción de PDFs terminó inesperadamente") from e
+
+
+async def extract_pdf_async(source: PdfSource) -> PdfExtraction:
+    """
+    Extrae un PDF en el pool de procesos y devuelve texto, advertencias y páginas.
+    Conviene pasar una ruta (p. ej. la subida volcada a disco): así el PDF no se
+    serializa hacia cada worker, que lo abre con mmap.
+    Los PDFs grandes se reparten por rangos de páginas entre los workers; el
+    texto se reensambla en orden y se conservan las advertencias por página.
+    Los documentos ya extraídos se sirven desde la caché por hash de contenido.
+
+    Raises:
+        PdfExtractionTimeout: si el archivo (o alguno de sus rangos) excede PDF_EXTRACTION_TIMEOUT
+        PdfPoolUnavailable: si el pool se cayó durante la extracción (reintentable)
+    """
+    # Hash y lectura de disco fuera del event loop
+    cache_key, cached = await asyncio.to_thread(extraction_cache.lookup, source)
+    if cached is not None:
+        return PdfExtraction(text=cached["text"], warnings=list(cached["warnings"]), page_count=cached["page_count"])
+
+    extraction = await _extract_uncached(source)
+    # page_count == 0 indica que el PDF no se pudo abrir: no se cachea
+    if extraction.page_count > 0:
+        await asyncio.to_thread(
+            extraction_cache.set, cache_key, extraction.text, extraction.warnings, extraction.page_count
+        )
+    return extraction
+
+
+async def _extract_uncached(source: PdfSource) -> PdfExtraction:
+    executor = get_pdf_executor()
+    parallel_min_pages = PDF_PARALLEL_MIN_PAGES if PDF_WORKERS > 1 else 0
+
+    result = await _run_in_pool(executor, _extract_in_worker, source, PDF_EXTRACTION_TIMEOUT, parallel_min_pages)
+    if result[0] == "timeout":
+        raise PdfExtractionTimeout(f"La extracción excedió {PDF_EXTRACTION_TIMEOUT:.0f}s")
+    if result[0] == "ok":
+        return PdfExtraction(text=result[1], warnings=result[2], page_count=result[3])
+
+    num_pages = result[1]
+    ranges = split_page_ranges(num_pages, PDF_WORKERS, PDF_MIN_PAGES_PER_TASK)
+    logger.info(f"Extrayendo PDF de {num_pages} páginas en paralelo ({len(ranges)} rangos)")
+
+    # El pool pudo recrearse mientras tanto
+    executor = get_pdf_executor()
+    range_results = await asyncio.gather(*[
+        _run_in_pool(executor, _extract_range_in_worker, source, start, stop, PDF_EXTRACTION_TIMEOUT)
+        for start, stop in ranges
+    ])
+    if any(range_result is None for range_result in range_results):
+        raise PdfExtractionTimeout(f"La extracción de un rango de páginas excedió {PDF_EXTRACTION_TIMEOUT:.0f}s")
+
+    parts: List[str] = []
+    warnings: List[str] = []
+    for range_parts, range_warnings in range_results:
+        parts.extend(range_parts)
+        warnings.extend(range_warnings)
+
+    text = join_page_texts(parts)
+    logger.info(f"Texto extraído: {len(text)} caracteres de {num_pages} páginas")
+    return PdfExtraction(text=text, warnings=warnings, page_count=num_pages)
+
+
+async def extract_text_async(source: PdfSource) -> Tuple[str, list]:
+    """Versión async de extract_text_from_pdf que se ejecuta en el pool de procesos"""
+    extraction = await extract_pdf_async(source)
+    return extraction.text, extraction.warnings
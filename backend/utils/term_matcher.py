@@ -0,0 +1,205 @@
+"""
+Buscador compilado de múltiples términos para el validador ético
+Compila listas de términos en una sola expresión regular en forma de trie:
+- Una sola pasada lineal por el texto, con posición (span) de cada coincidencia
+- Límites de palabra (no detecta "edad" dentro de "antigüedad")
+- Insensible a mayúsculas y acentos ("genero" coincide con "género")
+"""
+import re
+import json
+import hashlib
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Variantes acentuadas aceptadas para cada letra base
+_ACCENT_VARIANTS = {
+    "a": "aáàäâã",
+    "e": "eéèëê",
+    "i": "iíìïî",
+    "o": "oóòöôõ",
+    "u": "uúùüû",
+    "n": "nñ",
+    "c": "cç",
+}
+
+# Marca de fin de término dentro del trie
+_END = ""
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas sin acentos ni diacríticos"""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _char_pattern(ch: str) -> str:
+    """Patrón para un carácter de un término ya normalizado"""
+    if ch in _ACCENT_VARIANTS:
+        return f"[{_ACCENT_VARIANTS[ch]}]"
+    if ch.isspace():
+        return r"\s+"
+    return re.escape(ch)
+
+
+def _normalize_term(term: str) -> str:
+    return " ".join(fold_text(term).split())
+
+
+@dataclass(frozen=True)
+class TermHit:
+    """Coincidencia de un término en un texto"""
+    term: str
+    category: str
+    start: int
+    end: int
+
+
+class TermMatcher:
+    """
+    Compila diccionarios de términos por categoría en un autómata de una pasada.
+
+    Args:
+        dictionaries: {categoría: [términos]}; el orden de los términos se
+            conserva en los resultados de find_terms()
+    """
+
+    def __init__(self, dictionaries: Dict[str, Sequence[str]]):
+        self.dictionaries: Dict[str, List[str]] = {
+            category: list(terms) for category, terms in dictionaries.items()
+        }
+        self.version = hashlib.sha256(
+            json.dumps(self.dictionaries, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+
+        # Términos únicos (normalizados) -> categorías en las que aparecen
+        self._terms: List[str] = []
+        self._term_index: Dict[str, int] = {}
+        self._categories_by_term: List[List[str]] = []
+        # Orden de cada término dentro de su categoría (para resultados estables)
+        self._rank: Dict[tuple, int] = {}
+        for category, terms in self.dictionaries.items():
+            for rank, term in enumerate(terms):
+                normalized = _normalize_term(term)
+                if not normalized:
+                    continue
+                if normalized not in self._term_index:
+                    self._term_index[normalized] = len(self._terms)
+                    self._terms.append(term)
+                    self._categories_by_term.append([])
+                index = self._term_index[normalized]
+                if category not in self._categories_by_term[index]:
+                    self._categories_by_term[index].append(category)
+                    self._rank[(category, index)] = rank
+
+        # Términos contenidos dentro de otros ("joven" dentro de "muy joven"):
+        # el trie reporta el más largo y estos se derivan de la misma coincidencia
+        self._standalone = {
+            index: re.compile(rf"\b{self._term_pattern(normalized)}(?!\w)", re.IGNORECASE)
+            for normalized, index in self._term_index.items()
+        }
+        self._nested: Dict[int, List[int]] = {}
+        for outer_term, outer in self._term_index.items():
+            for inner_term, inner in self._term_index.items():
+                if inner != outer and len(inner_term) < len(outer_term) and self._standalone[inner].search(outer_term):
+                    self._nested.setdefault(outer, []).append(inner)
+
+        self._patterns: Dict[FrozenSet[str], Optional[re.Pattern]] = {}
+        self.pattern(None)
+
+    @staticmethod
+    def _term_pattern(normalized: str) -> str:
+        return "".join(_char_pattern(ch) for ch in normalized)
+
+    def _build_pattern(self, indexes: List[int]) -> Optional[re.Pattern]:
+        if not indexes:
+            return None
+
+        trie: Dict = {}
+        for index in indexes:
+            node = trie
+            for ch in _normalize_term(self._terms[index]):
+                node = node.setdefault(" " if ch.isspace() else ch, {})
+            node[_END] = index
+
+        def emit(node: Dict) -> str:
+            # Continuaciones primero: gana la coincidencia más larga
+            branches = [
+                _char_pattern(ch) + emit(child)
+                for ch, child in node.items() if ch != _END
+            ]
+            if _END in node:
+                branches.append(rf"(?!\w)(?P<t{node[_END]}>)")
+            if len(branches) == 1:
+                return branches[0]
+            return "(?:" + "|".join(branches) + ")"
+
+        # La preanticipación con las letras iniciales permite descartar rápido
+        # las posiciones que no pueden iniciar ningún término
+        lookahead = "(?=" + "|".join(sorted({_char_pattern(ch) for ch in trie})) + ")"
+        return re.compile(lookahead + r"\b" + emit(trie), re.IGNORECASE)
+
+    def pattern(self, categories: Optional[Iterable[str]] = None) -> Optional[re.Pattern]:
+        """Expresión compilada (y cacheada) para un conjunto de categorías"""
+        key = frozenset(categories) if categories is not None else frozenset(self.dictionaries)
+        if key not in self._patterns:
+            indexes = [
+                index for index, cats in enumerate(self._categories_by_term)
+                if any(category in key for category in cats)
+            ]
+            self._patterns[key] = self._build_pattern(indexes)
+        return self._patterns[key]
+
+    def _iter_matches(self, text: str, wanted: FrozenSet[str]) -> Iterator[Tuple[int, int, int]]:
+        """(índice de término, inicio, fin) de cada coincidencia, incluyendo términos anidados"""
+        compiled = self.pattern(wanted)
+        if compiled is None or not text:
+            return
+        for match in compiled.finditer(text):
+            index = int(match.lastgroup[1:])
+            start, end = match.start(), match.end()
+            yield index, start, end
+            for inner in self._nested.get(index, ()):
+                inner_match = self._standalone[inner].search(text, start, end)
+                if inner_match:
+                    yield inner, inner_match.start(), inner_match.end()
+
+    def scan(self, text: str, categories: Optional[Iterable[str]] = None) -> List[TermHit]:
+        """
+        Encuentra todas las coincidencias en una sola pasada.
+        Devuelve una TermHit por término y categoría, en orden de aparición.
+        """
+        wanted = frozenset(categories) if categories is not None else frozenset(self.dictionaries)
+        return [
+            TermHit(self._terms[index], category, start, end)
+            for index, start, end in self._iter_matches(text, wanted)
+            for category in self._categories_by_term[index]
+            if category in wanted
+        ]
+
+    def find_terms(self, text: str, categories: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Términos encontrados por categoría (sin repetir), en el orden en que
+        aparecen en el diccionario de cada categoría.
+        """
+        wanted = frozenset(categories) if categories is not None else frozenset(self.dictionaries)
+        ranks: Dict[str, set] = {category: set() for category in wanted}
+        for index, _, _ in self._iter_matches(text, wanted):
+            for category in self._categories_by_term[index]:
+                if category in wanted:
+                    ranks[category].add(self._rank[(category, index)])
+        return {
+            category: [self.dictionaries[category][rank] for rank in sorted(found)]
+            for category, found in ranks.items()
+        }
+
+    def remove(self, text: str, categories: Optional[Iterable[str]] = None) -> str:
+        """
+        Elimina de un texto todos los términos de las categorías indicadas en
+        una sola pasada (la coincidencia más larga gana, p. ej. "muy joven").
+        No normaliza espacios; eso queda a cargo del llamador.
+        """
+        compiled = self.pattern(categories)
+        if compiled is None or not text:
+            return text
+        return compiled.sub("", text)
@@ -0,0 +1,133 @@
+"""
+Límite de tamaño de subidas y volcado de archivos subidos a disco por bloques
+- UploadLimitMiddleware corta las peticiones multipart que exceden el tope antes
+  de que Starlette las vuelque: por Content-Length sin leer el cuerpo, o
+  contando bytes mientras llega (cuerpos chunked); responde 413
+- spooled_upload evita `await file.read()` (todo el archivo en memoria más la
+  copia en BytesIO del parser): copia la subida a un temporal con nombre en
+  bloques, que el parser abre con mmap y que los workers del pool reciben como ruta
+"""
+import os
+import logging
+import tempfile
+from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+# Tope del cuerpo completo de /api/extract-text/batch (varios archivos)
+MAX_BATCH_UPLOAD_MB = int(os.getenv("MAX_BATCH_UPLOAD_MB", "200"))
+MAX_BATCH_UPLOAD_BYTES = MAX_BATCH_UPLOAD_MB * 1024 * 1024
+# Margen para los encabezados multipart y los campos de texto del formulario
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Directorio de temporales (por defecto el del sistema)
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+if UPLOAD_SPOOL_DIR:
+    Path(UPLOAD_SPOOL_DIR).mkdir(parents=True, exist_ok=True)
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"El archivo excede el tamaño máximo permitido ({max_bytes // (1024 * 1024)} MB)."
+    )
+
+
+class UploadLimitMiddleware:
+    """
+    Middleware ASGI: limita el cuerpo de las peticiones multipart/form-data a
+    max_bytes (o al tope de su ruta en path_limits) más el margen del formulario.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        file_limit = self.path_limits.get(scope["path"], self.max_bytes)
+        if file_limit <= 0:
+            await self.app(scope, receive, send)
+            return
+        limit = file_limit + MULTIPART_OVERHEAD_BYTES
+
+        try:
+            declared = int(headers.get(b"content-length", b""))
+        except ValueError:
+            declared = None
+        if declared is not None and declared > limit:
+            logger.warning("Subida rechazada: %d bytes en %s", declared, scope["path"])
+            response = JSONResponse(status_code=413, content={"detail": _too_large(file_limit).detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI deja pasar HTTPException al parsear el formulario
+                    raise _too_large(file_limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+@asynccontextmanager
+async def spooled_upload(
+    file: UploadFile,
+    max_bytes: Optional[int] = None,
+    suffix: str = ".pdf"
+) -> AsyncIterator[Path]:
+    """
+    Copia la subida a un archivo temporal y entrega su ruta; el temporal se
+    elimina al salir del bloque. El tope por petición lo aplica
+    UploadLimitMiddleware al recibir el cuerpo; aquí se verifica el de cada archivo.
+
+    Raises:
+        HTTPException(413): si el archivo supera max_bytes (por defecto MAX_UPLOAD_MB)
+    """
+    limit = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    # Rechazo inmediato si el tamaño ya se conoce
+    if limit > 0 and file.size is not None and file.size > limit:
+        raise _too_large(limit)
+
+    fd, tmp_name = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+    path = Path(tmp_name)
+    try:
+        written = 0
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if limit > 0 and written > limit:
+                    raise _too_large(limit)
+                out.write(chunk)
+        logger.debug("Subida %s volcada a disco: %d bytes", file.filename, written)
+        yield path
+    finally:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -1,7 +1,7 @@
 'use client'
 
 import { useState, ChangeEvent } from 'react'
-import { extractTextFromPdf } from '@/lib/api'
+import { extractTextFromPdfBatch } from '@/lib/api'
 import type { CandidateDocumentPayload } from '@/types'
 import { UploadCloud, Loader2, AlertTriangle, CheckCircle2, Trash2, Users } from 'lucide-react'
 
@@ -69,6 +69,8 @@ export function CandidateForm({ onCandidatesChange, onSummaryChange }: Props) {
 
     const newItems: CandidateItem[] = []
     const updatedItems = [...items]
+    const pdfFiles: File[] = []
+    const pendingItems: CandidateItem[] = []
 
     for (const file of Array.from(files)) {
       if (file.type !== 'application/pdf') {
@@ -91,17 +93,45 @@ export function CandidateForm({ onCandidatesChange, onSummaryChange }: Props) {
         warnings: [],
       }
 
+      pdfFiles.push(file)
+      pendingItems.push(tempItem)
       updatedItems.push(tempItem)
-      setItems([...updatedItems])
+    }
+
+    setItems([...updatedItems])
 
+    if (pdfFiles.length > 0) {
+      // Todos los PDFs van en una sola petición; cada resultado llega en cuanto termina
       try {
-        const { text, warnings } = await extractTextFromPdf(file)
-        tempItem.status = 'ready'
-        tempItem.content = text.slice(0, MAX_TEXT_LENGTH)
-        tempItem.warnings = warnings || []
+        await extractTextFromPdfBatch(pdfFiles, result => {
+          const tempItem = pendingItems[result.index]
+          if (!tempItem) return
+          if (result.error) {
+            tempItem.status = 'error'
+            tempItem.errorMessage = result.error
+          } else {
+            tempItem.status = 'ready'
+            tempItem.content = result.text.slice(0, MAX_TEXT_LENGTH)
+            tempItem.warnings = result.warnings || []
+          }
+          setItems([...updatedItems])
+          syncCandidates(updatedItems)
+        })
       } catch (error: any) {
-        tempItem.status = 'error'
-        tempItem.errorMessage = error?.response?.data?.detail || 'No fue posible procesar el PDF.'
+        for (const tempItem of pendingItems) {
+          if (tempItem.status === 'loading') {
+            tempItem.status = 'error'
+            tempItem.errorMessage = error?.message || 'No fue posible procesar el PDF.'
+          }
+        }
+      }
+
+      // Archivos sin respuesta (conexión interrumpida)
+      for (const tempItem of pendingItems) {
+        if (tempItem.status === 'loading') {
+          tempItem.status = 'error'
+          tempItem.errorMessage = 'No fue posible procesar el PDF.'
+        }
       }
 
       setItems([...updatedItems])
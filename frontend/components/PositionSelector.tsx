@@ -1,9 +1,9 @@
 'use client'
 
 import { useState, useEffect } from 'react'
-import { getPositions, getPosition } from '@/lib/api'
+import { getAllPositions, getPosition } from '@/lib/api'
 import { Search, Building2, MapPin, BarChart3, Clock, CheckCircle2, Loader2, AlertTriangle, ChevronDown } from 'lucide-react'
-import type { Position } from '@/types'
+import type { Position, PositionSummary } from '@/types'
 
 interface Props {
   jobDescription: string
@@ -12,12 +12,12 @@ interface Props {
 }
 
 export function PositionSelector({ jobDescription, onJobDescriptionChange, onPositionSelect }: Props) {
-  const [positions, setPositions] = useState<Position[]>([])
+  const [positions, setPositions] = useState<PositionSummary[]>([])
   const [isLoading, setIsLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [searchQuery, setSearchQuery] = useState('')
   const [selectedDepartment, setSelectedDepartment] = useState<string>('all')
-  const [selectedPosition, setSelectedPosition] = useState<Position | null>(null)
+  const [selectedPosition, setSelectedPosition] = useState<PositionSummary | null>(null)
   const [showDropdown, setShowDropdown] = useState(false)
 
   // Cargar posiciones al montar
@@ -32,12 +32,16 @@ export function PositionSelector({ jobDescription, onJobDescriptionChange, onPos
     }
   }, [jobDescription])
 
-  const loadPositions = async () => {
-    setIsLoading(true)
+  const loadPositions = async (background = false) => {
+    if (!background) setIsLoading(true)
     setError(null)
     try {
-      const response = await getPositions({ status: 'active' })
-      setPositions(response.positions)
+      const { positions, loading } = await getAllPositions({ status: 'active' })
+      setPositions(positions)
+      // El backend acaba de arrancar y sigue cargando posiciones: volver a pedir
+      if (loading) {
+        setTimeout(() => loadPositions(true), 3000)
+      }
     } catch (err: any) {
       const detail = err?.response?.data?.detail || 'Error al cargar posiciones'
       setError(detail)
@@ -70,23 +74,17 @@ export function PositionSelector({ jobDescription, onJobDescriptionChange, onPos
     return `hace ${Math.floor(diffDays / 30)} meses`
   }
 
-  const handleSelectPosition = async (position: Position) => {
+  const handleSelectPosition = async (position: PositionSummary) => {
     setSelectedPosition(position)
     setShowDropdown(false)
-    // Cargar el texto completo del JD si no está en la posición básica
-    if (position.job_description?.raw_text) {
-      onJobDescriptionChange(position.job_description.raw_text)
-      onPositionSelect?.(position)
-    } else {
-      // Si no está, obtener la posición completa
-      try {
-        const fullPosition = await getPosition(position.id)
-        onJobDescriptionChange(fullPosition.job_description.raw_text)
-        onPositionSelect?.(fullPosition)
-      } catch (err) {
-        console.error('Error obteniendo posición completa:', err)
-        setError('Error al cargar el Job Description de la posición')
-      }
+    // El listado es resumido: el texto del JD se obtiene con la posición completa
+    try {
+      const fullPosition = await getPosition(position.id)
+      onJobDescriptionChange(fullPosition.job_description.raw_text)
+      onPositionSelect?.(fullPosition)
+    } catch (err) {
+      console.error('Error obteniendo posición completa:', err)
+      setError('Error al cargar el Job Description de la posición')
     }
   }
 
@@ -267,11 +265,11 @@ export function PositionSelector({ jobDescription, onJobDescriptionChange, onPos
                             <div style={{ display: 'flex', gap: '1rem', fontSize: '0.75rem', color: '#94a3b8', marginTop: '0.5rem' }}>
                               <div style={{ display: 'flex', alignItems: 'center', gap: '0.25rem' }}>
                                 <BarChart3 className="h-3 w-3" />
-                                <span>{position.statistics.candidates_analyzed} analizados</span>
+                                <span>{position.candidates_analyzed} analizados</span>
                               </div>
                               <div style={{ display: 'flex', alignItems: 'center', gap: '0.25rem' }}>
                                 <Clock className="h-3 w-3" />
-                                <span>{formatLastUsed(position.statistics.last_used)}</span>
+                                <span>{formatLastUsed(position.last_used)}</span>
                               </div>
                             </div>
                           </div>
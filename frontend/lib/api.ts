@@ -9,7 +9,10 @@ import type {
   CandidateActionResponse,
   AuditLogResponse,
   Position,
+  PositionSummary,
   PositionsResponse,
+  PositionMatchResponse,
+  PdfBatchResult,
 } from '@/types'
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
@@ -75,6 +78,63 @@ export async function extractTextFromPdf(file: File): Promise<{ text: string; wa
   return response.data
 }
 
+/**
+ * Extrae varios PDFs en una sola petición. El backend responde NDJSON (una
+ * línea por archivo) y onResult se invoca en cuanto termina cada uno.
+ */
+export async function extractTextFromPdfBatch(
+  files: File[],
+  onResult: (result: PdfBatchResult) => void
+): Promise<void> {
+  const formData = new FormData()
+  files.forEach(file => formData.append('files', file))
+
+  const token = typeof window !== 'undefined' ? localStorage.getItem('agente-rh-token') : null
+  const headers: Record<string, string> = {}
+  if (token) {
+    headers['Authorization'] = `Bearer ${token}`
+  }
+
+  // fetch en lugar de axios: permite leer el cuerpo a medida que llega
+  const response = await fetch(`${API_URL}/api/extract-text/batch`, {
+    method: 'POST',
+    body: formData,
+    headers,
+  })
+  if (response.status === 401 && typeof window !== 'undefined') {
+    // Mismo manejo que el interceptor de apiClient
+    localStorage.removeItem('agente-rh-token')
+    localStorage.removeItem('agente-rh-user')
+    window.location.href = '/login'
+  }
+  if (!response.ok || !response.body) {
+    let detail = 'No fue posible procesar los PDFs.'
+    try {
+      detail = (await response.json()).detail || detail
+    } catch {
+      // cuerpo no JSON
+    }
+    throw new Error(detail)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let newline = buffer.indexOf('\n')
+    while (newline >= 0) {
+      const line = buffer.slice(0, newline).trim()
+      buffer = buffer.slice(newline + 1)
+      if (line) onResult(JSON.parse(line) as PdfBatchResult)
+      newline = buffer.indexOf('\n')
+    }
+  }
+  if (buffer.trim()) onResult(JSON.parse(buffer) as PdfBatchResult)
+}
+
 export async function sendChatMessage(payload: ChatRequestPayload): Promise<ChatResponsePayload> {
   const response = await apiClient.post<ChatResponsePayload>('/api/chat', payload)
   return response.data
@@ -126,12 +186,38 @@ export async function getPositions(params?: {
   status?: string
   department?: string
   search?: string
+  limit?: number
+  cursor?: string
 }): Promise<PositionsResponse> {
   const response = await apiClient.get<PositionsResponse>('/api/positions', { params })
   return response.data
 }
 
+// Recorre todas las páginas del listado (vista resumida)
+export async function getAllPositions(params?: {
+  status?: string
+  department?: string
+  search?: string
+}): Promise<{ positions: PositionSummary[]; loading: boolean }> {
+  const positions: PositionSummary[] = []
+  let cursor: string | undefined
+  let loading = false
+  do {
+    const page = await getPositions({ ...params, limit: 200, cursor })
+    positions.push(...page.positions)
+    loading = loading || page.loading
+    cursor = page.next_cursor ?? undefined
+  } while (cursor)
+  return { positions, loading }
+}
+
 export async function getPosition(positionId: string): Promise<Position> {
   const response = await apiClient.get<Position>(`/api/positions/${positionId}`)
   return response.data
 }
+
+// Posiciones activas ordenadas por similitud con un CV (local, sin IA)
+export async function matchPositions(cvText: string, topK?: number): Promise<PositionMatchResponse> {
+  const response = await apiClient.post<PositionMatchResponse>('/api/positions/match', { cvText, topK })
+  return response.data
+}
@@ -12,6 +12,39 @@ export interface CandidateDocumentPayload {
   candidateId?: string
 }
 
+export interface CvDateRange {
+  start: string
+  end: string | null
+  current: boolean
+  raw: string
+}
+
+export interface CvSection {
+  name: string
+  title: string
+  // Posiciones dentro del texto extraído
+  start: number
+  end: number
+  items: string[]
+  date_ranges: CvDateRange[]
+}
+
+export interface CvStructure {
+  version: string
+  sections: CvSection[]
+}
+
+export interface PdfBatchResult {
+  index: number
+  filename: string
+  text: string
+  warnings: string[]
+  page_count: number
+  structure: CvStructure | null
+  elapsed_ms: number
+  error: string | null
+}
+
 export interface Risk {
   category: string
   level: 'alto' | 'medio' | 'bajo'
@@ -96,9 +129,42 @@ export interface Position {
   }
 }
 
+// Vista resumida del listado (GET /api/positions); el JD completo va en Position
+export interface PositionSummary {
+  id: string
+  code: string
+  title: string
+  department: string
+  location: string
+  status: 'active' | 'closed' | 'draft'
+  word_count: number
+  last_used: string | null
+  candidates_analyzed: number
+}
+
 export interface PositionsResponse {
-  positions: Position[]
+  positions: PositionSummary[]
   total: number
+  next_cursor: string | null
+  // true mientras el backend sigue cargando posiciones al arrancar
+  loading: boolean
+}
+
+// Búsqueda inversa: posiciones activas para un CV
+export interface PositionMatch {
+  id: string
+  code: string | null
+  title: string | null
+  department: string | null
+  location: string | null
+  score: number
+  matched_terms: string[]
+}
+
+export interface PositionMatchResponse {
+  matches: PositionMatch[]
+  total_positions: number
+  took_ms: number
 }
 
 // Candidate Actions